@@ -0,0 +1,374 @@
+# Licensed under an MIT open source license - see LICENSE
+'''
+Selectable FFT backends shared by all of the statistics.
+
+The FFTs used by the statistics are taken from an `FFTBackend`. The
+backend used by default can be changed globally with `set_backend`, or
+temporarily with the `fft_backend` context manager:
+
+>>> from turbustat.fft import fft_backend
+>>> from turbustat.statistics import PowerSpectrum
+>>> with fft_backend('scipy', threads=4):  # doctest: +SKIP
+...     pspec = PowerSpectrum(image).run()
+
+The pyfftw backend keeps the FFTW plans in a cache keyed by the shape and
+dtype of the input, so repeated transforms of same-shape arrays are not
+re-planned. The numpy and scipy backends rely on the plan caching within
+pocketfft.
+'''
+
+from __future__ import print_function, absolute_import, division
+
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from warnings import warn
+
+import numpy as np
+
+try:
+    import scipy.fft as scipy_fft
+    SCIPY_FFT_FLAG = True
+except ImportError:
+    SCIPY_FFT_FLAG = False
+
+try:
+    import pyfftw
+    import pyfftw.builders
+    PYFFTW_FLAG = True
+except ImportError:
+    PYFFTW_FLAG = False
+
+
+__all__ = ['FFTBackend', 'NumpyFFTBackend', 'ScipyFFTBackend',
+           'PyFFTWBackend', 'register_backend', 'available_backends',
+           'get_backend', 'set_backend', 'fft_backend']
+
+
+class FFTBackend(object):
+    '''
+    Base class for the FFT backends. Subclasses implement `_transform`.
+
+    Parameters
+    ----------
+    threads : int, optional
+        Number of threads to use in the FFTs, where supported.
+    '''
+
+    name = None
+
+    def __init__(self, threads=1):
+        self.threads = threads
+
+    def _transform(self, kind, arr, s=None, axes=None):
+        raise NotImplementedError()
+
+    def fftn(self, arr, s=None, axes=None):
+        return self._transform('fftn', arr, s=s, axes=axes)
+
+    def ifftn(self, arr, s=None, axes=None):
+        return self._transform('ifftn', arr, s=s, axes=axes)
+
+    def rfftn(self, arr, s=None, axes=None):
+        return self._transform('rfftn', arr, s=s, axes=axes)
+
+    def irfftn(self, arr, s=None, axes=None):
+        return self._transform('irfftn', arr, s=s, axes=axes)
+
+    def fft(self, arr, axis=-1):
+        return self._transform('fftn', arr, axes=(axis,))
+
+    def ifft(self, arr, axis=-1):
+        return self._transform('ifftn', arr, axes=(axis,))
+
+    def rfft(self, arr, axis=-1):
+        return self._transform('rfftn', arr, axes=(axis,))
+
+    def fft2(self, arr, s=None, axes=(-2, -1)):
+        return self._transform('fftn', arr, s=s, axes=axes)
+
+    def ifft2(self, arr, s=None, axes=(-2, -1)):
+        return self._transform('ifftn', arr, s=s, axes=axes)
+
+    def rfft2(self, arr, s=None, axes=(-2, -1)):
+        return self._transform('rfftn', arr, s=s, axes=axes)
+
+    def irfft2(self, arr, s=None, axes=(-2, -1)):
+        return self._transform('irfftn', arr, s=s, axes=axes)
+
+    def __repr__(self):
+        return "{0}(threads={1})".format(self.__class__.__name__,
+                                         self.threads)
+
+
+class NumpyFFTBackend(FFTBackend):
+    '''
+    FFTs from `numpy.fft`. These are always single-threaded.
+    '''
+
+    name = 'numpy'
+
+    def _transform(self, kind, arr, s=None, axes=None):
+        return getattr(np.fft, kind)(arr, s=s, axes=axes)
+
+
+class ScipyFFTBackend(FFTBackend):
+    '''
+    FFTs from `scipy.fft`, using `threads` as the number of workers.
+    '''
+
+    name = 'scipy'
+
+    def __init__(self, threads=1):
+        if not SCIPY_FFT_FLAG:
+            raise ImportError("scipy.fft is not available. scipy>=1.4 is "
+                              "required.")
+
+        super(ScipyFFTBackend, self).__init__(threads=threads)
+
+    def _transform(self, kind, arr, s=None, axes=None):
+        return getattr(scipy_fft, kind)(arr, s=s, axes=axes,
+                                        workers=self.threads)
+
+
+class PyFFTWBackend(FFTBackend):
+    '''
+    FFTs from FFTW using `pyfftw.builders`. The plans are cached, keyed by
+    the transform, the input shape and dtype, and the `s` and `axes`
+    arguments.
+
+    Parameters
+    ----------
+    threads : int, optional
+        Number of threads used by FFTW.
+    cache_size : int, optional
+        Maximum number of plans to keep in the cache.
+    pyfftw_kwargs : Passed to the `pyfftw.builders` functions. See
+        `here <http://hgomersall.github.io/pyFFTW/pyfftw/builders/builders.html>`_
+        for a list of accepted kwargs.
+    '''
+
+    name = 'pyfftw'
+
+    def __init__(self, threads=1, cache_size=32, **pyfftw_kwargs):
+        if not PYFFTW_FLAG:
+            raise ImportError("pyfftw is not installed.")
+
+        super(PyFFTWBackend, self).__init__(threads=threads)
+
+        self.cache_size = cache_size
+        self.pyfftw_kwargs = pyfftw_kwargs
+
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get_plan(self, kind, arr, s, axes):
+        key = (kind, arr.shape, arr.dtype.str,
+               None if s is None else tuple(s),
+               None if axes is None else tuple(axes))
+
+        with self._lock:
+            entry = self._plans.pop(key, None)
+
+            if entry is None:
+                plan = getattr(pyfftw.builders, kind)(
+                    pyfftw.empty_aligned(arr.shape, dtype=arr.dtype),
+                    s=s, axes=axes, threads=self.threads,
+                    **self.pyfftw_kwargs)
+                entry = (plan, threading.Lock())
+
+            self._plans[key] = entry
+
+            while len(self._plans) > self.cache_size:
+                self._plans.popitem(last=False)
+
+        return entry
+
+    def _transform(self, kind, arr, s=None, axes=None):
+        arr = np.asarray(arr)
+
+        plan, plan_lock = self._get_plan(kind, arr, s, axes)
+
+        # FFTW can use the given array as the input buffer, and the
+        # complex-to-real transforms overwrite their input. Pass a copy so
+        # the caller's spectrum is unchanged.
+        if kind == 'irfftn':
+            arr = arr.copy()
+
+        # The plans write into the same output array on each call, so a
+        # copy is returned. The lock keeps threads from sharing a plan.
+        with plan_lock:
+            return plan(arr).copy()
+
+    def clear_cache(self):
+        '''
+        Remove all cached plans.
+        '''
+        with self._lock:
+            self._plans.clear()
+
+
+_BACKENDS = OrderedDict([('numpy', NumpyFFTBackend),
+                         ('scipy', ScipyFFTBackend),
+                         ('pyfftw', PyFFTWBackend)])
+
+# Backends are kept so that the plan caches are reused across calls.
+_backend_instances = {}
+_instance_lock = threading.Lock()
+
+_default = {'backend': NumpyFFTBackend()}
+
+
+def register_backend(name, backend_class):
+    '''
+    Add a new backend that can be selected by name.
+
+    Parameters
+    ----------
+    name : str
+        Name of the backend.
+    backend_class : `FFTBackend` subclass
+        The backend class. It is initialized with the `threads` keyword
+        and any additional keywords given to `get_backend`.
+    '''
+
+    if not issubclass(backend_class, FFTBackend):
+        raise TypeError("backend_class must be a subclass of FFTBackend.")
+
+    _BACKENDS[name] = backend_class
+
+
+def unregister_backend(name):
+    '''
+    Remove a backend added with `register_backend`, along with any shared
+    instances of it.
+
+    Parameters
+    ----------
+    name : str
+        Name of the backend.
+    '''
+
+    if name not in _BACKENDS:
+        raise ValueError("Unknown FFT backend {0}.".format(name))
+
+    del _BACKENDS[name]
+
+    with _instance_lock:
+        for key in [key for key in _backend_instances if key[0] == name]:
+            del _backend_instances[key]
+
+
+def available_backends():
+    '''
+    Names of the backends that can be used in this environment.
+    '''
+
+    avail = ['numpy']
+
+    if SCIPY_FFT_FLAG:
+        avail.append('scipy')
+    if PYFFTW_FLAG:
+        avail.append('pyfftw')
+
+    avail.extend([name for name in _BACKENDS if name not in
+                  ['numpy', 'scipy', 'pyfftw']])
+
+    return avail
+
+
+def get_backend(backend=None, threads=1, **kwargs):
+    '''
+    Return an FFT backend.
+
+    Parameters
+    ----------
+    backend : str or `FFTBackend`, optional
+        Name of a registered backend, or a backend instance. When not
+        given, the current default backend is returned.
+    threads : int, optional
+        Number of threads for the backend. Only used when `backend` is a
+        name.
+    kwargs : Passed to the backend class.
+
+    Returns
+    -------
+    backend : `FFTBackend`
+        The backend. Backends with the same settings are shared between
+        calls, along with their plan caches. A new backend is made on
+        every call when a keyword value is not hashable.
+    '''
+
+    if backend is None:
+        return _default['backend']
+
+    if isinstance(backend, FFTBackend):
+        return backend
+
+    if backend not in _BACKENDS:
+        raise ValueError("Unknown FFT backend {0}. Available backends are "
+                         "{1}".format(backend, list(_BACKENDS.keys())))
+
+    key = (backend, threads, tuple(sorted(kwargs.items())))
+
+    try:
+        hash(key)
+    except TypeError:
+        return _BACKENDS[backend](threads=threads, **kwargs)
+
+    with _instance_lock:
+        if key not in _backend_instances:
+            _backend_instances[key] = \
+                _BACKENDS[backend](threads=threads, **kwargs)
+
+        return _backend_instances[key]
+
+
+def set_backend(backend, threads=1, **kwargs):
+    '''
+    Set the default FFT backend. See `get_backend` for the parameters.
+
+    Returns
+    -------
+    previous : `FFTBackend`
+        The previous default backend.
+    '''
+
+    previous = _default['backend']
+
+    _default['backend'] = get_backend(backend, threads=threads, **kwargs)
+
+    return previous
+
+
+@contextmanager
+def fft_backend(backend, threads=1, **kwargs):
+    '''
+    Context manager to temporarily change the default FFT backend. See
+    `get_backend` for the parameters.
+    '''
+
+    previous = set_backend(backend, threads=threads, **kwargs)
+
+    try:
+        yield _default['backend']
+    finally:
+        _default['backend'] = previous
+
+
+def _legacy_backend(use_pyfftw=False, threads=1, **pyfftw_kwargs):
+    '''
+    Backend matching the `use_pyfftw`, `threads` and `pyfftw_kwargs`
+    arguments of the statistics. Without `use_pyfftw`, the default backend
+    is used. When pyfftw is not installed, a warning is raised and the
+    default backend is used.
+    '''
+
+    if use_pyfftw:
+        if PYFFTW_FLAG:
+            pyfftw_kwargs.pop('threads', None)
+            return get_backend('pyfftw', threads=threads, **pyfftw_kwargs)
+
+        warn("pyfftw not installed. Using the default FFT backend.")
+
+    return get_backend()
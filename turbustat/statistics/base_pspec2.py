@@ -5,10 +5,10 @@ import numpy as np
 import statsmodels.api as sm
 import warnings
 import astropy.units as u
-from numpy.fft import fftshift
+from numpy.fft import fftshift, fftfreq
 
 from .lm_seg import Lm_Seg
-from .psds import pspec, make_radial_freq_arrays
+from .psds import pspec, make_radial_freq_arrays, _rfft_pixel_sets
 from .fitting_utils import clip_func, residual_bootstrap
 from .elliptical_powerlaw import (fit_elliptical_powerlaw,
                                   inverse_interval_transform,
@@ -26,8 +26,47 @@ class StatisticBase_PSpec2D(object):
     def ps2D(self):
         '''
         Two-dimensional power spectrum.
+
+        Only the rfft half-plane is kept, and the full spectrum is
+        created from it each time this is accessed.
+        '''
+
+        ps2D = np.empty(self._ps2D_shape, dtype=self._ps2D_rfft.dtype)
+
+        for set_cols, rows, cols in _rfft_pixel_sets(self._ps2D_shape):
+            ps2D[np.ix_(rows, cols)] = self._ps2D_rfft[:, set_cols]
+
+        return ps2D
+
+    def _ps2D_points(self, low_cut, high_cut, azim_mask=None):
         '''
-        return self._ps2D[::-1]
+        Frequencies and values of the pixels in the full 2D power spectrum
+        with frequencies between `low_cut` and `high_cut`, taken from the
+        rfft half-plane. The pixels are not returned in the order of
+        `ps2D`.
+        '''
+
+        yfreqs = fftshift(fftfreq(self._ps2D_shape[0]))[::-1]
+        xfreqs = fftshift(fftfreq(self._ps2D_shape[1]))
+
+        yy_freq = []
+        xx_freq = []
+        values = []
+
+        for set_cols, rows, cols in _rfft_pixel_sets(self._ps2D_shape):
+            yy, xx = np.meshgrid(yfreqs[rows], xfreqs[cols], indexing='ij')
+
+            mask = clip_func(np.sqrt(yy**2 + xx**2), low_cut, high_cut)
+
+            if azim_mask is not None:
+                mask = np.logical_and(mask, azim_mask[np.ix_(rows, cols)])
+
+            yy_freq.append(yy[mask])
+            xx_freq.append(xx[mask])
+            values.append(self._ps2D_rfft[:, set_cols][mask])
+
+        return (np.concatenate(yy_freq), np.concatenate(xx_freq),
+                np.concatenate(values))
 
     @property
     def ps1D(self):
@@ -53,7 +92,7 @@ class StatisticBase_PSpec2D(object):
 
     @property
     def wavenumbers(self):
-        return self._freqs * min(self._ps2D.shape)
+        return self._freqs * min(self._ps2D_shape)
 
     def compute_beam_pspec(self):
         '''
@@ -64,10 +103,11 @@ class StatisticBase_PSpec2D(object):
                                  " no beam object was given.")
 
         beam_kern = self._beam.as_kernel(self._ang_size,
-                                         y_size=self._ps2D.shape[0],
-                                         x_size=self._ps2D.shape[1])
+                                         y_size=self._ps2D_shape[0],
+                                         x_size=self._ps2D_shape[1])
 
-        beam_fft = fftshift(rfft_to_fft(beam_kern.array))
+        # Keep the rfft half-plane to match the power spectrum.
+        beam_fft = rfft_to_fft(beam_kern.array, keep_rfft=True)
 
         self._beam_pow = np.abs(beam_fft**2)
 
@@ -93,8 +133,9 @@ class StatisticBase_PSpec2D(object):
         else:
             azim_constraint_flag = False
 
-        out = pspec(self.ps2D, return_stddev=True,
-                    logspacing=logspacing, max_bin=max_bin, **kwargs)
+        out = pspec(self._ps2D_rfft, return_stddev=True,
+                    logspacing=logspacing, max_bin=max_bin,
+                    rfft_shape=self._ps2D_shape, **kwargs)
 
         self._azim_constraint_flag = azim_constraint_flag
 
@@ -156,39 +197,34 @@ class StatisticBase_PSpec2D(object):
         self._bootstrap_flag = bootstrap
 
         if fit_unbinned:
-            yy_freq, xx_freq = make_radial_freq_arrays(self.ps2D.shape)
-
-            freqs_2d = np.sqrt(yy_freq**2 + xx_freq**2) / u.pix
-
             # Make the data to fit to
             if low_cut is None:
                 # Default to the largest frequency, since this is just 1 pixel
                 # in the 2D PSpec.
-                self.low_cut = 1. / (0.5 * float(max(self.ps2D.shape)) * u.pix)
+                self.low_cut = 1. / (0.5 * float(max(self._ps2D_shape)) * u.pix)
             else:
                 self.low_cut = self._to_pixel_freq(low_cut)
 
             if high_cut is None:
                 # self.high_cut = self.freqs.max().value / u.pix
-                self.high_cut = freqs_2d.value.max() / u.pix
+                max_freq_sq = [np.max(fftfreq(size)**2)
+                               for size in self._ps2D_shape]
+                self.high_cut = np.sqrt(np.sum(max_freq_sq)) / u.pix
             else:
                 self.high_cut = self._to_pixel_freq(high_cut)
 
+            yy_freq, xx_freq, ps2D_vals = \
+                self._ps2D_points(self.low_cut.value, self.high_cut.value)
 
-            clip_mask = clip_func(freqs_2d.value,
-                                self.low_cut.value,
-                                self.high_cut.value)
-
-
-            x = np.log10(freqs_2d.value[clip_mask])
-            y = np.log10(self.ps2D[clip_mask])
+            x = np.log10(np.sqrt(yy_freq**2 + xx_freq**2))
+            y = np.log10(ps2D_vals)
 
         else:
             # Make the data to fit to
             if low_cut is None:
                 # Default to the largest frequency, since this is just 1 pixel
                 # in the 2D PSpec.
-                self.low_cut = 1. / (0.5 * float(max(self.ps2D.shape)) * u.pix)
+                self.low_cut = 1. / (0.5 * float(max(self._ps2D_shape)) * u.pix)
             else:
                 self.low_cut = self._to_pixel_freq(low_cut)
 
@@ -409,7 +445,7 @@ class StatisticBase_PSpec2D(object):
         if low_cut is None:
             # Default to the largest frequency, since this is just 1 pixel
             # in the 2D PSpec.
-            self.low_cut = 1. / (0.5 * float(max(self.ps2D.shape)) * u.pix)
+            self.low_cut = 1. / (0.5 * float(max(self._ps2D_shape)) * u.pix)
         else:
             self.low_cut = self._to_pixel_freq(low_cut)
 
@@ -418,16 +454,18 @@ class StatisticBase_PSpec2D(object):
         else:
             self.high_cut = self._to_pixel_freq(high_cut)
 
-        yy_freq, xx_freq = make_radial_freq_arrays(self.ps2D.shape)
-
-        freqs_dist = np.sqrt(yy_freq**2 + xx_freq**2)
-
-        mask = clip_func(freqs_dist, self.low_cut.value, self.high_cut.value)
-
         if hasattr(self, "_azim_mask") and use_azimmask:
-            mask = np.logical_and(mask, self._azim_mask)
+            azim_mask = self._azim_mask
+        else:
+            azim_mask = None
+
+        # The pixels at negative frequencies are included from the
+        # half-plane, so the fit matches a fit to the full 2D spectrum.
+        yy_freq, xx_freq, ps2D_vals = \
+            self._ps2D_points(self.low_cut.value, self.high_cut.value,
+                              azim_mask=azim_mask)
 
-        if not mask.any():
+        if ps2D_vals.size == 0:
             raise ValueError("Limits have removed all points to fit. "
                              "Make low_cut and high_cut less restrictive.")
 
@@ -441,7 +479,7 @@ class StatisticBase_PSpec2D(object):
             else:
                 # Let's guess it's going to be ~ -2
                 slope_guess = -2.
-                amp_guess = np.log10(np.nanmax(self.ps2D))
+                amp_guess = np.log10(np.nanmax(self._ps2D_rfft))
 
             # Use an initial guess pi / 2 for theta
             theta = np.pi / 2.
@@ -449,14 +487,14 @@ class StatisticBase_PSpec2D(object):
             ellip_conv = 0
             p0 = (amp_guess, ellip_conv, theta, slope_guess)
 
-        fit_values = np.log10(self.ps2D[mask])
+        fit_values = np.log10(ps2D_vals)
         if isinstance(fit_values, u.Quantity):
             fit_values = fit_values.value
 
         params, stderrs, fit_2Dmodel, fitter = \
             fit_elliptical_powerlaw(fit_values,
-                                    xx_freq[mask],
-                                    yy_freq[mask], p0,
+                                    xx_freq,
+                                    yy_freq, p0,
                                     fit_method=fit_method,
                                     bootstrap=bootstrap,
                                     niters=niters,
@@ -620,7 +658,9 @@ class StatisticBase_PSpec2D(object):
 
         # 2D Spectrum is shown alongside 1D. Otherwise only 1D is returned.
         if show_2D:
-            yy_freq, xx_freq = make_radial_freq_arrays(self.ps2D.shape)
+            ps2D = self.ps2D
+
+            yy_freq, xx_freq = make_radial_freq_arrays(ps2D.shape)
 
             freqs_dist = np.sqrt(yy_freq**2 + xx_freq**2)
 
@@ -628,10 +668,10 @@ class StatisticBase_PSpec2D(object):
                                   freqs_dist <= self.high_cut.value)
 
             # Scale the colour map to be values within the mask
-            vmax = np.log10(self.ps2D[mask]).max()
-            vmin = np.log10(self.ps2D[mask]).min()
+            vmax = np.log10(ps2D[mask]).max()
+            vmin = np.log10(ps2D[mask]).min()
 
-            im1 = ax.imshow(np.log10(self.ps2D), interpolation="nearest",
+            im1 = ax.imshow(np.log10(ps2D), interpolation="nearest",
                             origin="lower", vmax=vmax, vmin=vmin)
 
             divider = make_axes_locatable(ax)
@@ -737,9 +777,9 @@ class StatisticBase_PSpec2D(object):
         high_cut = \
             self._spatial_freq_unit_conversion(self.high_cut, xunit).value
         low_cut = low_cut if not use_wavenumber else \
-            low_cut * min(self._ps2D.shape)
+            low_cut * min(self._ps2D_shape)
         high_cut = high_cut if not use_wavenumber else \
-            high_cut * min(self._ps2D.shape)
+            high_cut * min(self._ps2D_shape)
         ax_1D.axvline(np.log10(low_cut), color=color, alpha=0.5,
                       linestyle='--')
         ax_1D.axvline(np.log10(high_cut), color=color, alpha=0.5,
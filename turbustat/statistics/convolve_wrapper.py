@@ -2,16 +2,10 @@
 from __future__ import (print_function, absolute_import, division,
                         unicode_literals)
 
-try:
-    from pyfftw.interfaces.numpy_fft import fftn, ifftn
-    PYFFTW_FLAG = True
-except ImportError:
-    PYFFTW_FLAG = False
-
 from astropy.convolution import convolve_fft
 from astropy.version import version as astro_version
-import numpy as np
-from warnings import warn
+
+from ..fft import _legacy_backend
 
 
 def convolution_wrapper(img, kernel, use_pyfftw=False, threads=1,
@@ -19,7 +13,8 @@ def convolution_wrapper(img, kernel, use_pyfftw=False, threads=1,
     '''
     Adjust parameter setting to be consistent with astropy <2 and >=2.
 
-    Also allow the FFT to be performed with pyfftw.
+    The FFTs are taken from the default backend in `~turbustat.fft`, or
+    from pyfftw when `use_pyfftw` is enabled.
 
     Parameters
     ----------
@@ -30,7 +25,7 @@ def convolution_wrapper(img, kernel, use_pyfftw=False, threads=1,
     threads : int, optional
         Number of threads to use in FFT when using pyfftw.
     pyfftw_kwargs : dict, optional
-        Passed to `~turbustat.statistics.rfft_to_fft.rfft_to_fft`. See
+        Passed to `~turbustat.fft.PyFFTWBackend`. See
         `here <http://hgomersall.github.io/pyFFTW/pyfftw/builders/builders.html>`_
         for a list of accepted kwargs.
     kwargs : Passed to `~astropy.convolution.convolve_fft`.
@@ -41,23 +36,14 @@ def convolution_wrapper(img, kernel, use_pyfftw=False, threads=1,
         Convolved image.
     '''
 
-    if use_pyfftw:
-        if PYFFTW_FLAG:
-            use_fftn = fftn
-            use_ifftn = ifftn
-        else:
-            warn("pyfftw not installed. Using numpy.fft functions.")
-            use_fftn = np.fft.fftn
-            use_ifftn = np.fft.ifftn
-    else:
-        use_fftn = np.fft.fftn
-        use_ifftn = np.fft.ifftn
+    backend = _legacy_backend(use_pyfftw=use_pyfftw, threads=threads,
+                              **pyfftw_kwargs)
 
     if int(astro_version[0]) >= 2:
 
         conv_img = convolve_fft(img, kernel, normalize_kernel=True,
-                                fftn=use_fftn,
-                                ifftn=use_ifftn,
+                                fftn=backend.fftn,
+                                ifftn=backend.ifftn,
                                 **kwargs)
 
     else:
@@ -2,6 +2,9 @@
 from __future__ import print_function, absolute_import, division
 
 import numpy as np
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from sklearn.metrics.pairwise import pairwise_distances
 
 from ..threeD_to_twoD import _format_data
@@ -28,6 +31,13 @@ class Cramer_Distance(object):
     data_format : str, optional
         Method to arange cube into 2D. Only 'intensity' is currently
         implemented.
+
+    Notes
+    -----
+    Cubes too large to fit in memory can be given as a memory-mapped FITS
+    HDU (e.g., ``fits.open(filename, memmap=True)[0]``). Pass `chunk_size`
+    to `~Cramer_Distance.format_data` to read that many channels into memory
+    at a time.
     """
 
     __doc__ %= {"dtypes": " or ".join(common_types + threed_types)}
@@ -119,7 +129,7 @@ class Cramer_Distance(object):
 
                 self._data_matrix1 = new_data
 
-    def cramer_statistic(self, n_jobs=1):
+    def cramer_statistic(self, n_jobs=1, chunk_size=None):
         '''
         Applies the Cramer Statistic to the datasets.
 
@@ -127,10 +137,16 @@ class Cramer_Distance(object):
         ----------
         n_jobs : int, optional
             Sets the number of cores to use to calculate
-            pairwise distances. Default is 1.
+            pairwise distances. Default is 1. When `chunk_size` is given,
+            this sets the number of threads computing the chunks. Use -1
+            for all available cores.
+        chunk_size : int, optional
+            Compute the pairwise distances for this many rows at a time,
+            so the full distance matrices are never held in memory. The
+            distance agrees with the unchunked result to within rounding
+            errors in the distance calculation.
         '''
         # Adjust what we call n,m based on the larger dimension.
-        # Then the looping below is valid.
         if self.data_matrix1.shape[0] >= self.data_matrix2.shape[0]:
             m = self.data_matrix1.shape[0]
             n = self.data_matrix2.shape[0]
@@ -142,33 +158,15 @@ class Cramer_Distance(object):
             larger = self.data_matrix2
             smaller = self.data_matrix1
 
-        pairdist11 = pairwise_distances(larger, metric="euclidean",
-                                        n_jobs=n_jobs)
-        pairdist22 = pairwise_distances(smaller, metric="euclidean",
-                                        n_jobs=n_jobs)
-        pairdist12 = pairwise_distances(larger, smaller,
-                                        metric="euclidean", n_jobs=n_jobs)
-
-        # Take sqrt of each
         # We default to using the Cramer kernel in Baringhaus & Franz (2004)
         # \phi(dist) = sqrt(dist) / 2.
         # The normalization values below reflect this
-        pairdist11 = np.sqrt(pairdist11)
-        pairdist12 = np.sqrt(pairdist12)
-        pairdist22 = np.sqrt(pairdist22)
-
-        term1 = 0.0
-        term2 = 0.0
-        term3 = 0.0
-        for i in range(m):
-            for j in range(n):
-                term1 += pairdist12[i, j]
-            for ii in range(m):
-                term2 += pairdist11[i, ii]
-
-            if i < n:
-                for jj in range(n):
-                    term3 += pairdist22[i, jj]
+        term1 = _sqrt_distance_sum(larger, smaller, chunk_size=chunk_size,
+                                   n_jobs=n_jobs)
+        term2 = _sqrt_distance_sum(larger, chunk_size=chunk_size,
+                                   n_jobs=n_jobs)
+        term3 = _sqrt_distance_sum(smaller, chunk_size=chunk_size,
+                                   n_jobs=n_jobs)
 
         m, n = float(m), float(n)
 
@@ -185,8 +183,83 @@ class Cramer_Distance(object):
         '''
         return self._distance
 
+    def permutation_test(self, n_perm=1000, n_jobs=1, seed=None,
+                         chunk_size=None):
+        '''
+        Estimate the significance of the Cramer distance by randomly
+        reassigning the rows of the two data matrices between the data sets.
+
+        The square root distances between all rows of the pooled data
+        matrices are computed once, or in chunks of rows, and the statistic
+        for every permutation is found by summing the distances within and
+        between the permuted groups.
+
+        Parameters
+        ----------
+        n_perm : int, optional
+            Number of permutations.
+        n_jobs : int, optional
+            See `~Cramer_Distance.cramer_statistic`.
+        seed : int, optional
+            Seed for the random permutations.
+        chunk_size : int, optional
+            See `~Cramer_Distance.cramer_statistic`.
+
+        Returns
+        -------
+        p_value : float
+            Fraction of permutations with a statistic at least as large as
+            the observed one, including the observed statistic.
+        null_distribution : numpy.ndarray
+            Statistic for each permutation.
+        '''
+
+        if not hasattr(self, '_data_matrix1'):
+            raise ValueError("Run Cramer_Distance.format_data first.")
+
+        pooled = np.vstack([self.data_matrix1, self.data_matrix2])
+
+        m = float(self.data_matrix1.shape[0])
+        n = float(self.data_matrix2.shape[0])
+        num_rows = pooled.shape[0]
+
+        rng = np.random.RandomState(seed)
+
+        # Indicators of the rows in the first group. The first column is
+        # the observed grouping and the last column gives the row sums.
+        groups = np.zeros((num_rows, n_perm + 2))
+        groups[:int(m), 0] = 1.
+        for i in range(n_perm):
+            groups[rng.permutation(num_rows)[:int(m)], i + 1] = 1.
+        groups[:, -1] = 1.
+
+        dist_groups = np.empty_like(groups)
+        for rows, dists in _sqrt_distance_chunks(pooled,
+                                                 chunk_size=chunk_size,
+                                                 n_jobs=n_jobs):
+            dist_groups[rows] = np.dot(dists, groups)
+
+        total = dist_groups[:, -1].sum()
+
+        groups = groups[:, :-1]
+        sum_11 = np.einsum('ij,ij->j', groups, dist_groups[:, :-1])
+        sum_12 = np.dot(dist_groups[:, -1], groups) - sum_11
+        sum_22 = total - sum_11 - 2 * sum_12
+
+        stats = (m * n / (m + n)) * (sum_12 / (m * n) -
+                                     sum_11 / (2 * m ** 2.) -
+                                     sum_22 / (2 * n ** 2.))
+
+        observed = stats[0]
+        null_distribution = stats[1:]
+
+        p_value = (np.sum(null_distribution >= observed) + 1.) / (n_perm + 1.)
+
+        return p_value, null_distribution
+
     def distance_metric(self, verbose=False, normalize=True, n_jobs=1,
-                        label1="1", label2="2", save_name=None):
+                        chunk_size=None, label1="1", label2="2",
+                        save_name=None):
         '''
 
         Run the Cramer statistic.
@@ -199,6 +272,8 @@ class Cramer_Distance(object):
             See `Cramer_Distance.format_data`.
         n_jobs : int, optional
             See `Cramer_Distance.cramer_statistic`.
+        chunk_size : int, optional
+            See `Cramer_Distance.cramer_statistic`.
         label1 : str, optional
             Object or region name for data1
         label2 : str, optional
@@ -208,7 +283,7 @@ class Cramer_Distance(object):
         '''
 
         self.format_data(normalize=normalize)
-        self.cramer_statistic(n_jobs=n_jobs)
+        self.cramer_statistic(n_jobs=n_jobs, chunk_size=chunk_size)
 
         if verbose:
 
@@ -245,3 +320,89 @@ class Cramer_Distance(object):
                 plt.show()
 
         return self
+
+
+def _sqrt_distance_chunks(X, Y=None, chunk_size=None, n_jobs=1):
+    '''
+    Iterate over blocks of rows of the square root of the Euclidean
+    distances between the rows of `X` and `Y`, or between the rows of `X`
+    when `Y` is not given. The blocks are produced in row order.
+
+    Parameters
+    ----------
+    X : numpy.ndarray
+        2D array with one sample per row.
+    Y : numpy.ndarray, optional
+        2D array with one sample per row.
+    chunk_size : int, optional
+        Number of rows of `X` to compute the distances for at once. By
+        default, all rows are used.
+    n_jobs : int, optional
+        Number of cores used by `pairwise_distances` when no `chunk_size` is
+        given. Otherwise, the number of threads used to compute the chunks.
+        At most `n_jobs` chunks are computed ahead of the one being yielded.
+        Use -1 for all available cores.
+
+    Yields
+    ------
+    rows : slice
+        Rows of `X` in the block.
+    dists : numpy.ndarray
+        Square root distances for the block.
+    '''
+
+    if chunk_size is None:
+        dists = pairwise_distances(X, Y, metric="euclidean", n_jobs=n_jobs)
+        yield slice(0, X.shape[0]), np.sqrt(dists)
+        return
+
+    def chunk_dists(start):
+        stop = min(start + chunk_size, X.shape[0])
+
+        if Y is None:
+            dists = pairwise_distances(X[start:stop], X, metric="euclidean")
+            # Distances of the rows to themselves are exactly zero.
+            diag = np.arange(stop - start)
+            dists[diag, diag + start] = 0.
+        else:
+            dists = pairwise_distances(X[start:stop], Y, metric="euclidean")
+
+        return slice(start, stop), np.sqrt(dists)
+
+    starts = range(0, X.shape[0], chunk_size)
+
+    if n_jobs < 0:
+        n_jobs = os.cpu_count()
+
+    if n_jobs == 1:
+        for out in map(chunk_dists, starts):
+            yield out
+    else:
+        # Only keep n_jobs chunks in flight so the finished blocks do not
+        # accumulate when the consumer is slower than the workers.
+        starts = iter(starts)
+        with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+            pending = deque(executor.submit(chunk_dists, start)
+                            for _, start in zip(range(n_jobs), starts))
+            while pending:
+                out = pending.popleft().result()
+                start = next(starts, None)
+                if start is not None:
+                    pending.append(executor.submit(chunk_dists, start))
+                yield out
+
+
+def _sqrt_distance_sum(X, Y=None, chunk_size=None, n_jobs=1):
+    '''
+    Sum of the square root of the Euclidean distances between the rows of
+    `X` and `Y`, or between the rows of `X` when `Y` is not given. See
+    `_sqrt_distance_chunks` for the parameters.
+    '''
+
+    total = 0.
+
+    for _, dists in _sqrt_distance_chunks(X, Y, chunk_size=chunk_size,
+                                          n_jobs=n_jobs):
+        total += np.sum(dists)
+
+    return total
@@ -9,15 +9,16 @@ from copy import copy
 import statsmodels.api as sm
 from warnings import warn
 from astropy.utils.console import ProgressBar
+from scipy.fftpack import next_fast_len
 
 from ..base_statistic import BaseStatisticMixIn
+from ...fft import _legacy_backend
 from ...io import common_types, twod_types, input_data
 from ..stats_utils import common_scale, padwithzeros
 from ..fitting_utils import check_fit_limits, residual_bootstrap
 from .kernels import core_kernel, annulus_kernel
 from ..stats_warnings import TurbuStatMetricWarning
 from ..lm_seg import Lm_Seg
-from ..convolve_wrapper import convolution_wrapper
 
 
 class DeltaVariance(BaseStatisticMixIn):
@@ -144,11 +145,15 @@ class DeltaVariance(BaseStatisticMixIn):
         '''
         Perform the convolution and calculate the delta variance at all lags.
 
+        The FFTs of the image and weights are computed once and shared
+        between the lags, so each lag only requires transforming the kernels
+        and the inverse transforms. The results match convolving with
+        `~astropy.convolution.convolve_fft` at each lag.
+
         Parameters
         ----------
         allow_huge : bool, optional
-            Passed to `~astropy.convolve.convolve_fft`. Allows operations on
-            images larger than 1 Gb.
+            Allows FFTs of images larger than 1 Gb.
         boundary : {"wrap", "fill"}, optional
             Use "wrap" for periodic boundaries, and "fill" for non-periodic.
         min_weight_frac : float, optional
@@ -175,65 +180,78 @@ class DeltaVariance(BaseStatisticMixIn):
 
         '''
 
+        if boundary not in ["wrap", "fill"]:
+            raise ValueError("boundary must be 'wrap' or 'fill'. "
+                             "Given {}".format(boundary))
+
+        if nan_treatment not in ["interpolate", "fill"]:
+            raise ValueError("nan_treatment must be 'interpolate' or 'fill'."
+                             " Given {}".format(nan_treatment))
+
+        backend = _legacy_backend(use_pyfftw=use_pyfftw, threads=threads,
+                                  **pyfftw_kwargs)
+
+        def use_rfftn(arr, s):
+            return backend.rfftn(arr, s=s, axes=(0, 1))
+
+        def use_irfftn(arr, s):
+            return backend.irfftn(arr, s=s, axes=(0, 1))
+
         self._delta_var = np.empty((len(self.lags)))
         self._delta_var_error = np.empty((len(self.lags)))
 
         if show_progress:
             bar = ProgressBar(len(self.lags))
 
+        img = self.data * self.weights
+
+        # The FFTs of the image and weights are shared between all lags
+        # using the same grid shape. With boundary='wrap', the grid is the
+        # image shape unless the kernel is larger than the image.
+        # With boundary='fill', the image is placed at the origin of a
+        # zero-padded grid, so the padding at every lag is implied by the
+        # grid. The grid sizes increase in steps of 10%, so the grid is
+        # reused by a range of lags.
+        fft_cache = {}
+
         for i, lag in enumerate(self.lags.value):
             core = core_kernel(lag, self.data.shape[0], self.data.shape[1])
             annulus = annulus_kernel(lag, self.diam_ratio, self.data.shape[0],
                                      self.data.shape[1])
 
+            kern_shape = np.maximum(core.shape, annulus.shape)
+
             if boundary == "wrap":
                 # Don't pad for periodic boundaries
-                pad_weights = self.weights
-                pad_img = self.data * self.weights
-            elif boundary == "fill":
-                # Extend to avoid boundary effects from non-periodicity
-                pad_weights = np.pad(self.weights, int(lag), padwithzeros)
-                pad_img = np.pad(self.data, int(lag), padwithzeros) * \
-                    pad_weights
+                grid_shape = tuple(np.maximum(img.shape, kern_shape))
+                out_index = [np.arange(size) for size in img.shape]
             else:
-                raise ValueError("boundary must be 'wrap' or 'fill'. "
-                                 "Given {}".format(boundary))
-
-            img_core = \
-                convolution_wrapper(pad_img, core, boundary=boundary,
-                                    fill_value=0. if nan_treatment=='fill' else np.nan,
-                                    allow_huge=allow_huge,
-                                    nan_treatment=nan_treatment,
-                                    use_pyfftw=use_pyfftw,
-                                    threads=threads,
-                                    pyfftw_kwargs=pyfftw_kwargs)
-            img_annulus = \
-                convolution_wrapper(pad_img, annulus,
-                                    boundary=boundary,
-                                    fill_value=0. if nan_treatment=='fill' else np.nan,
-                                    allow_huge=allow_huge,
-                                    nan_treatment=nan_treatment,
-                                    use_pyfftw=use_pyfftw,
-                                    threads=threads,
-                                    pyfftw_kwargs=pyfftw_kwargs)
-            weights_core = \
-                convolution_wrapper(pad_weights, core,
-                                    boundary=boundary,
-                                    fill_value=0. if nan_treatment=='fill' else np.nan,
-                                    allow_huge=allow_huge,
-                                    nan_treatment=nan_treatment,
-                                    use_pyfftw=use_pyfftw,
-                                    threads=threads,
-                                    pyfftw_kwargs=pyfftw_kwargs)
-            weights_annulus = \
-                convolution_wrapper(pad_weights, annulus,
-                                    boundary=boundary,
-                                    fill_value=0. if nan_treatment=='fill' else np.nan,
-                                    allow_huge=allow_huge,
-                                    nan_treatment=nan_treatment,
-                                    use_pyfftw=use_pyfftw,
-                                    threads=threads,
-                                    pyfftw_kwargs=pyfftw_kwargs)
+                # Extend by the lag to avoid boundary effects from
+                # non-periodicity. The extra half-kernel avoids wrapping
+                # in the convolution.
+                pad = int(lag)
+                grid_shape = tuple(_grid_size(size + 2 * pad + kern // 2,
+                                              size)
+                                   for size, kern in zip(img.shape,
+                                                         kern_shape))
+                out_index = [np.arange(-pad, size + pad) % grid_size
+                             for size, grid_size in zip(img.shape,
+                                                        grid_shape)]
+
+            if grid_shape not in fft_cache:
+                fft_cache[grid_shape] = \
+                    _delvar_source_ffts(img, self.weights, grid_shape,
+                                        nan_treatment, use_rfftn,
+                                        allow_huge=allow_huge)
+
+            convs = _delvar_convolutions(fft_cache[grid_shape],
+                                         [core.array, annulus.array],
+                                         grid_shape, out_index, boundary,
+                                         nan_treatment, use_rfftn,
+                                         use_irfftn)
+
+            img_core, img_annulus = convs[0]
+            weights_core, weights_annulus = convs[1]
 
             cutoff_val = min_weight_frac * self.weights.max()
             weights_core[np.where(weights_core <= cutoff_val)] = np.nan
@@ -244,7 +262,10 @@ class DeltaVariance(BaseStatisticMixIn):
             conv_weight = weights_core * weights_annulus
 
             if preserve_nan:
-                conv_arr[np.isnan(pad_img)] = np.nan
+                img_nans = np.isnan(img)
+                if boundary == "fill":
+                    img_nans = np.pad(img_nans, int(lag), padwithzeros)
+                conv_arr[img_nans] = np.nan
 
             if keep_convolve_arrays:
                 self._convolved_arrays.append(conv_arr)
@@ -973,3 +994,129 @@ def _delvar(array, weight, lag):
                        np.nansum(weight)) - val**2) / nindep
 
     return val, val_err
+
+
+def _grid_size(min_size, base_size, ratio=1.1):
+    '''
+    Smallest FFT size of at least `min_size` on a ladder of sizes growing by
+    `ratio` from `base_size`.
+    '''
+
+    if min_size <= base_size:
+        return next_fast_len(int(base_size))
+
+    step = np.ceil(np.log(min_size / float(base_size)) / np.log(ratio))
+
+    return next_fast_len(int(np.ceil(base_size * ratio**step)))
+
+
+def _delvar_source_ffts(img, weights, grid_shape, nan_treatment,
+                        use_rfftn, allow_huge=False):
+    '''
+    FFTs of the image and weights, and of their NaN masks when
+    interpolating over NaNs. NaNs are replaced with zeros.
+    '''
+
+    grid_size = np.prod(grid_shape, dtype=np.int64) * \
+        np.dtype(np.complex128).itemsize
+
+    if grid_size > 1024**3 and not allow_huge:
+        raise ValueError("Size Error: FFT arrays will be larger than 1 GB. "
+                         "Use allow_huge=True to override this exception.")
+
+    source_ffts = []
+
+    for arr in [img, weights]:
+        nan_mask = ~np.isfinite(arr)
+
+        arr_fft = use_rfftn(np.where(nan_mask, 0., arr), s=grid_shape)
+
+        if nan_treatment == "interpolate" and nan_mask.any():
+            mask_fft = use_rfftn(nan_mask.astype(float), s=grid_shape)
+        else:
+            mask_fft = None
+
+        source_ffts.append((arr_fft, mask_fft))
+
+    return source_ffts
+
+
+def _origin_kernel_fft(kernel, grid_shape, use_rfftn):
+    '''
+    FFT of a normalized kernel array centred on the origin of the grid.
+    '''
+
+    big_kernel = np.zeros(grid_shape)
+    big_kernel[:kernel.shape[0], :kernel.shape[1]] = kernel / kernel.sum()
+    big_kernel = np.roll(big_kernel,
+                         (-(kernel.shape[0] // 2), -(kernel.shape[1] // 2)),
+                         axis=(0, 1))
+
+    return use_rfftn(big_kernel, s=grid_shape)
+
+
+def _delvar_convolutions(source_ffts, kernels, grid_shape, out_index,
+                         boundary, nan_treatment, use_rfftn, use_irfftn):
+    '''
+    Convolve the image and weights with each kernel using the shared FFTs.
+
+    This reproduces `~astropy.convolution.convolve_fft` with a normalized
+    kernel. When interpolating over NaNs, the convolution is divided by the
+    convolved map of the finite pixels within the padded image.
+
+    Returns
+    -------
+    convs : list
+        The convolved arrays for each source and kernel at the grid indices
+        in `out_index`.
+    '''
+
+    out_index = np.ix_(*out_index)
+
+    kern_ffts = [_origin_kernel_fft(kernel, grid_shape, use_rfftn)
+                 for kernel in kernels]
+
+    interpolate = nan_treatment == "interpolate"
+
+    if not interpolate:
+        region_convs = [None] * len(kernels)
+    elif boundary == "wrap":
+        # The grid is only larger than the image when the kernel is,
+        # and the padding then has unity weight.
+        region_convs = [1.] * len(kernels)
+    else:
+        # Map of the image region within the padded grid.
+        region = np.zeros(grid_shape)
+        region[out_index] = 1.
+
+        region_fft = use_rfftn(region, s=grid_shape)
+
+        region_convs = [use_irfftn(region_fft * kern_fft,
+                                   s=grid_shape)[out_index]
+                        for kern_fft in kern_ffts]
+
+    convs = []
+    for arr_fft, mask_fft in source_ffts:
+        arr_convs = []
+
+        for kern_fft, region_conv in zip(kern_ffts, region_convs):
+            conv = use_irfftn(arr_fft * kern_fft, s=grid_shape)[out_index]
+
+            if interpolate:
+                weight_conv = region_conv
+                if mask_fft is not None:
+                    weight_conv = weight_conv - \
+                        use_irfftn(mask_fft * kern_fft,
+                                   s=grid_shape)[out_index]
+
+                with np.errstate(divide='ignore', invalid='ignore'):
+                    conv = conv / weight_conv
+
+                if not np.isscalar(weight_conv):
+                    conv[weight_conv < 10 * np.finfo(float).eps] = 0.
+
+            arr_convs.append(conv)
+
+        convs.append(arr_convs)
+
+    return convs
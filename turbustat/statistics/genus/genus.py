@@ -7,11 +7,17 @@ from scipy.interpolate import InterpolatedUnivariateSpline
 from astropy.convolution import Gaussian2DKernel, convolve_fft
 from astropy.wcs import WCS
 import astropy.units as u
+import os
 from warnings import warn
+from scipy.fft import next_fast_len
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 
 from ..stats_utils import standardize, common_scale
+from .threshold_sweep import sweep_component_counts
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, twod_types, input_data, find_beam_properties
+from ...fft import get_backend
 
 
 class Genus(BaseStatisticMixIn):
@@ -204,8 +210,8 @@ class Genus(BaseStatisticMixIn):
     @property
     def smoothed_images(self):
         '''
-        List of smoothed versions of the image, using the radii in
-        `~Genus.smoothing_radii`.
+        Smoothed versions of the image, using the radii in
+        `~Genus.smoothing_radii`, stacked along the first axis.
         '''
         if not hasattr(self, '_smoothed_images'):
             raise ValueError("Set `keep_smoothed_images=True` in "
@@ -235,6 +241,10 @@ class Genus(BaseStatisticMixIn):
                          connectivity=2,
                          keep_smoothed_images=False,
                          match_kernel=False,
+                         method='sweep',
+                         smoothing_method='convolve',
+                         smoothed_dtype=np.float64,
+                         n_jobs=1,
                          **convolution_kwargs):
         '''
         Smooth the data with a Gaussian kernel to create the genus curve from
@@ -255,18 +265,62 @@ class Genus(BaseStatisticMixIn):
         connectivity : {1, 2}, optional
             Connectivity used when removing regions below min_size.
         keep_smoothed_images : bool, optional
-            Keep the convolved images in the `~Genus.smoothed_images` list.
+            Keep the convolved images in the `~Genus.smoothed_images` stack.
             Default is `False`.
         match_kernel : bool, optional
             Match kernel shape to the data shape when convolving. Default is
             `False`. Enable to reproduce behaviour of `~Genus` prior to
             version 1.0 of TurbuStat.
+        method : {'sweep', 'label'}, optional
+            'sweep' sorts the pixels once and adds them to a union-find
+            structure in order of value, counting the regions above and
+            below each threshold in a single pass. 'label' labels the
+            regions separately at each threshold. Both give the same genus
+            values.
+        smoothing_method : {'convolve', 'fourier'}, optional
+            'convolve' smooths the image with `~astropy.convolve.convolve_fft`
+            at each radius. 'fourier' transforms the image once and applies
+            the analytic Fourier transform of the Gaussian for each radius,
+            creating one smoothed image at a time. The Gaussian is not
+            truncated with 'fourier' and `match_kernel` is not used. Only
+            the `boundary` ('fill' or 'wrap'), `nan_treatment` and
+            `preserve_nan` keywords of `convolve_fft` are accepted. With
+            'wrap', radii whose kernel is larger than the image are still
+            smoothed with `convolve_fft`, which pads the image to the
+            kernel size in that case.
+        smoothed_dtype : {np.float64, np.float32}, optional
+            Data type of the `~Genus.smoothed_images` stack.
+        n_jobs : int, optional
+            Number of processes used to compute the genus values. The
+            smoothed images are created in this process and placed in shared
+            memory, then each worker computes the genus for one radius. With
+            `method='label'`, the thresholds are also split between the
+            workers. With `method='sweep'`, each radius is swept once, so
+            at most one worker per radius is used. The smoothed images for
+            all radii are held in memory at once. Use -1 for the number of
+            CPUs. The genus values are identical to the serial result.
         convolution_kwargs: Passed to `~astropy.convolve.convolve_fft`.
 
         '''
 
+        if method not in ['sweep', 'label']:
+            raise ValueError("method must be 'sweep' or 'label'. Given "
+                             "{}".format(method))
+
+        if smoothing_method not in ['convolve', 'fourier']:
+            raise ValueError("smoothing_method must be 'convolve' or "
+                             "'fourier'. Given {}".format(smoothing_method))
+
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+
+        if n_jobs < 1:
+            raise ValueError("n_jobs must be a positive integer or -1.")
+
         if keep_smoothed_images:
-            self._smoothed_images = []
+            self._smoothed_images = \
+                np.empty((len(self.smoothing_radii),) + self.data.shape,
+                         dtype=smoothed_dtype)
 
         if use_beam:
             major, minor = find_beam_properties(self.header)[:2]
@@ -294,50 +348,116 @@ class Genus(BaseStatisticMixIn):
             self._smoothed_means *= self.data.unit
             self._smoothed_stds *= self.data.unit
 
-        conn_kernel = nd.generate_binary_structure(2, connectivity)
+        if smoothing_method == 'fourier' and self._enable_smoothing:
+            widths = np.asarray(self.smoothing_radii)
+
+            # convolve_fft pads the image to the kernel shape when the
+            # kernel is larger, so those radii are not periodic on the
+            # image grid. The kernel size follows Gaussian2DKernel.
+            if convolution_kwargs.get('boundary', 'fill') == 'wrap':
+                kern_sizes = 2 * (np.ceil(8 * widths) // 2) + 1
+                use_fourier = kern_sizes <= min(self.data.shape)
+            else:
+                use_fourier = np.ones(len(widths), dtype=bool)
+
+            fourier_imgs = \
+                _fourier_gaussian_smooth(self.data, widths[use_fourier],
+                                         **convolution_kwargs)
+            smooth_imgs = (next(fourier_imgs) if use else
+                           self._smooth_image(width, **convolution_kwargs)
+                           for width, use in zip(widths, use_fourier))
+        else:
+            smooth_imgs = (self._smooth_image(width, match_kernel,
+                                              **convolution_kwargs)
+                           for width in self.smoothing_radii)
+
+        genus_kwargs = dict(method=method, connectivity=connectivity,
+                            min_size=min_size,
+                            enable_small_removal=enable_small_removal)
 
-        for j, width in enumerate(self.smoothing_radii):
+        if n_jobs == 1:
+            for j, smooth_img in enumerate(smooth_imgs):
 
-            # Skip smoothing when none is given
-            if width is None:
+                # Append the mean/std from the smoothed image:
+                self._smoothed_means[j] = np.nanmean(smooth_img)
+                self._smoothed_stds[j] = np.nanstd(smooth_img)
 
-                smooth_img = self.data
+                if keep_smoothed_images:
+                    self._smoothed_images[j] = smooth_img
 
-            else:
-                if match_kernel:
-                    kernel = Gaussian2DKernel(width,
-                                              x_size=self.data.shape[0],
-                                              y_size=self.data.shape[1])
-                else:
-                    kernel = Gaussian2DKernel(width)
+                self._genus_stats[j] = \
+                    _genus_values(smooth_img, self.thresholds, **genus_kwargs)
+
+            return
+
+        stack_shape = (len(self.smoothing_radii),) + self.data.shape
 
-                smooth_img = convolve_fft(self.data, kernel, **convolution_kwargs)
+        shm = shared_memory.SharedMemory(create=True,
+                                         size=int(np.prod(stack_shape)) * 8)
+        smooth_stack = np.ndarray(stack_shape, dtype=np.float64,
+                                  buffer=shm.buf)
 
-            # Append the mean/std from the smoothed image:
-            self._smoothed_means[j] = np.nanmean(smooth_img)
-            self._smoothed_stds[j] = np.nanstd(smooth_img)
+        try:
+            for j, smooth_img in enumerate(smooth_imgs):
+                smooth_stack[j] = smooth_img
+
+                self._smoothed_means[j] = np.nanmean(smooth_img)
+                self._smoothed_stds[j] = np.nanstd(smooth_img)
 
             if keep_smoothed_images:
-                self._smoothed_images.append(smooth_img)
+                self._smoothed_images[:] = smooth_stack
+
+            # A sweep finds the genus at all thresholds at once, so the
+            # thresholds are only split for the 'label' method, where each
+            # threshold is labeled separately. Splitting gives at least one
+            # task per worker.
+            if method == 'sweep':
+                num_chunks = 1
+            else:
+                num_chunks = min(len(self.thresholds),
+                                 -(-n_jobs // stack_shape[0]))
+            thresh_chunks = np.array_split(np.arange(len(self.thresholds)),
+                                           num_chunks)
+
+            task_posns = [(j, chunk) for j in range(stack_shape[0])
+                          for chunk in thresh_chunks]
+
+            tasks = [(shm.name, stack_shape, j, self.thresholds[chunk],
+                      genus_kwargs) for j, chunk in task_posns]
+
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                for (j, chunk), values in zip(task_posns,
+                                              executor.map(_genus_worker,
+                                                           tasks)):
+                    self._genus_stats[j, chunk] = values
+
+        finally:
+            del smooth_stack
+            shm.close()
+            shm.unlink()
 
-            for i, thresh in enumerate(self.thresholds):
-                high_density = smooth_img > thresh
-                low_density = smooth_img < thresh
+    def _smooth_image(self, width, match_kernel=False, **convolution_kwargs):
+        '''
+        Smooth the data with a Gaussian kernel using
+        `~astropy.convolve.convolve_fft`.
+        '''
 
-                if enable_small_removal:
+        # Skip smoothing when none is given
+        if width is None:
+            return self.data
 
-                    high_density = remove_small_objects(high_density,
-                                                        min_size=min_size,
-                                                        connectivity=connectivity)
-                    low_density = remove_small_objects(low_density,
-                                                       min_size=min_size,
-                                                       connectivity=connectivity)
+        if match_kernel:
+            kernel = Gaussian2DKernel(width,
+                                      x_size=self.data.shape[0],
+                                      y_size=self.data.shape[1])
+        else:
+            kernel = Gaussian2DKernel(width)
 
-                # eight-connectivity to count the regions
-                high_density_labels, high_density_num = nd.label(high_density, conn_kernel)
-                low_density_labels, low_density_num = nd.label(low_density, conn_kernel)
+        backend = get_backend()
+        convolution_kwargs.setdefault('fftn', backend.fftn)
+        convolution_kwargs.setdefault('ifftn', backend.ifftn)
 
-                self._genus_stats[j, i] = high_density_num - low_density_num
+        return convolve_fft(self.data, kernel, **convolution_kwargs)
 
     @property
     def genus_stats(self):
@@ -514,7 +634,10 @@ class Genus_Distance(object):
         When a two-element list is given, the first item is used for
         `img1` and the second for `img2`. See `~Genus`.
     genus_kwargs : dict, optional
-        Dictionary passed to `~Genus.run`.
+        Dictionary passed to `~Genus.run`. Both images are smoothed with
+        the default backend in `~turbustat.fft`, so with
+        `smoothing_method='fourier'`, images of the same shape share the
+        cached FFT plans.
     genus2_kwargs : None or dict, optional
         Dictionary passed to `~Genus.run` for `img2`. When `None` is given,
         settings from `genus_kwargs` are used  for `img2`.
@@ -658,7 +781,7 @@ def GenusDistance(*args, **kwargs):
     return Genus_Distance(*args, **kwargs)
 
 
-def remove_small_objects(arr, min_size, connectivity=2):
+def remove_small_objects(arr, min_size, connectivity=2, labels=None):
     '''
     Remove objects less than the given size.
     Function is based on skimage.morphology.remove_small_objects
@@ -671,25 +794,238 @@ def remove_small_objects(arr, min_size, connectivity=2):
         Smallest allowed size.
     connectivity : int, optional
         Connectivity of the neighborhood.
+    labels : numpy.ndarray, optional
+        Precomputed labels of the regions in `arr` (e.g., from
+        `~scipy.ndimage.label`). `connectivity` is ignored when given.
     '''
 
-    struct = nd.generate_binary_structure(arr.ndim, connectivity)
+    if labels is None:
+        struct = nd.generate_binary_structure(arr.ndim, connectivity)
 
-    labels, num = nd.label(arr, struct)
+        labels, num = nd.label(arr, struct)
 
-    sizes = nd.sum(arr, labels, range(1, num + 1))
+    # Look-up table of the labels to remove. The background label is zero.
+    sizes = np.bincount(labels.ravel())
 
-    for i, size in enumerate(sizes):
-        if size >= min_size:
-            continue
+    small_labels = sizes < min_size
+    small_labels[0] = False
 
-        posns = np.where(labels == i + 1)
-
-        arr[posns] = 0
+    arr[small_labels[labels]] = 0
 
     return arr
 
 
+def _fourier_gaussian_smooth(img, widths, boundary='fill',
+                             nan_treatment='interpolate', preserve_nan=False):
+    '''
+    Smooth an image with Gaussian kernels of several widths. The image is
+    transformed once and multiplied by the analytic Fourier transform of
+    each Gaussian. Smoothed images are produced one at a time to limit the
+    memory use.
+
+    The options follow `~astropy.convolution.convolve_fft` with a normalized
+    kernel.
+
+    Parameters
+    ----------
+    img : numpy.ndarray
+        2D image.
+    widths : numpy.ndarray
+        Standard deviations of the Gaussian kernels in pixels.
+    boundary : {'fill', 'wrap'}, optional
+        Zero-pad the image ('fill') or assume periodic boundaries ('wrap').
+    nan_treatment : {'interpolate', 'fill'}, optional
+        Interpolate over NaNs by normalizing by the smoothed map of finite
+        pixels, or replace NaNs with zeros.
+    preserve_nan : bool, optional
+        Set pixels that are NaN in `img` to NaN in the smoothed images.
+
+    Yields
+    ------
+    smooth_img : numpy.ndarray
+        The smoothed image for each width.
+    '''
+
+    if boundary not in ['fill', 'wrap']:
+        raise ValueError("boundary must be 'fill' or 'wrap'. Given "
+                         "{}".format(boundary))
+
+    if nan_treatment not in ['interpolate', 'fill']:
+        raise ValueError("nan_treatment must be 'interpolate' or 'fill'. "
+                         "Given {}".format(nan_treatment))
+
+    img = np.asarray(img, dtype=np.float64)
+
+    if boundary == 'wrap':
+        grid_shape = img.shape
+    else:
+        # Zero-pad by 6 times the largest width so the periodic copies of
+        # the kernels are negligible.
+        pad = int(np.ceil(6 * np.max(widths)))
+        grid_shape = tuple(next_fast_len(size + pad) for size in img.shape)
+
+    nan_mask = ~np.isfinite(img)
+
+    backend = get_backend()
+
+    img_fft = backend.rfftn(np.where(nan_mask, 0., img), s=grid_shape,
+                            axes=(0, 1))
+
+    interpolate = nan_treatment == 'interpolate' and nan_mask.any()
+
+    if interpolate:
+        mask_fft = backend.rfftn(nan_mask.astype(float), s=grid_shape,
+                                 axes=(0, 1))
+
+    ky_sq = np.fft.fftfreq(grid_shape[0])[:, np.newaxis]**2
+    kx_sq = np.fft.rfftfreq(grid_shape[1])[np.newaxis, :]**2
+
+    out_slice = (slice(0, img.shape[0]), slice(0, img.shape[1]))
+
+    for width in widths:
+        # The Gaussian transfer function is separable.
+        gauss_fft = np.exp(-2 * np.pi**2 * width**2 * ky_sq) * \
+            np.exp(-2 * np.pi**2 * width**2 * kx_sq)
+
+        smooth_img = backend.irfftn(img_fft * gauss_fft, s=grid_shape,
+                                    axes=(0, 1))[out_slice]
+
+        if interpolate:
+            # Normalize by the smoothed map of finite pixels. The padding
+            # has unity weight, as in convolve_fft.
+            weight = 1. - backend.irfftn(mask_fft * gauss_fft, s=grid_shape,
+                                         axes=(0, 1))[out_slice]
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                smooth_img /= weight
+
+            smooth_img[weight < 10 * np.finfo(float).eps] = 0.
+
+        if preserve_nan:
+            smooth_img[nan_mask] = np.nan
+
+        yield smooth_img
+
+
+def _genus_values(img, thresholds, method='sweep', connectivity=2,
+                  min_size=4, enable_small_removal=True):
+    '''
+    Genus of an image at each threshold. See `~Genus.make_genus_curve`.
+    '''
+
+    if method == 'sweep':
+        sweep_min_size = min_size if enable_small_removal else 1
+
+        return _sweep_genus(img, thresholds, min_size=sweep_min_size,
+                            connectivity=connectivity)
+
+    conn_kernel = nd.generate_binary_structure(2, connectivity)
+
+    genus = np.empty(len(thresholds))
+
+    for i, thresh in enumerate(thresholds):
+        # eight-connectivity to count the regions
+        high_density_labels, high_density_num = \
+            nd.label(img > thresh, conn_kernel)
+        low_density_labels, low_density_num = \
+            nd.label(img < thresh, conn_kernel)
+
+        if enable_small_removal:
+            # Only count regions with at least min_size pixels.
+            # Removing the small regions does not change the others,
+            # so there is no need to label again.
+            high_density_num = \
+                _num_large_regions(high_density_labels, min_size)
+            low_density_num = \
+                _num_large_regions(low_density_labels, min_size)
+
+        genus[i] = high_density_num - low_density_num
+
+    return genus
+
+
+def _genus_worker(task):
+    '''
+    Compute the genus for one smoothed image held in shared memory. Use with
+    `concurrent.futures.ProcessPoolExecutor.map`.
+    '''
+
+    shm_name, stack_shape, j, thresholds, genus_kwargs = task
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+
+    try:
+        smooth_stack = np.ndarray(stack_shape, dtype=np.float64,
+                                  buffer=shm.buf)
+
+        genus = _genus_values(smooth_stack[j], thresholds, **genus_kwargs)
+
+        del smooth_stack
+    finally:
+        shm.close()
+
+    return genus
+
+
+def _num_large_regions(labels, min_size):
+    '''
+    Number of labeled regions with at least `min_size` pixels.
+    '''
+
+    return np.count_nonzero(np.bincount(labels.ravel())[1:] >= min_size)
+
+
+def _sweep_genus(img, thresholds, min_size=1, connectivity=2):
+    '''
+    Compute the genus at all thresholds by adding the pixels to a union-find
+    structure in order of value. Regions above each threshold are found by
+    adding pixels from the highest value down, and regions below from the
+    lowest value up.
+
+    Parameters
+    ----------
+    img : numpy.ndarray
+        2D image.
+    thresholds : numpy.ndarray
+        Values to compute the genus at.
+    min_size : int, optional
+        Smallest region size counted.
+    connectivity : int, optional
+        Connectivity of the neighborhood.
+
+    Returns
+    -------
+    genus : numpy.ndarray
+        Number of regions above minus the number below each threshold.
+    '''
+
+    img = np.asarray(img, dtype=np.float64)
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+
+    flat_img = img.ravel()
+
+    # NaNs are never above or below a threshold.
+    valid = np.flatnonzero(~np.isnan(flat_img))
+    order = valid[np.argsort(flat_img[valid], kind='mergesort')[::-1]]
+
+    thresh_order = np.argsort(thresholds, kind='mergesort')[::-1]
+
+    high_num = np.empty(len(thresholds), dtype=np.int64)
+    high_num[thresh_order] = \
+        sweep_component_counts(img, order, thresholds[thresh_order],
+                               min_size, connectivity)
+
+    # Regions below the threshold are regions above the negated threshold
+    # in the negated image.
+    low_num = np.empty(len(thresholds), dtype=np.int64)
+    low_num[thresh_order[::-1]] = \
+        sweep_component_counts(-img, order[::-1].copy(),
+                               -thresholds[thresh_order[::-1]],
+                               min_size, connectivity)
+
+    return high_num - low_num
+
+
 def model_gaussian_genus(x, A, theta_C):
     '''
     Analytic Genus model for a Gaussian field using the formalism from
@@ -0,0 +1,138 @@
+
+cimport cython
+import numpy as np
+cimport numpy as np
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+cdef Py_ssize_t find_root(np.int64_t[:] parent, Py_ssize_t idx):
+    '''
+    Find the root of a pixel, halving the path along the way.
+    '''
+
+    while parent[idx] != idx:
+        parent[idx] = parent[parent[idx]]
+        idx = parent[idx]
+
+    return idx
+
+
+@cython.boundscheck(False)
+@cython.wraparound(False)
+def sweep_component_counts(np.ndarray[np.float64_t, ndim=2] img,
+                           np.ndarray[np.int64_t, ndim=1] order,
+                           np.ndarray[np.float64_t, ndim=1] thresholds,
+                           Py_ssize_t min_size,
+                           int connectivity):
+    '''
+    Count the connected regions above each threshold with a union-find
+    structure. Pixels are added in order of decreasing value, so each pixel
+    and neighbour pair is only visited once for all thresholds.
+
+    Parameters
+    ----------
+    img : np.ndarray
+        2D image.
+    order : np.ndarray
+        Flattened indices of the finite pixels, sorted by decreasing value.
+    thresholds : np.ndarray
+        Thresholds sorted in decreasing order.
+    min_size : int
+        Only regions with at least this many pixels are counted.
+    connectivity : {1, 2}
+        Connectivity of the regions, as in
+        `~scipy.ndimage.generate_binary_structure`.
+
+    Returns
+    -------
+    counts : np.ndarray
+        Number of regions with `img > threshold` for each threshold.
+    '''
+
+    cdef Py_ssize_t ny = img.shape[0]
+    cdef Py_ssize_t nx = img.shape[1]
+    cdef Py_ssize_t num_thresh = thresholds.shape[0]
+    cdef Py_ssize_t num_pix = order.shape[0]
+
+    cdef double[:] flat_img = img.ravel()
+
+    cdef np.int64_t[:] parent = np.arange(ny * nx, dtype=np.int64)
+    cdef np.int64_t[:] size = np.zeros(ny * nx, dtype=np.int64)
+
+    cdef np.ndarray[np.int64_t, ndim=1] counts = \
+        np.zeros(num_thresh, dtype=np.int64)
+
+    # Offsets to the neighbouring pixels
+    cdef np.int64_t[8] dy
+    cdef np.int64_t[8] dx
+    cdef int num_neighb
+
+    if connectivity == 1:
+        num_neighb = 4
+        dy[:4] = [-1, 1, 0, 0]
+        dx[:4] = [0, 0, -1, 1]
+    else:
+        num_neighb = 8
+        dy[:] = [-1, -1, -1, 0, 0, 1, 1, 1]
+        dx[:] = [-1, 0, 1, -1, 1, -1, 0, 1]
+
+    cdef Py_ssize_t num_regions = 0
+    cdef Py_ssize_t posn = 0
+    cdef Py_ssize_t i, k, idx, nidx, y, x, ny_k, nx_k
+    cdef Py_ssize_t root, nroot, size1, size2
+    cdef double thresh
+
+    for i in range(num_thresh):
+        thresh = thresholds[i]
+
+        while posn < num_pix and flat_img[order[posn]] > thresh:
+            idx = order[posn]
+            posn += 1
+
+            size[idx] = 1
+            if min_size <= 1:
+                num_regions += 1
+
+            y = idx // nx
+            x = idx % nx
+
+            for k in range(num_neighb):
+                ny_k = y + dy[k]
+                nx_k = x + dx[k]
+
+                if ny_k < 0 or ny_k >= ny or nx_k < 0 or nx_k >= nx:
+                    continue
+
+                nidx = ny_k * nx + nx_k
+
+                # Only merge with pixels already above the threshold
+                if size[nidx] == 0:
+                    continue
+
+                root = find_root(parent, idx)
+                nroot = find_root(parent, nidx)
+
+                if root == nroot:
+                    continue
+
+                size1 = size[root]
+                size2 = size[nroot]
+
+                if size1 >= min_size:
+                    num_regions -= 1
+                if size2 >= min_size:
+                    num_regions -= 1
+                if size1 + size2 >= min_size:
+                    num_regions += 1
+
+                # Union by size
+                if size1 < size2:
+                    root, nroot = nroot, root
+
+                parent[nroot] = root
+                size[root] = size1 + size2
+
+        counts[i] = num_regions
+
+    return counts
@@ -2,7 +2,6 @@
 from __future__ import print_function, absolute_import, division
 
 import numpy as np
-from numpy.fft import fftshift
 import astropy.units as u
 from warnings import warn
 import sys
@@ -171,12 +170,14 @@ class MVC(BaseStatisticMixIn, StatisticBase_PSpec2D):
         if pyfftw_kwargs.get('threads') is not None:
             pyfftw_kwargs.pop('threads')
 
-        term1 = rfft_to_fft(term1_data,
+        # Only the rfft half-plane is kept. The full 2D power spectrum is
+        # given by `ps2D`.
+        term1 = rfft_to_fft(term1_data, keep_rfft=True,
                             use_pyfftw=use_pyfftw,
                             threads=threads,
                             **pyfftw_kwargs)
 
-        fft_mom0 = rfft_to_fft(mom0_data,
+        fft_mom0 = rfft_to_fft(mom0_data, keep_rfft=True,
                                use_pyfftw=use_pyfftw,
                                threads=threads,
                                **pyfftw_kwargs)
@@ -186,16 +187,14 @@ class MVC(BaseStatisticMixIn, StatisticBase_PSpec2D):
 
         mvc_fft = term1 - term2 * fft_mom0
 
-        # Shift to the center
-        mvc_fft = fftshift(mvc_fft)
-
-        self._ps2D = np.abs(mvc_fft) ** 2.
+        self._ps2D_rfft = np.abs(mvc_fft) ** 2.
+        self._ps2D_shape = mom0_data.shape
 
         if beam_correct:
             self.compute_beam_pspec()
 
         if beam_correct:
-            self._ps2D /= self._beam_pow
+            self._ps2D_rfft /= self._beam_pow
 
     def save_results(self, output_name, keep_data=False):
         '''
@@ -4,12 +4,15 @@ from __future__ import print_function, absolute_import, division
 import numpy as np
 import astropy.units as u
 from warnings import warn
+from scipy.sparse.linalg import eigsh
 
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, threed_types, input_data, find_beam_width
+from ...fft import get_backend
 
 # PCA utilities
-from ..threeD_to_twoD import var_cov_cube
+from ..threeD_to_twoD import (var_cov_cube, _channel_nanmeans,
+                              _iter_pixel_chunks)
 from .width_estimate import WidthEstimate1D, WidthEstimate2D
 
 # Fitting utilities
@@ -31,6 +34,17 @@ class PCA(BaseStatisticMixIn):
         Distance to object in physical units. The output spatial widths will
         be converted to the units given here.
 
+    Notes
+    -----
+    Cubes too large to fit in memory can be given as a memory-mapped FITS
+    HDU (e.g., ``fits.open(filename, memmap=True)[0]``), or as a
+    memory-mapped array with its header (``[array, header]``). When
+    `chunk_size` is set in `~PCA.compute_pca`, the covariance matrix and
+    the eigenimages are computed from chunks of `chunk_size` spatial pixels,
+    so only one chunk of the cube is read into memory at a time. Note that
+    astropy loads the whole array when the FITS file has BSCALE, BZERO or
+    BLANK keywords.
+
     Examples
     --------
     >>> from turbustat.statistics import PCA
@@ -78,7 +92,8 @@ class PCA(BaseStatisticMixIn):
         self._n_eigs = value
 
     def compute_pca(self, mean_sub=False, n_eigs='auto', min_eigval=None,
-                    eigen_cut_method='value', show_progress=True):
+                    eigen_cut_method='value', show_progress=True,
+                    chunk_size=None, solver='full', seed=None):
         '''
         Create the covariance matrix and its eigenvalues.
 
@@ -108,6 +123,32 @@ class PCA(BaseStatisticMixIn):
             variance (`value`).
         show_progress : bool, optional
             Show a progress bar during the creation of the covariance matrix.
+        chunk_size : int, optional
+            Number of spatial pixels read from the cube at once when creating
+            the covariance matrix and the eigenimages. This bounds the memory
+            use to a few arrays of `n_chan * chunk_size` and an
+            `n_chan * n_chan` matrix, and allows for memory-mapped cubes
+            larger than the available memory. By default, the whole cube is
+            used at once for the covariance matrix.
+        solver : {'full', 'truncated', 'randomized'}, optional
+            Eigensolver to use. 'full' computes all eigenvalues of the
+            covariance matrix. 'truncated' computes only the largest `n_eigs`
+            eigenvalues of the covariance matrix with the Lanczos method
+            (`~scipy.sparse.linalg.eigsh`). 'randomized' uses a randomized
+            range finder applied directly to the data in chunks of pixels,
+            without creating the covariance matrix (`~PCA.cov_matrix` is set
+            to None). With NaNs in the data, the randomized solver treats
+            them as zeros after the mean subtraction rather than using the
+            pairwise normalization of the covariance matrix. Both partial
+            solvers require `n_eigs` to be a positive integer, and
+            `~PCA.eigvals` then only contains the `n_eigs` largest
+            eigenvalues. The total variance is found from the trace of the
+            covariance matrix. Since the smallest eigenvalues are not
+            computed, the noise components (negative `n_eigs`) used by
+            `~PCA.noise_ACF` and `~PCA.find_spatial_widths` are not
+            available.
+        seed : int, optional
+            Seed for the random projection used by the 'randomized' solver.
         '''
 
         # Define the decomposition-only flag, if not yet set. Will get
@@ -121,32 +162,66 @@ class PCA(BaseStatisticMixIn):
             raise ValueError("min_eigval must be given when using "
                              "n_eigs='auto'.")
 
-        self.cov_matrix = var_cov_cube(self.data, mean_sub=mean_sub,
-                                       progress_bar=show_progress)
+        if solver not in ['full', 'truncated', 'randomized']:
+            raise ValueError("solver must be 'full', 'truncated' or "
+                             "'randomized'.")
+
+        if solver != 'full':
+            if n_eigs == 'auto' or n_eigs < 1:
+                raise ValueError("n_eigs must be a positive integer when using"
+                                 " solver='{}'.".format(solver))
+
+        if n_eigs != 'auto':
+            if n_eigs < -1 or n_eigs > self.spectral_shape or n_eigs == 0:
+                raise Warning("n_eigs must be less than the number of velocity"
+                              " channels ({}) or -1 for"
+                              " all".format(self.spectral_shape))
+
+        if solver == 'randomized':
+            self.cov_matrix = None
+
+            all_eigsvals, eigvecs, trace = \
+                _randomized_eigh(self.data, n_eigs, mean_sub=mean_sub,
+                                 chunk_size=chunk_size, seed=seed)
+        else:
+            self.cov_matrix = var_cov_cube(self.data, mean_sub=mean_sub,
+                                           progress_bar=show_progress,
+                                           chunk_size=chunk_size)
+
+            trace = np.trace(self.cov_matrix)
+
+            # eigsh needs fewer eigenvalues than the size of the matrix.
+            if solver == 'truncated' and n_eigs < self.spectral_shape:
+                all_eigsvals, eigvecs = eigsh(self.cov_matrix, k=n_eigs,
+                                              which='LA')
+            else:
+                all_eigsvals, eigvecs = np.linalg.eigh(self.cov_matrix)
+
+            if solver == 'truncated':
+                all_eigsvals = all_eigsvals[-n_eigs:]
+                eigvecs = eigvecs[:, -n_eigs:]
 
-        all_eigsvals, eigvecs = np.linalg.eigh(self.cov_matrix)
         all_eigsvals = np.real_if_close(all_eigsvals)
-        eigvecs = eigvecs[:, np.argsort(all_eigsvals)[::-1]]
-        all_eigsvals = np.sort(all_eigsvals)[::-1]  # Sort by maximum
+        order = np.argsort(all_eigsvals)[::-1]  # Sort by maximum
+        eigvecs = eigvecs[:, order]
+        all_eigsvals = all_eigsvals[order]
 
         if n_eigs == 'auto':
             self.n_eigs = set_n_eigs(all_eigsvals, min_eigval,
                                      method=eigen_cut_method)
         elif n_eigs == -1:
             self.n_eigs = self.spectral_shape
-        elif n_eigs < -1 or n_eigs > self.spectral_shape or n_eigs == 0:
-            raise Warning("n_eigs must be less than the number of velocity"
-                          " channels ({}) or -1 for"
-                          " all".format(self.spectral_shape))
         else:
             self.n_eigs = n_eigs
 
+        # The trace is the sum of all eigenvalues, including those not
+        # computed by the partial solvers.
         if mean_sub:
-            self._total_variance = np.sum(all_eigsvals)
+            self._total_variance = trace
             self._var_prop = np.sum(all_eigsvals[:self.n_eigs]) / \
                 self.total_variance
         else:
-            self._total_variance = np.sum(all_eigsvals[1:])
+            self._total_variance = trace - all_eigsvals[0]
             self._var_prop = np.sum(all_eigsvals[1:self.n_eigs]) / \
                 self.total_variance
 
@@ -154,6 +229,7 @@ class PCA(BaseStatisticMixIn):
         self._eigvecs = eigvecs
 
         self._mean_sub = mean_sub
+        self._chunk_size = chunk_size
 
     @property
     def var_proportion(self):
@@ -194,7 +270,62 @@ class PCA(BaseStatisticMixIn):
 
         return np.where(self.eigvals >= np.finfo(self.data.dtype).eps)[0]
 
-    def eigimages(self, n_eigs=None):
+    def _eigen_indices(self, n_eigs):
+        '''
+        Indices of the eigenvectors to use for `n_eigs`.
+        '''
+
+        if n_eigs is None:
+            n_eigs = self.n_eigs
+
+        if n_eigs > 0:
+            return np.arange(n_eigs)
+        elif n_eigs < 0:
+            # The partial solvers do not compute the noisy components.
+            if self.eigvals.size < self.spectral_shape:
+                raise ValueError("Negative n_eigs requires all of the "
+                                 "eigenvalues. Use solver='full' in "
+                                 "compute_pca.")
+
+            # We're looking for the noisy components whenever n_eigs < 0
+            # Find where we have valid eigenvalues, and use the last
+            # n_eigs of those.
+            return self._valid_eigenvectors()[n_eigs:]
+        else:
+            raise ValueError("n_eigs cannot be 0.")
+
+    def _project_eigimages(self, eig_idx, chunk_size=None):
+        '''
+        Project the cube onto the given eigenvectors, returning an array of
+        shape (len(eig_idx), ny, nx).
+        '''
+
+        if chunk_size is None:
+            chunk_size = getattr(self, "_chunk_size", None)
+        if chunk_size is None:
+            chunk_size = max(1, 2**22 // self.data.shape[0])
+
+        if self._mean_sub:
+            mean_values = _channel_nanmeans(self.data, chunk_size)
+        else:
+            mean_values = np.zeros(self.data.shape[0])
+
+        eigvecs = np.real_if_close(self.eigvecs[:, eig_idx])
+
+        eigimgs = np.empty((len(eig_idx), int(np.prod(self.data.shape[1:]))))
+
+        # Project each chunk of spectra onto the eigenvectors.
+        posn = 0
+        for chunk in _iter_pixel_chunks(self.data, chunk_size):
+            chunk = np.nan_to_num(chunk - mean_values[:, np.newaxis])
+
+            eigimgs[:, posn:posn + chunk.shape[1]] = np.dot(eigvecs.T, chunk)
+
+            posn += chunk.shape[1]
+
+        return eigimgs.reshape((len(eig_idx),) + self.data.shape[1:])
+
+    def eigimages(self, n_eigs=None, chunk_size=None):
         '''
         Create eigenimages up to the n_eigs.
 
@@ -204,6 +335,10 @@ class PCA(BaseStatisticMixIn):
             The number of eigenimages to create. When n_eigs is negative, the
             last -n_eig eigenimages are created. If None is given, the number
             in `~PCA.n_eigs` will be returned.
+        chunk_size : int, optional
+            Number of spatial pixels projected onto the eigenvectors at once.
+            Defaults to the `chunk_size` given to `~PCA.compute_pca`, or
+            to ~4x10^6 cube elements per chunk if that was not set.
 
         Returns
         -------
@@ -211,40 +346,19 @@ class PCA(BaseStatisticMixIn):
             3D array, where the first dimension if the number of eigenvalues.
         '''
 
-        if n_eigs is None:
-            n_eigs = self.n_eigs
+        eig_idx = self._eigen_indices(n_eigs)
 
-        if n_eigs > 0:
-            iterat = range(n_eigs)
-        elif n_eigs < 0:
-            # We're looking for the noisy components whenever n_eigs < 0
-            # Find where we have valid eigenvalues, and use the last
-            # n_eigs of those.
-            iterat = self._valid_eigenvectors()[n_eigs:]
-
-        for ct, idx in enumerate(iterat):
-            eigimg = np.zeros(self.data.shape[1:], dtype=float)
-            for channel in range(self.data.shape[0]):
-                if self._mean_sub:
-                    mean_value = np.nanmean(self.data[channel])
-                    eigimg += np.nan_to_num((self.data[channel] - mean_value) *
-                                            np.real_if_close(
-                                                self.eigvecs[channel, idx]))
-                else:
-                    eigimg += np.nan_to_num(self.data[channel] *
-                                            np.real_if_close(
-                                                self.eigvecs[channel, idx]))
-            if ct == 0:
-                eigimgs = eigimg
-            else:
-                eigimgs = np.dstack((eigimgs, eigimg))
+        eigimgs = self._project_eigimages(eig_idx, chunk_size=chunk_size)
 
-        if eigimgs.ndim == 3:
-            return eigimgs.swapaxes(0, 2)
+        # Multiple eigenimages are returned with the spatial axes swapped,
+        # as when they were stacked along the last axis and swapped with
+        # the first.
+        if len(eig_idx) == 1:
+            return eigimgs[0]
         else:
-            return eigimgs
+            return eigimgs.swapaxes(1, 2)
 
-    def autocorr_images(self, n_eigs=None):
+    def autocorr_images(self, n_eigs=None, out=None, batch_size=16):
         '''
         Create the autocorrelation of the eigenimages.
 
@@ -254,6 +368,13 @@ class PCA(BaseStatisticMixIn):
             The number of autocorrelation images to create. When n_eigs is
             negative, the last -n_eig autocorrelation images are created.
             If None is given, the number in `~PCA.n_eigs` will be returned.
+        out : `~numpy.ndarray`, optional
+            Array of shape (n_eigs, ny, nx) to store the autocorrelation
+            images in. The eigenimages are overwritten in-place when not
+            given.
+        batch_size : int, optional
+            Number of eigenimages transformed together. This limits the size
+            of the temporary Fourier transforms.
 
         Returns
         -------
@@ -261,27 +382,35 @@ class PCA(BaseStatisticMixIn):
             3D array, where the first dimension if the number of eigenvalues.
         '''
 
-        if n_eigs is None:
-            n_eigs = self.n_eigs
+        eig_idx = self._eigen_indices(n_eigs)
 
         # Calculate the eigenimages
-        eigimgs = self.eigimages(n_eigs=n_eigs)
+        eigimgs = self._project_eigimages(eig_idx)
 
-        for idx, image in enumerate(eigimgs):
-            fftx = np.fft.fft2(image)
-            fftxs = np.conjugate(fftx)
-            acor = np.fft.ifft2((fftx - fftx.mean()) * (fftxs - fftxs.mean()))
-            acor = np.fft.fftshift(acor)
+        if out is None:
+            out = eigimgs
+        elif out.shape != eigimgs.shape:
+            raise ValueError("out must have a shape of {}."
+                             .format(eigimgs.shape))
 
-            if idx == 0:
-                acors = acor.real
-            else:
-                acors = np.dstack((acors, acor.real))
+        img_shape = eigimgs.shape[1:]
 
-        if acors.ndim == 3:
-            return acors.swapaxes(0, 2)
-        else:
-            return acors
+        backend = get_backend()
+
+        for start in range(0, eigimgs.shape[0], batch_size):
+            stop = min(start + batch_size, eigimgs.shape[0])
+
+            fftx = backend.rfft2(eigimgs[start:stop])
+
+            # The mean of the full FFT is the first pixel of each image.
+            fftx -= eigimgs[start:stop, 0, 0][:, np.newaxis, np.newaxis]
+
+            # |F - <F>|^2 is real and symmetric, so its inverse is real.
+            acor = backend.irfft2(np.abs(fftx)**2, s=img_shape)
+
+            out[start:stop] = np.fft.fftshift(acor, axes=(-2, -1))
+
+        return out
 
     def autocorr_spec(self, n_eigs=None):
         '''
@@ -299,19 +428,16 @@ class PCA(BaseStatisticMixIn):
         acors : np.ndarray
             2D array, where the first dimension if the number of eigenvalues.
         '''
-        if n_eigs is None:
-            n_eigs = self.n_eigs
 
-        for idx in range(n_eigs):
-            fftx = np.fft.fft(self.eigvecs[:, idx])
-            fftxs = np.conjugate(fftx)
-            acor = np.fft.ifft((fftx - fftx.mean()) * (fftxs - fftxs.mean()))
-            if idx == 0:
-                acors = acor.real
-            else:
-                acors = np.dstack((acors, acor.real))
+        eig_idx = self._eigen_indices(n_eigs)
+
+        backend = get_backend()
 
-        return acors.swapaxes(0, 1).squeeze()
+        fftx = backend.fft(self.eigvecs[:, eig_idx], axis=0)
+        fftx -= fftx.mean(axis=0)
+        acors = backend.ifft(np.abs(fftx)**2, axis=0).real
+
+        return acors.squeeze()
 
     def noise_ACF(self, n_eigs=-10):
         '''
@@ -935,7 +1061,8 @@ class PCA(BaseStatisticMixIn):
             spectral_method='walk-down',
             xlow=None, xhigh=None, fit_method='odr',
             beam_fwhm=None, brunt_beamcorrect=True,
-            spatial_output_unit=u.pix, spectral_output_unit=u.pix):
+            spatial_output_unit=u.pix, spectral_output_unit=u.pix,
+            chunk_size=None, solver='full', seed=None):
         '''
         Run the decomposition and fitting in one step.
 
@@ -982,8 +1109,21 @@ class PCA(BaseStatisticMixIn):
             Pixel or spectral unit to convert spectral sizes to when plotting.
             Defaults to pixels. The spectral unit *MUST* match the spectral
             unit defined in the data cube.
+        chunk_size : int, optional
+            See `~PCA.compute_pca`.
+        solver : {'full', 'truncated', 'randomized'}, optional
+            See `~PCA.compute_pca`. The partial solvers can only be used
+            with `decomp_only=True`, since the spatial widths need the
+            noise eigenvectors.
+        seed : int, optional
+            See `~PCA.compute_pca`.
         '''
 
+        if solver != 'full' and not decomp_only:
+            raise ValueError("solver='{}' only computes the largest "
+                             "eigenvalues and can only be used with "
+                             "decomp_only=True.".format(solver))
+
         # Check if the beam can be loaded. Otherwise, turn off the beam
         # correction before computing the covariance matrix
         if beam_fwhm is None and brunt_beamcorrect and not decomp_only:
@@ -999,7 +1139,8 @@ class PCA(BaseStatisticMixIn):
         self.compute_pca(mean_sub=mean_sub, n_eigs=n_eigs,
                          min_eigval=min_eigval,
                          eigen_cut_method=eigen_cut_method,
-                         show_progress=show_progress)
+                         show_progress=show_progress,
+                         chunk_size=chunk_size, solver=solver, seed=seed)
 
         self._decomp_only = decomp_only
 
@@ -1313,3 +1454,85 @@ def _enforce_velocity_axis(pca_obj):
                       " 'cube_vel = cube.with_spectral_unit(u.m / u.s, "
                       "rest_value=113 * u.GHz)', changing to the appropriate"
                       " rest frequency and desired velocity unit.")
+
+
+def _randomized_eigh(cube, n_eigs, mean_sub=False, chunk_size=None,
+                     n_oversamples=10, n_iter=4, seed=None):
+    '''
+    Find the largest eigenvalues and eigenvectors of the covariance matrix
+    of a cube with a randomized range finder (Halko et al. 2011). The data
+    are only accessed through products with chunks of pixels.
+
+    Parameters
+    ----------
+    cube : `~numpy.ndarray`
+        Data cube.
+    n_eigs : int
+        Number of eigenvalues to return.
+    mean_sub : bool, optional
+        Subtract the channel means.
+    chunk_size : int, optional
+        Number of spatial pixels used at once.
+    n_oversamples : int, optional
+        Extra dimensions in the random projection.
+    n_iter : int, optional
+        Number of power iterations.
+    seed : int, optional
+        Seed for the random projection.
+
+    Returns
+    -------
+    eigvals : `~numpy.ndarray`
+        The `n_eigs` largest eigenvalues.
+    eigvecs : `~numpy.ndarray`
+        The matching eigenvectors.
+    trace : float
+        Trace of the covariance matrix.
+    '''
+
+    n_chan = cube.shape[0]
+    n_pix = int(np.prod(cube.shape[1:]))
+
+    if chunk_size is None:
+        chunk_size = n_pix
+
+    if mean_sub:
+        mean_values = _channel_nanmeans(cube, chunk_size)
+        norm = n_pix - 1.
+    else:
+        mean_values = np.zeros(n_chan)
+        norm = float(n_pix)
+
+    def cov_dot(mat):
+        # Product of the covariance matrix with mat, and its trace.
+        out = np.zeros((n_chan, mat.shape[1]))
+        trace = 0.
+
+        for chunk in _iter_pixel_chunks(cube, chunk_size):
+            chunk = np.nan_to_num(chunk - mean_values[:, np.newaxis])
+
+            out += np.dot(chunk, np.dot(chunk.T, mat))
+            trace += np.sum(chunk**2)
+
+        return out / norm, trace / norm
+
+    rng = np.random.RandomState(seed)
+
+    n_comp = min(n_eigs + n_oversamples, n_chan)
+
+    range_mat, trace = cov_dot(rng.normal(size=(n_chan, n_comp)))
+    range_mat = np.linalg.qr(range_mat)[0]
+
+    for _ in range(n_iter):
+        range_mat = np.linalg.qr(cov_dot(range_mat)[0])[0]
+
+    # Project onto the range and solve the small eigenproblem.
+    proj_cov = np.dot(range_mat.T, cov_dot(range_mat)[0])
+    proj_cov = 0.5 * (proj_cov + proj_cov.T)
+
+    eigvals, eigvecs = np.linalg.eigh(proj_cov)
+
+    eigvals = eigvals[-n_eigs:]
+    eigvecs = np.dot(range_mat, eigvecs[:, -n_eigs:])
+
+    return eigvals, eigvecs, trace
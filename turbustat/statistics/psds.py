@@ -1,8 +1,10 @@
 # Licensed under an MIT open source license - see LICENSE
 from __future__ import print_function, absolute_import, division
 
+import threading
+from collections import OrderedDict
+
 import numpy as np
-from scipy.stats import binned_statistic
 import astropy.units as u
 from astropy.coordinates import Angle
 from scipy.stats import t as t_dist
@@ -11,9 +13,11 @@ from scipy.stats import t as t_dist
 def pspec(psd2, nbins=None, return_stddev=False, binsize=1.0,
           logspacing=True, max_bin=None, min_bin=None, return_freqs=True,
           theta_0=None, delta_theta=None, boot_iter=None,
-          mean_func=np.nanmean):
+          mean_func=np.nanmean, rfft_shape=None, seed=None):
     '''
-    Calculate the radial profile using scipy.stats.binned_statistic.
+    Calculate the radial profile of a 2D power spectrum. The bin of each
+    pixel is cached in a `RadialBinner` and reused for spectra with the
+    same shape and bins.
 
     Parameters
     ----------
@@ -46,6 +50,13 @@ def pspec(psd2, nbins=None, return_stddev=False, binsize=1.0,
     mean_func : function, optional
         Define the function used to create the 1D power spectrum. The default
         is `np.nanmean`.
+    rfft_shape : tuple, optional
+        When given, `psd2` is the unshifted half-plane from an rfft of an
+        array with this shape. Each pixel with a negative frequency partner
+        is counted twice, giving the same result as the full 2D spectrum
+        without expanding it.
+    seed : int, optional
+        Seed for the random resampling when `boot_iter` is given.
 
     Returns
     -------
@@ -58,46 +69,201 @@ def pspec(psd2, nbins=None, return_stddev=False, binsize=1.0,
         within each of the bins.
     '''
 
-    yy, xx = make_radial_arrays(psd2.shape)
+    if theta_0 is not None and delta_theta is None:
+        raise ValueError("Must give delta_theta.")
+
+    if rfft_shape is not None:
+        shape = tuple(rfft_shape)
+    else:
+        shape = psd2.shape
+
+    bins = _radial_bins(shape, nbins=nbins, binsize=binsize,
+                        logspacing=logspacing, max_bin=max_bin,
+                        min_bin=min_bin, return_freqs=return_freqs)
+
+    binner = get_radial_binner(shape, bins, return_freqs=return_freqs,
+                               theta_0=theta_0, delta_theta=delta_theta,
+                               rfft=rfft_shape is not None)
+
+    # The binner is cached and shared, so callers get their own copy of
+    # its read-only mask.
+    if binner.azim_mask is not None:
+        azim_mask = binner.azim_mask.copy()
+
+    ps1D, ps1D_stddev, bin_cts = binner.stats(psd2)
+
+    if mean_func is not np.nanmean:
+        ps1D = binner.apply(psd2, mean_func)
+
+    if return_stddev and boot_iter is not None:
+        ps1D_stddev = binner.bootstrap_stddev(psd2, boot_iter, seed=seed)
+
+    bin_cents = (bins[1:] + bins[:-1]) / 2.
+
+    if not return_stddev:
+        if theta_0 is not None:
+            return bin_cents, ps1D, azim_mask
+        else:
+            return bin_cents, ps1D
+    else:
+
+        _correct_stddev(ps1D, ps1D_stddev, bin_cts)
+
+        if theta_0 is not None:
+            return bin_cents, ps1D, ps1D_stddev, azim_mask
+        else:
+            return bin_cents, ps1D, ps1D_stddev
+
+
+def pspec_stack(psd2_stack, nbins=None, binsize=1.0, logspacing=True,
+                max_bin=None, min_bin=None, return_freqs=True,
+                theta_0=None, delta_theta=None, rfft_shape=None,
+                boot_iter=None, seed=None):
+    '''
+    Calculate the radial profiles of a stack of 2D power spectra with the
+    same shape. The bins are shared, and all of the profiles are computed
+    together. The per-channel spectra of a cube can be found with:
+
+    >>> ps2D = np.abs(np.fft.rfft2(cube))**2  # doctest: +SKIP
+    >>> out = pspec_stack(ps2D, rfft_shape=cube.shape[1:])  # doctest: +SKIP
+
+    Parameters
+    ----------
+    psd2_stack : np.ndarray
+        3D array of 2D spectral power densities, with the spectra along the
+        first axis.
+    nbins : int, optional
+        Number of bins to use. If None, it is calculated based on the size
+        of the given arrays.
+    binsize : float, optional
+        Size of bins to be used. If logspacing is enabled, this will increase
+        the number of bins used by the inverse of the given binsize.
+    logspacing : bool, optional
+        Use logarithmically spaces bins.
+    max_bin : float, optional
+        Give the maximum value to bin to.
+    min_bin : float, optional
+        Give the minimum value to bin to.
+    return_freqs : bool, optional
+        Return spatial frequencies.
+    theta_0 : `~astropy.units.Quantity`, optional
+        The center angle of the azimuthal mask. Must have angular units.
+    delta_theta : `~astropy.units.Quantity`, optional
+        The width of the azimuthal mask. This must be given when
+        a `theta_0` is given. Must have angular units.
+    rfft_shape : tuple, optional
+        When given, each spectrum is the unshifted half-plane from an rfft
+        of an array with this shape. See `pspec`.
+    boot_iter : int, optional
+        Number of bootstrap iterations for estimating the standard deviation
+        in each bin.
+    seed : int, optional
+        Seed for the random resampling when `boot_iter` is given.
+
+    Returns
+    -------
+    bins_cents : np.ndarray
+        Centre of the bins.
+    ps1D : np.ndarray
+        1D binned power spectra, with a shape of (n, nbins).
+    ps1D_stddev : np.ndarray
+        Standard deviations within each of the bins, with a shape of
+        (n, nbins).
+    bin_cts : np.ndarray
+        Number of finite points in each bin, with a shape of (n, nbins).
+    azim_mask : np.ndarray
+        Returned when `theta_0` is given. The azimuthal mask of the full
+        2D spectrum.
+    '''
+
+    if theta_0 is not None and delta_theta is None:
+        raise ValueError("Must give delta_theta.")
+
+    psd2_stack = np.asarray(psd2_stack)
+
+    if psd2_stack.ndim != 3:
+        raise ValueError("psd2_stack must be a 3D array.")
+
+    if rfft_shape is not None:
+        shape = tuple(rfft_shape)
+    else:
+        shape = psd2_stack.shape[1:]
+
+    bins = _radial_bins(shape, nbins=nbins, binsize=binsize,
+                        logspacing=logspacing, max_bin=max_bin,
+                        min_bin=min_bin, return_freqs=return_freqs)
+
+    binner = get_radial_binner(shape, bins, return_freqs=return_freqs,
+                               theta_0=theta_0, delta_theta=delta_theta,
+                               rfft=rfft_shape is not None)
+
+    ps1D, ps1D_stddev, bin_cts = binner.stats(psd2_stack)
+
+    if boot_iter is not None:
+        ps1D_stddev = binner.bootstrap_stddev(psd2_stack, boot_iter,
+                                              seed=seed)
+
+    _correct_stddev(ps1D, ps1D_stddev, bin_cts)
+
+    bin_cents = (bins[1:] + bins[:-1]) / 2.
 
-    dists = np.sqrt(yy**2 + xx**2)
     if theta_0 is not None:
+        return (bin_cents, ps1D, ps1D_stddev, bin_cts,
+                binner.azim_mask.copy())
 
-        if delta_theta is None:
-            raise ValueError("Must give delta_theta.")
+    return bin_cents, ps1D, ps1D_stddev, bin_cts
 
-        theta_0 = theta_0.to(u.rad)
-        delta_theta = delta_theta.to(u.rad)
 
-        theta_limits = Angle([theta_0 - 0.5 * delta_theta,
-                              theta_0 + 0.5 * delta_theta])
+def _correct_stddev(ps1D, ps1D_stddev, bin_cts):
+    '''
+    Correct the standard deviations in `pspec` for the number of points in
+    each bin, and mask bins with 1 or fewer points. Changes the arrays in
+    place.
+    '''
 
-        # Define theta array
-        thetas = Angle(np.arctan2(yy, xx) * u.rad)
+    # We're dealing with variations in the number of samples for each bin.
+    # Add a correction based on the t distribution
 
-        # Wrap around pi
-        theta_limits = theta_limits.wrap_at(np.pi * u.rad)
+    # Two-tail CI for 85% (~1 sigma)
+    alpha = 1 - (0.15 / 2.)
 
-    if nbins is None:
-        nbins = int(np.round(dists.max() / binsize) + 1)
+    # Correction factor to convert to the standard error
+    A = t_dist.ppf(alpha, bin_cts - 1) / np.sqrt(bin_cts)
+
+    # If the standard error is larger than the standard deviation,
+    # use it instead
+    ps1D_stddev[A > 1] *= A[A > 1]
+
+    # Mask out bins that have 1 or fewer points
+    mask = bin_cts <= 1
+
+    ps1D_stddev[mask] = np.nan
+    ps1D[mask] = np.nan
 
-    if return_freqs:
-        yy_freq, xx_freq = make_radial_freq_arrays(psd2.shape)
+    # ps1D_stddev[ps1D_stddev == 0.] = np.nan
+
+
+def _radial_bins(shape, nbins=None, binsize=1.0, logspacing=True,
+                 max_bin=None, min_bin=None, return_freqs=True):
+    '''
+    Bin edges used in `pspec` for a 2D spectrum with the given shape.
+    '''
 
-        freqs_dist = np.sqrt(yy_freq**2 + xx_freq**2)
+    # Largest distance from the centre pixel in `make_radial_arrays`.
+    max_dist = np.sqrt((shape[0] // 2)**2 + (shape[1] // 2)**2)
 
-        zero_freq_val = freqs_dist[np.nonzero(freqs_dist)].min() / 2.
-        freqs_dist[freqs_dist == 0] = zero_freq_val
+    if nbins is None:
+        nbins = int(np.round(max_dist / binsize) + 1)
 
     if max_bin is None:
         if return_freqs:
             max_bin = 0.5
         else:
-            max_bin = dists.max()
+            max_bin = max_dist
 
     if min_bin is None:
         if return_freqs:
-            min_bin = 1.0 / min(psd2.shape)
+            min_bin = 1.0 / min(shape)
         else:
             min_bin = 0.5
 
@@ -106,91 +272,473 @@ def pspec(psd2, nbins=None, return_stddev=False, binsize=1.0,
     else:
         bins = np.linspace(min_bin, max_bin, nbins + 1)
 
-    if return_freqs:
-        dist_arr = freqs_dist
-    else:
-        dist_arr = dists
+    return bins
 
-    if theta_0 is not None:
-        if theta_limits[0] < theta_limits[1]:
-            azim_mask = np.logical_and(thetas >= theta_limits[0],
-                                       thetas <= theta_limits[1])
-        else:
-            azim_mask = np.logical_or(thetas >= theta_limits[0],
-                                      thetas <= theta_limits[1])
 
-        azim_mask = np.logical_or(azim_mask, azim_mask[::-1, ::-1])
+def _zero_freq_value(shape):
+    '''
+    Frequency assigned to the zero frequency pixel in `pspec`: half of the
+    smallest non-zero frequency.
+    '''
 
-        # Fill in the middle angles
-        ny = np.floor(psd2.shape[0] / 2.).astype(int)
-        nx = np.floor(psd2.shape[1] / 2.).astype(int)
+    axis_freqs = np.sqrt(np.append(np.fft.fftfreq(shape[0])**2,
+                                   np.fft.fftfreq(shape[1])**2))
 
-        azim_mask[ny - 1:ny + 1, nx - 1:nx + 1] = True
-    else:
-        azim_mask = None
+    return axis_freqs[np.nonzero(axis_freqs)].min() / 2.
 
-    finite_mask = np.isfinite(psd2)
-    if azim_mask is not None:
-        finite_mask = np.logical_and(finite_mask, azim_mask)
 
-    ps1D, bin_edge, cts = binned_statistic(dist_arr[finite_mask].ravel(),
-                                           psd2[finite_mask].ravel(),
-                                           bins=bins,
-                                           statistic=mean_func)
+def _azimuthal_mask(shape, theta_0, delta_theta):
+    '''
+    Azimuthal mask of the full 2D spectrum used in `pspec`.
+    '''
 
-    bin_cents = (bin_edge[1:] + bin_edge[:-1]) / 2.
+    yy, xx = make_radial_arrays(shape)
 
-    if not return_stddev:
-        if theta_0 is not None:
-            return bin_cents, ps1D, azim_mask
-        else:
-            return bin_cents, ps1D
+    theta_0 = theta_0.to(u.rad)
+    delta_theta = delta_theta.to(u.rad)
+
+    theta_limits = Angle([theta_0 - 0.5 * delta_theta,
+                          theta_0 + 0.5 * delta_theta])
+
+    # Define theta array
+    thetas = Angle(np.arctan2(yy, xx) * u.rad)
+
+    # Wrap around pi
+    theta_limits = theta_limits.wrap_at(np.pi * u.rad)
+
+    if theta_limits[0] < theta_limits[1]:
+        azim_mask = np.logical_and(thetas >= theta_limits[0],
+                                   thetas <= theta_limits[1])
     else:
+        azim_mask = np.logical_or(thetas >= theta_limits[0],
+                                  thetas <= theta_limits[1])
+
+    azim_mask = np.logical_or(azim_mask, azim_mask[::-1, ::-1])
+
+    # Fill in the middle angles
+    ny = np.floor(shape[0] / 2.).astype(int)
+    nx = np.floor(shape[1] / 2.).astype(int)
+
+    azim_mask[ny - 1:ny + 1, nx - 1:nx + 1] = True
+
+    return azim_mask
+
+
+def _rfft_pixel_sets(shape):
+    '''
+    Positions of the pixels in the half-plane of an rfft within the full
+    2D spectrum, as shown in `ps2D` (shifted to the centre with the rows
+    reversed).
+
+    The half-plane has two sets of pixels. The first is every half-plane
+    pixel at its own frequency. The second is the columns that also stand
+    for the Hermitian partner at the negative frequency, placed at the
+    position of that partner.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the full 2D spectrum.
+
+    Returns
+    -------
+    pixel_sets : list
+        For each set, a tuple of the half-plane columns in the set (a slice
+        or boolean array), and the row and column positions in the full 2D
+        spectrum. The position of half-plane pixel (i, j) is
+        (rows[i], cols[j]).
+    '''
+
+    ny, nx = shape
 
-        if boot_iter is None:
+    half_rows = np.arange(ny)
+    half_cols = np.arange(nx // 2 + 1)
 
-            stat_func = lambda x: np.nanstd(x, ddof=1)
+    # Columns other than the zero and Nyquist frequencies have partners at
+    # negative frequencies that are not in the half-plane.
+    mirror_cols = np.logical_and(half_cols > 0, 2 * half_cols != nx)
 
+    def layout_rows(rows):
+        return ny - 1 - (rows + ny // 2) % ny
+
+    def layout_cols(cols):
+        return (cols + nx // 2) % nx
+
+    return [(slice(None), layout_rows(half_rows), layout_cols(half_cols)),
+            (mirror_cols, layout_rows(-half_rows % ny),
+             layout_cols(-half_cols[mirror_cols] % nx))]
+
+
+class RadialBinner(object):
+    '''
+    Radial bins of the pixels in a 2D spectrum. The bin of each pixel is
+    found once, and reused to bin each spectrum with the same shape, bins
+    and azimuthal mask.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the full 2D spectrum.
+    bins : np.ndarray
+        Edges of the radial bins.
+    return_freqs : bool, optional
+        The bins are in spatial frequency. Otherwise, the bins are in
+        pixel distance from the centre.
+    azim_mask : np.ndarray, optional
+        Boolean azimuthal mask of the full 2D spectrum. Only pixels within
+        the mask are binned.
+    rfft : bool, optional
+        The spectra are the unshifted half-plane from an rfft of an array
+        with the given `shape`. Pixels with a negative frequency partner are
+        binned at both positions.
+    '''
+
+    def __init__(self, shape, bins, return_freqs=True, azim_mask=None,
+                 rfft=False):
+
+        self.shape = tuple(shape)
+        self.bins = np.array(bins, dtype=float)
+        self.nbins = len(self.bins) - 1
+        self.rfft = rfft
+
+        if azim_mask is not None:
+            azim_mask = np.array(azim_mask, dtype=bool)
+            # Shared between all users of a cached binner.
+            azim_mask.setflags(write=False)
+        self.azim_mask = azim_mask
+
+        ny, nx = self.shape
+
+        if rfft:
+            self.input_shape = (ny, nx // 2 + 1)
+            pixel_sets = _rfft_pixel_sets(self.shape)
         else:
-            from astropy.stats import bootstrap
+            self.input_shape = self.shape
+            pixel_sets = [(slice(None), np.arange(ny), np.arange(nx))]
+
+        if return_freqs:
+            yposn = np.fft.fftshift(np.fft.fftfreq(ny))[::-1]
+            xposn = np.fft.fftshift(np.fft.fftfreq(nx))
+        else:
+            yposn = np.arange(ny) - ny // 2
+            xposn = np.arange(nx) - nx // 2
+
+        flat_idx = np.arange(np.prod(self.input_shape)).reshape(
+            self.input_shape)
+
+        pixel_idx = []
+        bin_idx = []
+
+        for set_cols, rows, cols in pixel_sets:
+            dists = np.sqrt(yposn[rows][:, np.newaxis]**2 +
+                            xposn[cols][np.newaxis]**2)
+
+            if return_freqs:
+                dists[dists == 0] = _zero_freq_value(self.shape)
+
+            # Count the bins from 0, and drop pixels outside of the bins.
+            set_bins = _bin_index(dists, self.bins) - 1
+
+            keep = np.logical_and(set_bins >= 0, set_bins < self.nbins)
+
+            if azim_mask is not None:
+                keep = np.logical_and(keep, azim_mask[np.ix_(rows, cols)])
+
+            pixel_idx.append(flat_idx[:, set_cols][keep])
+            bin_idx.append(set_bins[keep])
+
+        self._pixel_idx = np.concatenate(pixel_idx)
+        self._bin_idx = np.concatenate(bin_idx)
+
+    def _finite_values(self, psd2):
+        '''
+        Values of the binned pixels, and their bins, with non-finite values
+        removed. For a stack of spectra, the bins of the i-th spectrum are
+        offset by `i * nbins`.
+        '''
+
+        psd2 = np.asarray(psd2)
+
+        if psd2.ndim not in (2, 3) or psd2.shape[-2:] != self.input_shape:
+            raise ValueError("Expected a spectrum with shape {0}, or a stack"
+                             " of spectra with this shape, not {1}."
+                             .format(self.input_shape, psd2.shape))
+
+        stack = psd2.reshape((-1, np.prod(self.input_shape)))
+
+        num_spec = stack.shape[0]
+
+        vals = stack[:, self._pixel_idx]
+
+        bin_idx = self._bin_idx + \
+            self.nbins * np.arange(num_spec)[:, np.newaxis]
+
+        finite = np.isfinite(vals)
+
+        return vals[finite], bin_idx[finite], num_spec
+
+    def stats(self, psd2):
+        '''
+        Mean, standard deviation and number of finite points in each bin.
+
+        Parameters
+        ----------
+        psd2 : np.ndarray
+            2D spectrum, or a 3D stack of 2D spectra.
+
+        Returns
+        -------
+        means : np.ndarray
+            Mean in each bin.
+        stddevs : np.ndarray
+            Standard deviation in each bin (with `ddof=1`). Bins with 1 or
+            fewer points are NaN.
+        bin_cts : np.ndarray
+            Number of points in each bin.
+
+        For a stack, each output has a shape of (n, nbins).
+        '''
+
+        vals, bin_idx, num_spec = self._finite_values(psd2)
+
+        num_bins = num_spec * self.nbins
+
+        bin_cts = np.bincount(bin_idx, minlength=num_bins).astype(float)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            means = np.bincount(bin_idx, weights=vals,
+                                minlength=num_bins) / bin_cts
+
+            sq_resid = np.bincount(bin_idx,
+                                   weights=(vals - means[bin_idx])**2,
+                                   minlength=num_bins)
+
+            stddevs = np.sqrt(sq_resid / (bin_cts - 1))
+
+        stddevs[bin_cts <= 1] = np.nan
+
+        out = [means, stddevs, bin_cts]
+
+        if np.ndim(psd2) == 2:
+            return tuple(out)
+
+        return tuple(arr.reshape((num_spec, self.nbins)) for arr in out)
+
+    def apply(self, psd2, func):
+        '''
+        Apply a function to the finite values in each bin. Empty bins are
+        NaN.
+
+        Parameters
+        ----------
+        psd2 : np.ndarray
+            2D spectrum, or a 3D stack of 2D spectra.
+        func : function
+            Function applied to the 1D array of values in each bin.
+
+        Returns
+        -------
+        out : np.ndarray
+            Output of `func` in each bin. For a stack, the shape is
+            (n, nbins).
+        '''
+
+        vals, bin_idx, num_spec = self._finite_values(psd2)
+
+        order = np.argsort(bin_idx, kind='mergesort')
+
+        bin_cts = np.bincount(bin_idx, minlength=num_spec * self.nbins)
+
+        out = np.empty(num_spec * self.nbins)
+        out.fill(np.nan)
 
-            stat_func = lambda data: np.mean(bootstrap(data, boot_iter,
-                                                       bootfunc=np.std))
+        for i, bin_vals in enumerate(np.split(vals[order],
+                                              np.cumsum(bin_cts)[:-1])):
+            if bin_vals.size > 0:
+                out[i] = func(bin_vals)
 
-        ps1D_stddev = binned_statistic(dist_arr[finite_mask].ravel(),
-                                       psd2[finite_mask].ravel(),
-                                       bins=bins,
-                                       statistic=stat_func)[0]
+        if np.ndim(psd2) == 2:
+            return out
 
-        # We're dealing with variations in the number of samples for each bin.
-        # Add a correction based on the t distribution
-        bin_cts = binned_statistic(dist_arr[finite_mask].ravel(),
-                                   psd2[finite_mask].ravel(),
-                                   bins=bins,
-                                   statistic='count')[0]
+        return out.reshape((num_spec, self.nbins))
 
-        # Two-tail CI for 85% (~1 sigma)
-        alpha = 1 - (0.15 / 2.)
+    def bootstrap_stddev(self, psd2, boot_iter, seed=None):
+        '''
+        Bootstrap estimate of the standard deviation in each bin. This is
+        the mean standard deviation of `boot_iter` resamples, with
+        replacement, of the finite values in each bin.
 
-        # Correction factor to convert to the standard error
-        A = t_dist.ppf(alpha, bin_cts - 1) / np.sqrt(bin_cts)
+        The pixels are sorted by bin once, and the resampled positions for
+        every bin are drawn together as one integer array per iteration.
 
-        # If the standard error is larger than the standard deviation,
-        # use it instead
-        ps1D_stddev[A > 1] *= A[A > 1]
+        Parameters
+        ----------
+        psd2 : np.ndarray
+            2D spectrum, or a 3D stack of 2D spectra.
+        boot_iter : int
+            Number of bootstrap iterations.
+        seed : int, optional
+            Seed for the random resampling.
 
-        # Mask out bins that have 1 or fewer points
-        mask = bin_cts <= 1
+        Returns
+        -------
+        stddevs : np.ndarray
+            Bootstrap standard deviation in each bin. Empty bins are NaN.
+            For a stack, the shape is (n, nbins).
+        '''
 
-        ps1D_stddev[mask] = np.nan
-        ps1D[mask] = np.nan
+        vals, bin_idx, num_spec = self._finite_values(psd2)
 
-        # ps1D_stddev[ps1D_stddev == 0.] = np.nan
+        num_bins = num_spec * self.nbins
 
+        # Each bin is a contiguous block of the sorted values.
+        order = np.argsort(bin_idx, kind='mergesort')
+        vals = vals[order]
+        bin_idx = bin_idx[order]
+
+        bin_cts = np.bincount(bin_idx, minlength=num_bins)
+        bin_starts = np.cumsum(bin_cts) - bin_cts
+
+        # A resampled value for a pixel is drawn from the block of its bin.
+        pix_starts = bin_starts[bin_idx]
+        pix_cts = bin_cts[bin_idx]
+
+        rng = np.random.RandomState(seed)
+
+        # Resample several iterations at once while limiting the memory.
+        batch_size = min(boot_iter, max(1, _BOOT_MAX_DRAWS // max(vals.size,
+                                                                  1)))
+
+        boot_std_sum = np.zeros(num_bins)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for start in range(0, boot_iter, batch_size):
+                num_iter = min(batch_size, boot_iter - start)
+
+                draws = (rng.random_sample((num_iter, vals.size)) *
+                         pix_cts).astype(np.intp)
+                # Guard against rounding up to the bin size.
+                draws = pix_starts + np.minimum(draws, pix_cts - 1)
+
+                resamp = vals[draws]
+
+                iter_bins = bin_idx + \
+                    num_bins * np.arange(num_iter)[:, np.newaxis]
+                iter_cts = np.tile(bin_cts, num_iter)
+
+                means = np.bincount(iter_bins.ravel(),
+                                    weights=resamp.ravel(),
+                                    minlength=num_iter * num_bins) / iter_cts
+
+                sq_resid = np.bincount(iter_bins.ravel(),
+                                       weights=(resamp -
+                                                means[iter_bins]).ravel()**2,
+                                       minlength=num_iter * num_bins)
+
+                boot_stds = np.sqrt(sq_resid / iter_cts)
+
+                boot_std_sum += boot_stds.reshape((num_iter, num_bins)).sum(0)
+
+        stddevs = boot_std_sum / boot_iter
+
+        if np.ndim(psd2) == 2:
+            return stddevs
+
+        return stddevs.reshape((num_spec, self.nbins))
+
+
+# Binners are cached since the same spectrum shape and bins are typically
+# used for many spectra.
+_binner_cache = OrderedDict()
+_binner_lock = threading.Lock()
+_BINNER_CACHE_SIZE = 16
+
+# Largest number of values resampled at once in
+# `RadialBinner.bootstrap_stddev`.
+_BOOT_MAX_DRAWS = 2**22
+
+
+def get_radial_binner(shape, bins, return_freqs=True, theta_0=None,
+                      delta_theta=None, rfft=False):
+    '''
+    Return a `RadialBinner` from the cache, or create a new one. The
+    least recently used binners are removed when the cache is full.
+
+    Parameters
+    ----------
+    shape : tuple
+        Shape of the full 2D spectrum.
+    bins : np.ndarray
+        Edges of the radial bins.
+    return_freqs : bool, optional
+        The bins are in spatial frequency.
+    theta_0 : `~astropy.units.Quantity`, optional
+        The center angle of the azimuthal mask.
+    delta_theta : `~astropy.units.Quantity`, optional
+        The width of the azimuthal mask.
+    rfft : bool, optional
+        The spectra are the unshifted half-plane of an rfft.
+
+    Returns
+    -------
+    binner : `RadialBinner`
+    '''
+
+    bins = np.asarray(bins, dtype=float)
+
+    if theta_0 is not None:
+        theta_key = (theta_0.to(u.rad).value, delta_theta.to(u.rad).value)
+    else:
+        theta_key = None
+
+    key = (tuple(shape), bins.tobytes(), bool(return_freqs), theta_key,
+           bool(rfft))
+
+    with _binner_lock:
+        binner = _binner_cache.pop(key, None)
+
+    if binner is None:
         if theta_0 is not None:
-            return bin_cents, ps1D, ps1D_stddev, azim_mask
+            azim_mask = _azimuthal_mask(shape, theta_0, delta_theta)
         else:
-            return bin_cents, ps1D, ps1D_stddev
+            azim_mask = None
+
+        binner = RadialBinner(shape, bins, return_freqs=return_freqs,
+                              azim_mask=azim_mask, rfft=rfft)
+
+    with _binner_lock:
+        _binner_cache[key] = binner
+
+        while len(_binner_cache) > _BINNER_CACHE_SIZE:
+            _binner_cache.popitem(last=False)
+
+    return binner
+
+
+def clear_radial_binner_cache():
+    '''
+    Remove all cached `RadialBinner` objects.
+    '''
+    with _binner_lock:
+        _binner_cache.clear()
+
+
+def _bin_index(values, bins):
+    '''
+    Bin numbers of the values, following `~scipy.stats.binned_statistic`.
+    Values in the last bin edge are included in the last bin. Values
+    outside of the bins have numbers 0 or len(bins).
+    '''
+
+    bin_idx = np.digitize(values, bins)
+
+    decimal = int(-np.log10(np.diff(bins).min())) + 6
+    on_edge = np.logical_and(values >= bins[-1],
+                             np.around(values, decimal) ==
+                             np.around(bins[-1], decimal))
+    bin_idx[on_edge] -= 1
+
+    return bin_idx
 
 
 def make_radial_arrays(shape, y_center=None, x_center=None):
@@ -8,15 +8,9 @@ from scipy.stats import binned_statistic
 from warnings import warn
 from astropy.utils.console import ProgressBar
 from astropy.utils import NumpyRNGContext
-from itertools import product
-
-try:
-    from pyfftw.interfaces.numpy_fft import fft2
-    PYFFTW_FLAG = True
-except ImportError:
-    PYFFTW_FLAG = False
 
 from ..base_statistic import BaseStatisticMixIn
+from ...fft import _legacy_backend
 from ...io import common_types, twod_types, input_data
 from ..psds import make_radial_arrays
 
@@ -63,7 +57,8 @@ class Bispectrum(BaseStatisticMixIn):
 
     def compute_bispectrum(self, show_progress=True, use_pyfftw=False,
                            threads=1, nsamples=100, seed=1000,
-                           mean_subtract=False, **pyfftw_kwargs):
+                           mean_subtract=False, method='sample',
+                           chunk_size=None, **pyfftw_kwargs):
         '''
         Do the computation.
 
@@ -84,82 +79,54 @@ class Bispectrum(BaseStatisticMixIn):
             Subtract the mean from the data before computing. This removes the
             "zero frequency" (i.e., constant) portion of the power, resulting
             in a loss of phase coherence along the k_1=k_2 line.
+        method : {"sample", "exact"}, optional
+            "sample" estimates the bispectrum from `nsamples` random
+            orientations of k_1 and k_2 at each pair of magnitudes. "exact"
+            sums over every vector in shells of integer wavenumber using
+            shell-filtered images, so there is no sampling noise and
+            `nsamples` and `seed` are not used. The exact bispectrum is the
+            mean over all triangles, rather than a sum over samples, so it
+            differs in scale from "sample". The bicoherence is comparable
+            between the two methods.
+        chunk_size : int, optional
+            For "sample", the number of (k_1, k_2) pairs that are sampled
+            together. Larger chunks are faster but need memory for
+            `chunk_size * nsamples` samples. Defaults to keeping ~10^6
+            samples per chunk. For "exact", the number of shell images kept
+            in memory at once. Defaults to keeping ~3x10^7 pixels per set
+            of shells.
         pyfft_kwargs : Passed to
             `~turbustat.statistics.rfft_to_fft.rfft_to_fft`. See
             `here <https://hgomersall.github.io/pyFFTW/pyfftw/interfaces/interfaces.html#interfaces-additional-args>`_
             for a list of accepted kwargs.
         '''
 
+        if method not in ["sample", "exact"]:
+            raise ValueError("method must be 'sample' or 'exact'.")
+
         if mean_subtract:
             norm_data = self.data - self.data.mean()
         else:
             norm_data = self.data
 
-        if use_pyfftw:
-            if PYFFTW_FLAG:
-                if pyfftw_kwargs.get('threads') is not None:
-                    pyfftw_kwargs.pop('threads')
-
-                fftarr = fft2(norm_data,
-                              threads=threads,
-                              **pyfftw_kwargs)
-            else:
-                warn("pyfftw not installed. Reverting to using numpy.")
-                use_pyfftw = False
-
-        if not use_pyfftw:
-            fftarr = np.fft.fft2(norm_data)
+        backend = _legacy_backend(use_pyfftw=use_pyfftw, threads=threads,
+                                  **pyfftw_kwargs)
 
-        conjfft = np.conj(fftarr)
+        fftarr = backend.fft2(norm_data)
 
         bispec_shape = (int(self.shape[0] / 2.), int(self.shape[1] / 2.))
 
-        self._bispectrum = np.zeros(bispec_shape, dtype=complex)
-        self._bicoherence = np.zeros(bispec_shape, dtype=float)
-        self._tracker = np.zeros(self.shape, dtype=np.int16)
-
-        biconorm = np.ones_like(self.bispectrum, dtype=float)
-
-        if show_progress:
-            bar = ProgressBar(np.prod(fftarr.shape) / 4.)
-
-        prod = product(range(int(fftarr.shape[0] / 2.)),
-                       range(int(fftarr.shape[1] / 2.)))
-
-        with NumpyRNGContext(seed):
-            for n, (k1mag, k2mag) in enumerate(prod):
-                phi1 = ra.uniform(0, 2 * np.pi, nsamples)
-                phi2 = ra.uniform(0, 2 * np.pi, nsamples)
-
-                k1x = np.asarray([int(k1mag * np.cos(angle))
-                                  for angle in phi1])
-                k2x = np.asarray([int(k2mag * np.cos(angle))
-                                  for angle in phi2])
-                k1y = np.asarray([int(k1mag * np.sin(angle))
-                                  for angle in phi1])
-                k2y = np.asarray([int(k2mag * np.sin(angle))
-                                  for angle in phi2])
-
-                k3x = np.asarray([int(k1mag * np.cos(ang1) +
-                                      k2mag * np.cos(ang2))
-                                  for ang1, ang2 in zip(phi1, phi2)])
-                k3y = np.asarray([int(k1mag * np.sin(ang1) +
-                                      k2mag * np.sin(ang2))
-                                  for ang1, ang2 in zip(phi1, phi2)])
-
-                samps = fftarr[k1x, k1y] * fftarr[k2x, k2y] * conjfft[k3x, k3y]
-
-                self._bispectrum[k1mag, k2mag] = np.sum(samps)
-
-                biconorm[k1mag, k2mag] = np.sum(np.abs(samps))
-
-                # Track where we're sampling from in fourier space
-                self._tracker[k1x, k1y] += 1
-                self._tracker[k2x, k2y] += 1
-                self._tracker[k3x, k3y] += 1
-
-                if show_progress:
-                    bar.update(n + 1)
+        if method == "sample":
+            self._bispectrum, biconorm, self._tracker = \
+                _sample_bispectrum(fftarr, bispec_shape, nsamples=nsamples,
+                                   seed=seed, chunk_size=chunk_size,
+                                   show_progress=show_progress)
+        else:
+            self._bispectrum, biconorm, self._tracker = \
+                _shell_bispectrum(fftarr, bispec_shape,
+                                  chunk_size=chunk_size,
+                                  show_progress=show_progress,
+                                  backend=backend)
 
         self._bicoherence = (np.abs(self.bispectrum) / biconorm)
         self._bispectrum_amp = np.log10(np.abs(self.bispectrum))
@@ -460,7 +427,8 @@ class Bispectrum(BaseStatisticMixIn):
 
     def run(self, show_progress=True, use_pyfftw=False, threads=1,
             nsamples=100, seed=1000,
-            mean_subtract=False, verbose=False,
+            mean_subtract=False, method='sample', chunk_size=None,
+            verbose=False,
             save_name=None, **pyfftw_kwargs):
         '''
         Compute the bispectrum. Necessary to maintain package standards.
@@ -479,6 +447,10 @@ class Bispectrum(BaseStatisticMixIn):
             See `~BiSpectrum.compute_bispectrum`.
         mean_subtract : bool, optional
             See `~BiSpectrum.compute_bispectrum`.
+        method : {"sample", "exact"}, optional
+            See `~BiSpectrum.compute_bispectrum`.
+        chunk_size : int, optional
+            See `~BiSpectrum.compute_bispectrum`.
         verbose : bool, optional
             Enables plotting.
         save_name : str,optional
@@ -494,6 +466,7 @@ class Bispectrum(BaseStatisticMixIn):
                                 threads=threads,
                                 nsamples=nsamples,
                                 mean_subtract=mean_subtract,
+                                method=method, chunk_size=chunk_size,
                                 seed=seed, **pyfftw_kwargs)
 
         if verbose:
@@ -502,6 +475,204 @@ class Bispectrum(BaseStatisticMixIn):
         return self
 
 
+def _sample_bispectrum(fftarr, bispec_shape, nsamples=100, seed=1000,
+                       chunk_size=None, show_progress=True):
+    '''
+    Monte Carlo estimate of the bispectrum. For each (k_1, k_2) magnitude
+    pair, `nsamples` random orientations of the two vectors are summed.
+
+    Returns
+    -------
+    bispectrum : `~numpy.ndarray`
+        Summed bispectrum samples.
+    biconorm : `~numpy.ndarray`
+        Summed amplitudes of the samples, used to normalize the
+        bicoherence.
+    tracker : `~numpy.ndarray`
+        Number of times each position in Fourier space is sampled.
+    '''
+
+    conjfft = np.conj(fftarr)
+
+    num_pairs = bispec_shape[0] * bispec_shape[1]
+
+    bispectrum = np.zeros(bispec_shape, dtype=complex)
+    biconorm = np.ones(bispec_shape, dtype=float)
+
+    # Number of times each position in Fourier space is sampled
+    tracker_counts = np.zeros(fftarr.size, dtype=int)
+
+    if chunk_size is None:
+        chunk_size = max(1, 2**20 // nsamples)
+
+    if show_progress:
+        bar = ProgressBar(num_pairs)
+
+    with NumpyRNGContext(seed):
+        for start in range(0, num_pairs, chunk_size):
+            stop = min(start + chunk_size, num_pairs)
+
+            # Same ordering as looping over product(k1mag, k2mag)
+            k1mag, k2mag = np.unravel_index(np.arange(start, stop),
+                                            bispec_shape)
+            k1mag = k1mag[:, np.newaxis]
+            k2mag = k2mag[:, np.newaxis]
+
+            # Draw phi1 and phi2 for each pair in turn so the random
+            # stream matches sampling one pair at a time.
+            phis = ra.uniform(0, 2 * np.pi, (stop - start, 2, nsamples))
+            phi1 = phis[:, 0]
+            phi2 = phis[:, 1]
+
+            k1x_flt = k1mag * np.cos(phi1)
+            k1y_flt = k1mag * np.sin(phi1)
+            k2x_flt = k2mag * np.cos(phi2)
+            k2y_flt = k2mag * np.sin(phi2)
+
+            # Truncate towards zero, as int() does
+            k1x = k1x_flt.astype(int)
+            k1y = k1y_flt.astype(int)
+            k2x = k2x_flt.astype(int)
+            k2y = k2y_flt.astype(int)
+            k3x = (k1x_flt + k2x_flt).astype(int)
+            k3y = (k1y_flt + k2y_flt).astype(int)
+
+            samps = fftarr[k1x, k1y] * fftarr[k2x, k2y] * \
+                conjfft[k3x, k3y]
+
+            bispectrum.flat[start:stop] = np.sum(samps, axis=1)
+
+            biconorm.flat[start:stop] = np.sum(np.abs(samps), axis=1)
+
+            # Track where we're sampling from in fourier space. Each
+            # position is counted once per k vector and (k1, k2) pair.
+            posns = np.stack([np.ravel_multi_index((kx, ky),
+                                                   fftarr.shape,
+                                                   mode='wrap')
+                              for kx, ky in [(k1x, k1y), (k2x, k2y),
+                                             (k3x, k3y)]], axis=1)
+            posns.sort(axis=-1)
+            unique_posn = np.ones_like(posns, dtype=bool)
+            unique_posn[..., 1:] = posns[..., 1:] != posns[..., :-1]
+
+            tracker_counts += np.bincount(posns[unique_posn],
+                                          minlength=fftarr.size)
+
+            if show_progress:
+                bar.update(stop)
+
+    tracker = tracker_counts.reshape(fftarr.shape).astype(np.int16)
+
+    return bispectrum, biconorm, tracker
+
+
+def _shell_bispectrum(fftarr, bispec_shape, chunk_size=None,
+                      show_progress=True, backend=None):
+    r'''
+    Exact isotropic bispectrum from shell-filtered fields.
+
+    The Fourier transform is split into shells of integer wavenumber. The
+    inverse transform of each shell, a_k(x), is real for a real image.
+    Summing over every k_1 and k_2 vector in two shells then reduces to a
+    sum over pixels:
+
+    .. math::
+        \sum_{k_1, k_2} F(k_1) F(k_2) F^*(k_1 + k_2) =
+            N^2 \sum_x a_{k_1}(x) a_{k_2}(x) I(x)
+
+    The normalization for the bicoherence uses the same identity with
+    the Fourier amplitudes. Both are divided by the number of vector pairs,
+    so the bispectrum is the mean over all triangles in the two shells.
+
+    Returns
+    -------
+    bispectrum : `~numpy.ndarray`
+        Mean of the bispectrum over all triangles for each shell pair.
+    biconorm : `~numpy.ndarray`
+        Mean amplitude over all triangles for each shell pair.
+    tracker : `~numpy.ndarray`
+        Number of shell pairs that each position in Fourier space
+        contributes to as k_1 or k_2.
+    '''
+
+    ky = np.fft.fftfreq(fftarr.shape[0]) * fftarr.shape[0]
+    kx = np.fft.fftfreq(fftarr.shape[1]) * fftarr.shape[1]
+    shells = np.floor(np.sqrt(ky[:, np.newaxis]**2 +
+                              kx[np.newaxis]**2) + 0.5).astype(int)
+
+    amps = np.abs(fftarr)
+
+    # Third leg of the triangle in real space. Both are real for a real image.
+    if backend is None:
+        backend = _legacy_backend()
+
+    img_field = backend.ifft2(fftarr).real.ravel()
+    amp_field = backend.ifft2(amps).real.ravel()
+
+    num_pix = fftarr.size
+
+    if chunk_size is None:
+        chunk_size = max(1, 2**25 // num_pix)
+
+    def shell_fields(arr, shell_nums):
+        fields = np.where(shells == shell_nums[:, np.newaxis, np.newaxis],
+                          arr, 0.)
+        return backend.ifft2(fields).real.reshape(len(shell_nums), num_pix)
+
+    counts = np.bincount(shells.ravel(), minlength=max(bispec_shape))
+    num_pairs = np.outer(counts[:bispec_shape[0]],
+                         counts[:bispec_shape[1]]).astype(float)
+
+    bispectrum = np.zeros(bispec_shape, dtype=complex)
+    biconorm = np.zeros(bispec_shape, dtype=float)
+
+    k2_shells = np.arange(bispec_shape[1])
+    if chunk_size >= bispec_shape[1]:
+        k2_fields = [(slice(None), shell_fields(fftarr, k2_shells),
+                      shell_fields(amps, k2_shells))]
+    else:
+        k2_fields = None
+
+    if show_progress:
+        bar = ProgressBar(bispec_shape[0])
+
+    for start in range(0, bispec_shape[0], chunk_size):
+        stop = min(start + chunk_size, bispec_shape[0])
+        k1_shells = np.arange(start, stop)
+
+        k1_img = shell_fields(fftarr, k1_shells) * img_field
+        k1_amp = shell_fields(amps, k1_shells) * amp_field
+
+        if k2_fields is None:
+            k2_iter = ((slice(j, j + chunk_size),
+                        shell_fields(fftarr, k2_shells[j:j + chunk_size]),
+                        shell_fields(amps, k2_shells[j:j + chunk_size]))
+                       for j in range(0, bispec_shape[1], chunk_size))
+        else:
+            k2_iter = k2_fields
+
+        for k2_slice, k2_img, k2_amp in k2_iter:
+            bispectrum[start:stop, k2_slice] = \
+                num_pix**2 * np.dot(k1_img, k2_img.T)
+            biconorm[start:stop, k2_slice] = \
+                num_pix**2 * np.dot(k1_amp, k2_amp.T)
+
+        if show_progress:
+            bar.update(stop)
+
+    bispectrum /= num_pairs
+    biconorm /= num_pairs
+
+    # Shell pairs each position is part of, as k_1 and as k_2.
+    tracker = np.zeros(fftarr.shape, dtype=np.int16)
+    in_k1 = shells < bispec_shape[0]
+    in_k2 = shells < bispec_shape[1]
+    tracker[in_k1] += bispec_shape[1]
+    tracker[in_k2] += bispec_shape[0]
+
+    return bispectrum, biconorm, tracker
+
+
 def BiSpectrum(*args, **kwargs):
     '''
     Old name for the Bispectrum class.
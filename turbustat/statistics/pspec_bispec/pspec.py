@@ -2,7 +2,6 @@
 from __future__ import print_function, absolute_import, division
 
 import numpy as np
-from numpy.fft import fftshift
 import astropy.units as u
 from warnings import warn
 from copy import copy
@@ -106,17 +105,19 @@ class PowerSpectrum(BaseStatisticMixIn, StatisticBase_PSpec2D):
         if pyfftw_kwargs.get('threads') is not None:
             pyfftw_kwargs.pop('threads')
 
-        fft = fftshift(rfft_to_fft(data, use_pyfftw=use_pyfftw,
-                                   threads=threads,
-                                   **pyfftw_kwargs))
+        # Only the rfft half-plane is kept. The full 2D power spectrum is
+        # given by `ps2D`.
+        fft = rfft_to_fft(data, keep_rfft=True, use_pyfftw=use_pyfftw,
+                          threads=threads, **pyfftw_kwargs)
 
-        self._ps2D = np.power(fft, 2.)
+        self._ps2D_rfft = np.power(fft, 2.)
+        self._ps2D_shape = data.shape
 
         if beam_correct:
             self.compute_beam_pspec()
 
         if beam_correct:
-            self._ps2D /= self._beam_pow
+            self._ps2D_rfft /= self._beam_pow
 
     def run(self, verbose=False, beam_correct=False,
             apodize_kernel=None, alpha=0.2, beta=0.0,
@@ -2,13 +2,8 @@
 from __future__ import print_function, absolute_import, division
 
 import numpy as np
-from warnings import warn
 
-try:
-    from pyfftw.interfaces.numpy_fft import rfftn
-    PYFFTW_FLAG = True
-except ImportError:
-    PYFFTW_FLAG = False
+from ..fft import _legacy_backend
 
 
 '''
@@ -33,10 +28,11 @@ def rfft_to_fft(image, keep_rfft=False, use_pyfftw=False,
         Return the rfft output instead of expanding to the
         negative frequencies of the full FFT.
     use_pyfftw : bool, optional
-        Try using pyfftw for the FFT.
+        Try using pyfftw for the FFT. Otherwise, the default backend from
+        `~turbustat.fft` is used.
     threads : int, optional
         Number of threads to use when using pyfftw. Default is 1.
-    pyfftw_kwargs : Passed to `~pyfftw.interfaces.numpy_fft.rfftn`.
+    pyfftw_kwargs : Passed to `~turbustat.fft.PyFFTWBackend`.
 
     Outputs
     -------
@@ -50,36 +46,52 @@ def rfft_to_fft(image, keep_rfft=False, use_pyfftw=False,
 
     last_dim = image.shape[-1]
 
-    if use_pyfftw:
-        if PYFFTW_FLAG:
-            fft_abs = np.abs(rfftn(image, **pyfftw_kwargs))
-        else:
-            use_pyfftw = False
-            warn("pyfftw is not installed")
+    backend = _legacy_backend(use_pyfftw=use_pyfftw, threads=threads,
+                              **pyfftw_kwargs)
 
-    if not use_pyfftw:
-        fft_abs = np.abs(np.fft.rfftn(image))
+    fft_abs = np.abs(backend.rfftn(image))
 
     if keep_rfft:
         return fft_abs
 
-    if ndim == 2:
-        if last_dim % 2 == 0:
-            fftstar_abs = fft_abs.copy()[:, -2:0:-1]
-        else:
-            fftstar_abs = fft_abs.copy()[:, -1:0:-1]
+    return expand_rfft(fft_abs, last_dim)
 
-        fftstar_abs[1::, :] = fftstar_abs[:0:-1, :]
 
-        return np.concatenate((fft_abs, fftstar_abs), axis=1)
+def expand_rfft(rfft_arr, last_dim):
+    '''
+    Expand the real-valued output of an rfft (e.g., the absolute value or
+    the power) to the full FFT shape using the Hermitian symmetry. The
+    output array is allocated once and filled in place.
+
+    Parameters
+    ----------
+    rfft_arr : numpy.ndarray
+        2 or 3D array of the rfft half-space, with the last axis halved.
+    last_dim : int
+        Size of the last axis of the original array.
+
+    Returns
+    -------
+    full_arr : numpy.ndarray
+        Array with the negative frequencies of the full FFT.
+    '''
+
+    ndim = rfft_arr.ndim
+
+    if ndim < 2 or ndim > 3:
+        raise TypeError("Dimension of image must be 2D or 3D.")
+
+    num_half = rfft_arr.shape[-1]
+
+    full_arr = np.empty(rfft_arr.shape[:-1] + (last_dim,),
+                        dtype=rfft_arr.dtype)
+
+    full_arr[..., :num_half] = rfft_arr
 
-    elif ndim == 3:
-        if last_dim % 2 == 0:
-            fftstar_abs = fft_abs.copy()[:, :, -2:0:-1]
-        else:
-            fftstar_abs = fft_abs.copy()[:, :, -1:0:-1]
+    # The negative frequencies are the positive frequencies at -k.
+    mirror_idx = [(-np.arange(size)) % size for size in rfft_arr.shape[:-1]]
+    mirror_idx.append(last_dim - np.arange(num_half, last_dim))
 
-        fftstar_abs[1::, :, :] = fftstar_abs[:0:-1, :, :]
-        fftstar_abs[:, 1::, :] = fftstar_abs[:, :0:-1, :]
+    full_arr[..., num_half:] = rfft_arr[np.ix_(*mirror_idx)]
 
-        return np.concatenate((fft_abs, fftstar_abs), axis=2)
+    return full_arr
@@ -9,6 +9,8 @@ import statsmodels.api as sm
 from warnings import warn
 from astropy.utils.console import ProgressBar
 from itertools import product
+from concurrent.futures import ThreadPoolExecutor
+import os
 
 from ..psds import pspec, make_radial_arrays
 from ..base_statistic import BaseStatisticMixIn
@@ -148,7 +150,8 @@ class SCF(BaseStatisticMixIn):
         '''
         return self._lags
 
-    def compute_surface(self, boundary='continuous', show_progress=True):
+    def compute_surface(self, boundary='continuous', show_progress=True,
+                        method='shift', n_jobs=1):
         '''
         Computes the SCF up to the given lag value. This is an
         expensive operation and could take a long time to calculate.
@@ -159,12 +162,33 @@ class SCF(BaseStatisticMixIn):
             Treat the boundary as continuous (wrap-around) or cut values
             beyond the edge (i.e., for most observational data).
         show_progress : bool, optional
-            Show a progress bar when computing the surface. =
+            Show a progress bar when computing the surface.
+        method : {"shift", "precompute"}, optional
+            "shift" shifts the whole cube for every lag. "precompute"
+            creates NaN-filled and weight cubes once, padded to the largest
+            lag, and evaluates each integer lag from views into them. This
+            avoids copying the cube for every lag and is much faster for
+            large cubes, at the cost of holding up to three padded copies of
+            the cube in memory. Non-integer lags always use "shift".
+        n_jobs : int, optional
+            Number of threads used to evaluate the lags in parallel. All
+            threads read the same cube in memory, so the data are not copied
+            for each worker. Use -1 for the number of CPUs. The surface is
+            identical to the serial result.
         '''
 
         if boundary not in ["continuous", "cut"]:
             raise ValueError("boundary must be 'continuous' or 'cut'.")
 
+        if method not in ["shift", "precompute"]:
+            raise ValueError("method must be 'shift' or 'precompute'.")
+
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+
+        if n_jobs < 1:
+            raise ValueError("n_jobs must be a positive integer or -1.")
+
         self._scf_surface = np.zeros((self.size, self.size))
 
         # Convert the lags into pixel units.
@@ -173,74 +197,47 @@ class SCF(BaseStatisticMixIn):
         dx = pix_lags.copy()
         dy = pix_lags.copy()
 
-        if show_progress:
-            bar = ProgressBar(len(dx) * len(dy))
+        if method == "precompute":
+            precomp = _precompute_scf_arrays(self.data, pix_lags)
 
-        for n, (x_shift, y_shift) in enumerate(product(dx, dy)):
+        def lag_value(shifts):
+            x_shift, y_shift = shifts
 
-            i, j = np.unravel_index(n, (len(dx), len(dy)))
+            is_integer = float(x_shift).is_integer() and \
+                float(y_shift).is_integer()
 
-            if x_shift == 0 and y_shift == 0:
-                self._scf_surface[j, i] = 1.
-
-            if x_shift == 0:
-                tmp = self.data
+            if method == "precompute" and is_integer:
+                values = _scf_values_precomputed(precomp,
+                                                 int(x_shift), int(y_shift),
+                                                 boundary)
             else:
-                if float(x_shift).is_integer():
-                    shift_func = pixel_shift
-                else:
-                    shift_func = fourier_shift
-                tmp = shift_func(self.data, x_shift, axis=1)
-
-            if y_shift != 0:
-                if float(y_shift).is_integer():
-                    shift_func = pixel_shift
-                else:
-                    shift_func = fourier_shift
-                tmp = shift_func(tmp, y_shift, axis=2)
-
-            if boundary is "cut":
-                # Always round up to the nearest integer.
-                x_shift = np.ceil(x_shift).astype(int)
-                y_shift = np.ceil(y_shift).astype(int)
-                if x_shift < 0:
-                    x_slice_data = slice(None, tmp.shape[1] + x_shift)
-                    x_slice_tmp = slice(-x_shift, None)
-                else:
-                    x_slice_data = slice(x_shift, None)
-                    x_slice_tmp = slice(None, tmp.shape[1] - x_shift)
+                values = _scf_values_shift(self.data, x_shift, y_shift,
+                                           boundary)
 
-                if y_shift < 0:
-                    y_slice_data = slice(None, tmp.shape[2] + y_shift)
-                    y_slice_tmp = slice(-y_shift, None)
-                else:
-                    y_slice_data = slice(y_shift, None)
-                    y_slice_tmp = slice(None, tmp.shape[2] - y_shift)
+            return _scf_from_values(values)
 
-                data_slice = (slice(None), x_slice_data, y_slice_data)
-                tmp_slice = (slice(None), x_slice_tmp, y_slice_tmp)
-            elif boundary is "continuous":
-                data_slice = (slice(None),) * 3
-                tmp_slice = (slice(None),) * 3
+        if show_progress:
+            bar = ProgressBar(len(dx) * len(dy))
 
-            values = \
-                np.nansum(((self.data[data_slice] - tmp[tmp_slice]) ** 2),
-                          axis=0) / \
-                (np.nansum(self.data[data_slice] ** 2, axis=0) +
-                 np.nansum(tmp[tmp_slice] ** 2, axis=0))
+        if n_jobs == 1:
+            executor = None
+            scf_values = map(lag_value, product(dx, dy))
+        else:
+            executor = ThreadPoolExecutor(max_workers=n_jobs)
+            scf_values = executor.map(lag_value, product(dx, dy))
 
-            scf_value = 1. - \
-                np.sqrt(np.nansum(values) / np.sum(np.isfinite(values)))
+        try:
+            for n, scf_value in enumerate(scf_values):
 
-            if scf_value > 1:
-                raise ValueError("Cannot have a correlation above 1. Check "
-                                 "your input data. Contact the TurbuStat "
-                                 "authors if the problem persists.")
+                i, j = np.unravel_index(n, (len(dx), len(dy)))
 
-            self._scf_surface[j, i] = scf_value
+                self._scf_surface[j, i] = scf_value
 
-            if show_progress:
-                bar.update(n + 1)
+                if show_progress:
+                    bar.update(n + 1)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
 
     def compute_spectrum(self, **kwargs):
         '''
@@ -746,7 +743,7 @@ class SCF(BaseStatisticMixIn):
         else:
             plt.show()
 
-    def run(self, boundary='continuous',
+    def run(self, boundary='continuous', method='shift', n_jobs=1,
             show_progress=True, xlow=None, xhigh=None,
             fit_kwargs={}, fit_2D=True,
             fit_2D_kwargs={}, radialavg_kwargs={},
@@ -759,6 +756,10 @@ class SCF(BaseStatisticMixIn):
         boundary : {"continuous", "cut"}
             Treat the boundary as continuous (wrap-around) or cut values
             beyond the edge (i.e., for most observational data).
+        method : {"shift", "precompute"}, optional
+            See `~SCF.compute_surface`.
+        n_jobs : int, optional
+            See `~SCF.compute_surface`.
         show_progress : bool, optional
             Show a progress bar during the creation of the covariance matrix.
         xlow : `~astropy.Quantity`, optional
@@ -783,7 +784,8 @@ class SCF(BaseStatisticMixIn):
             Save the figure when a file name is given.
         '''
 
-        self.compute_surface(boundary=boundary, show_progress=show_progress)
+        self.compute_surface(boundary=boundary, method=method,
+                             n_jobs=n_jobs, show_progress=show_progress)
         self.compute_spectrum(**radialavg_kwargs)
         self.fit_plaw(verbose=verbose, xlow=xlow, xhigh=xhigh, **fit_kwargs)
 
@@ -824,12 +826,19 @@ class SCF_Distance(object):
         beyond the edge (i.e., for most observational data). A two element
         list can also be passed for treating the boundaries differently
         between the given cubes.
+    show_progress : bool, optional
+        Show a progress bar when computing the surfaces.
+    method : {"shift", "precompute"}, optional
+        See `~SCF.compute_surface`.
+    n_jobs : int, optional
+        Number of threads used to compute each surface. See
+        `~SCF.compute_surface`.
     '''
 
     __doc__ %= {"dtypes": " or ".join(common_types + threed_types)}
 
     def __init__(self, cube1, cube2, size=11, boundary='continuous',
-                 show_progress=True):
+                 show_progress=True, method='shift', n_jobs=1):
 
         if isinstance(cube1, SCF):
             self.scf1 = cube1
@@ -916,7 +925,8 @@ class SCF_Distance(object):
 
         if needs_run1:
             self.scf1.compute_surface(boundary=boundary[0],
-                                      show_progress=show_progress)
+                                      show_progress=show_progress,
+                                      method=method, n_jobs=n_jobs)
             # This is for the plot, not the distance, so stick with default
             # params
             self.scf1.compute_spectrum()
@@ -947,7 +957,8 @@ class SCF_Distance(object):
 
         if needs_run2:
             self.scf2.compute_surface(boundary=boundary[1],
-                                      show_progress=show_progress)
+                                      show_progress=show_progress,
+                                      method=method, n_jobs=n_jobs)
             # This is for the plot, not the distance, so stick with default
             # params
             self.scf2.compute_spectrum()
@@ -1080,3 +1091,184 @@ class SCF_Distance(object):
                 plt.show()
 
         return self
+
+
+def _scf_from_values(values):
+    '''
+    Reduce the per-pixel SCF terms for one lag to the SCF value.
+    '''
+
+    scf_value = 1. - \
+        np.sqrt(np.nansum(values) / np.sum(np.isfinite(values)))
+
+    if scf_value > 1:
+        raise ValueError("Cannot have a correlation above 1. Check "
+                         "your input data. Contact the TurbuStat "
+                         "authors if the problem persists.")
+
+    return scf_value
+
+
+def _cut_slices(shape, x_shift, y_shift):
+    '''
+    Slices of the data and the shifted cube that are compared when the
+    boundary is cut.
+    '''
+
+    # Always round up to the nearest integer.
+    x_shift = np.ceil(x_shift).astype(int)
+    y_shift = np.ceil(y_shift).astype(int)
+    if x_shift < 0:
+        x_slice_data = slice(None, shape[1] + x_shift)
+        x_slice_tmp = slice(-x_shift, None)
+    else:
+        x_slice_data = slice(x_shift, None)
+        x_slice_tmp = slice(None, shape[1] - x_shift)
+
+    if y_shift < 0:
+        y_slice_data = slice(None, shape[2] + y_shift)
+        y_slice_tmp = slice(-y_shift, None)
+    else:
+        y_slice_data = slice(y_shift, None)
+        y_slice_tmp = slice(None, shape[2] - y_shift)
+
+    data_slice = (slice(None), x_slice_data, y_slice_data)
+    tmp_slice = (slice(None), x_slice_tmp, y_slice_tmp)
+
+    return data_slice, tmp_slice
+
+
+def _scf_values_shift(cube, x_shift, y_shift, boundary):
+    '''
+    Per-pixel SCF terms for one lag, computed by shifting the whole cube.
+    '''
+
+    if x_shift == 0:
+        tmp = cube
+    else:
+        if float(x_shift).is_integer():
+            shift_func = pixel_shift
+        else:
+            shift_func = fourier_shift
+        tmp = shift_func(cube, x_shift, axis=1)
+
+    if y_shift != 0:
+        if float(y_shift).is_integer():
+            shift_func = pixel_shift
+        else:
+            shift_func = fourier_shift
+        tmp = shift_func(tmp, y_shift, axis=2)
+
+    if boundary == "cut":
+        data_slice, tmp_slice = _cut_slices(cube.shape, x_shift, y_shift)
+    else:
+        data_slice = (slice(None),) * 3
+        tmp_slice = (slice(None),) * 3
+
+    values = \
+        np.nansum(((cube[data_slice] - tmp[tmp_slice]) ** 2),
+                  axis=0) / \
+        (np.nansum(cube[data_slice] ** 2, axis=0) +
+         np.nansum(tmp[tmp_slice] ** 2, axis=0))
+
+    return values
+
+
+def _precompute_scf_arrays(cube, pix_lags):
+    '''
+    Create the arrays used by `_scf_values_precomputed`. The NaN-filled
+    cube, its square, the finite-value weights and the squared sum along
+    the spectral axis are wrap-padded by the largest integer lag, so that
+    any shifted cube is a view into the padded arrays.
+    '''
+
+    int_lags = [abs(int(lag)) for lag in pix_lags
+                if float(lag).is_integer()]
+    pad = max(int_lags) if len(int_lags) > 0 else 0
+
+    weights = np.isfinite(cube)
+    has_nans = not weights.all()
+
+    filled = np.where(weights, cube, 0.).astype(np.float64)
+    sq = filled ** 2
+    sqsum = sq.sum(0)
+
+    pad_width = ((0, 0), (pad, pad), (pad, pad))
+
+    precomp = {"pad": pad,
+               "has_nans": has_nans,
+               "filled": filled,
+               "sqsum": sqsum,
+               "filled_pad": np.pad(filled, pad_width, mode='wrap'),
+               "sqsum_pad": np.pad(sqsum, pad_width[1:], mode='wrap')}
+
+    if has_nans:
+        weights = weights.astype(np.float64)
+        precomp["weights"] = weights
+        precomp["sq"] = sq
+        precomp["weights_pad"] = np.pad(weights, pad_width, mode='wrap')
+        precomp["sq_pad"] = np.pad(sq, pad_width, mode='wrap')
+
+    return precomp
+
+
+def _precomputed_lag_slices(shape, shift, pad, boundary):
+    '''
+    Slices along one spatial axis of the data and of the padded arrays
+    that give the same pairs of pixels as `_scf_values_shift`.
+    '''
+
+    if boundary == "cut":
+        data_slice = slice(max(shift, 0), shape + min(shift, 0))
+        start = max(-shift, 0)
+        stop = shape - max(shift, 0)
+    else:
+        data_slice = slice(None)
+        start = 0
+        stop = shape
+
+    # The shifted cube at index i holds the original value at i - shift
+    pad_slice = slice(start - shift + pad, stop - shift + pad)
+
+    return data_slice, pad_slice
+
+
+def _scf_values_precomputed(precomp, x_shift, y_shift, boundary):
+    '''
+    Per-pixel SCF terms for an integer lag, computed from the arrays made by
+    `_precompute_scf_arrays`. The squared difference is expanded as
+    a^2 + b^2 - 2ab, where the squared terms are restricted to channels
+    finite in both cubes using the weights.
+    '''
+
+    shape = precomp["filled"].shape
+    pad = precomp["pad"]
+
+    x_data, x_pad = _precomputed_lag_slices(shape[1], x_shift, pad, boundary)
+    y_data, y_pad = _precomputed_lag_slices(shape[2], y_shift, pad, boundary)
+
+    data_slice = (slice(None), x_data, y_data)
+    pad_slice = (slice(None), x_pad, y_pad)
+
+    sqsum_data = precomp["sqsum"][data_slice[1:]]
+    sqsum_shift = precomp["sqsum_pad"][pad_slice[1:]]
+
+    cross = np.einsum('ijk,ijk->jk', precomp["filled"][data_slice],
+                      precomp["filled_pad"][pad_slice])
+
+    if precomp["has_nans"]:
+        numer = \
+            np.einsum('ijk,ijk->jk', precomp["sq"][data_slice],
+                      precomp["weights_pad"][pad_slice]) + \
+            np.einsum('ijk,ijk->jk', precomp["weights"][data_slice],
+                      precomp["sq_pad"][pad_slice]) - 2 * cross
+    else:
+        numer = sqsum_data + sqsum_shift - 2 * cross
+
+    # Avoid negative round-off errors when the spectra are identical
+    numer = np.clip(numer, 0., None)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values = numer / (sqsum_data + sqsum_shift)
+
+    return values
@@ -12,6 +12,7 @@ from ..stats_utils import (hellinger, kl_divergence, common_histogram_bins,
                            common_scale, padwithnans)
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, twod_types, input_data
+from ...fft import get_backend
 
 
 class StatMoments(BaseStatisticMixIn):
@@ -101,7 +102,8 @@ class StatMoments(BaseStatisticMixIn):
             compute_moments(self.data, self.weights)
 
     def compute_spatial_distrib(self, radius=None, periodic=True,
-                                min_frac=0.8, show_progress=True):
+                                min_frac=0.8, show_progress=True,
+                                method='loop'):
         '''
         Compute the moments over circular region with the specified radius.
 
@@ -117,8 +119,17 @@ class StatMoments(BaseStatisticMixIn):
             be in the region.
         show_progress : bool, optional
             Show a progress bar during the creation of the covariance matrix.
+        method : {"loop", "convolve"}, optional
+            "loop" computes the moments in the region around each pixel in
+            turn. "convolve" computes the weighted sums of the powers of the
+            data in every region at once with FFT convolutions, and derives
+            the moments from them. This is much faster for large images and
+            agrees with "loop" to within floating point precision.
         '''
 
+        if method not in ["loop", "convolve"]:
+            raise ValueError("method must be 'loop' or 'convolve'.")
+
         # Require the fraction to be > 0 and <=1
         if min_frac <= 0.0 or min_frac > 1.:
             raise ValueError("min_frac must be larger than 0 and less than"
@@ -146,6 +157,15 @@ class StatMoments(BaseStatisticMixIn):
 
         circle_mask = circular_region(pix_rad)
 
+        if method == "convolve":
+            moments = convolved_moments(pad_img, pad_weights, circle_mask,
+                                        min_frac=min_frac)
+
+            self._mean_array, self._variance_array, self._skewness_array, \
+                self._kurtosis_array = moments
+
+            return
+
         if show_progress:
             bar = ProgressBar((pad_img.shape[0] - 2 * pix_rad) *
                               (pad_img.shape[1] - 2 * pix_rad))
@@ -444,7 +464,8 @@ class StatMoments(BaseStatisticMixIn):
             plt.show()
 
     def run(self, show_progress=True, verbose=False, save_name=None,
-            radius=None, periodic=True, min_frac=0.8, **hist_kwargs):
+            radius=None, periodic=True, min_frac=0.8, method='loop',
+            **hist_kwargs):
         '''
         Compute the entire method.
 
@@ -464,12 +485,15 @@ class StatMoments(BaseStatisticMixIn):
             A number between 0 and 1 that sets the minimum fraction of data in
             each region that are finite. A value of 1.0 requires that no NaNs
             be in the region.
+        method : {"loop", "convolve"}, optional
+            See `~StatMoments.compute_spatial_distrib`.
         hist_kwargs : Passed to `~StatMoments.make_spatial_histograms`.
         '''
 
         self.array_moments()
         self.compute_spatial_distrib(periodic=periodic, radius=radius,
-                                     show_progress=show_progress)
+                                     show_progress=show_progress,
+                                     method=method)
         self.make_spatial_histograms(**hist_kwargs)
 
         if verbose:
@@ -804,6 +828,135 @@ def compute_moments(img, weights):
     return mean, variance, skewness, kurtosis
 
 
+def convolved_moments(pad_img, pad_weights, circle_mask, min_frac=0.8):
+    '''
+    Compute the moments within a circular region around every pixel using
+    FFT convolutions. The weighted sums of the first four powers of the data
+    within each region are found at once, and the moments are derived from
+    them using the binomial expansions of the central moments.
+
+    Parameters
+    ----------
+    pad_img : numpy.ndarray
+        2D image, padded by the radius of the region on each side.
+    pad_weights : numpy.ndarray
+        2D weight image, padded in the same way as `pad_img`.
+    circle_mask : numpy.ndarray
+        Mask of the region from `circular_region`.
+    min_frac : float, optional
+        Minimum fraction of finite values in the square around each pixel.
+        Regions below this are set to NaN.
+
+    Returns
+    -------
+    mean : numpy.ndarray
+        The 1st moment array.
+    variance : numpy.ndarray
+        The 2nd moment array.
+    skewness : numpy.ndarray
+        The 3rd moment array.
+    kurtosis : numpy.ndarray
+        The 4th moment array.
+    '''
+
+    pix_rad = circle_mask.shape[0] // 2
+    shape = tuple(size - 2 * pix_rad for size in pad_img.shape)
+
+    finite_img = np.isfinite(pad_img)
+    finite_wgt = np.isfinite(pad_weights)
+    valid = finite_img & finite_wgt
+
+    # Shift and scale the data to limit round-off in the power sums. The
+    # mean and variance are restored to the original units at the end.
+    offset = np.mean(pad_img[valid])
+    scale = np.std(pad_img[valid])
+    if scale == 0:
+        scale = 1.
+
+    norm_img = np.where(valid, (pad_img - offset) / scale, 0.)
+    wgts = np.where(finite_wgt, pad_weights, 0.)
+    valid_wgts = np.where(valid, wgts, 0.)
+
+    # Weighted sums of the powers of the data, plus the sum of the finite
+    # weights and the number of finite weights within the circle.
+    stack = np.empty((7,) + pad_img.shape)
+    stack[0] = wgts
+    stack[1] = valid_wgts
+    for power in range(1, 5):
+        stack[power + 1] = stack[power] * norm_img
+    stack[6] = finite_wgt
+
+    # Kernel centred on the origin. The circle is symmetric, so correlation
+    # and convolution are equivalent.
+    kernel = np.zeros(pad_img.shape)
+    kernel[:circle_mask.shape[0], :circle_mask.shape[1]] = \
+        np.isfinite(circle_mask)
+    kernel = np.roll(kernel, (-pix_rad, -pix_rad), axis=(0, 1))
+
+    backend = get_backend()
+
+    kernel_fft = backend.rfft2(kernel)
+    sums = backend.irfft2(backend.rfft2(stack) * kernel_fft,
+                          s=pad_img.shape)
+    sums = sums[:, pix_rad:pix_rad + shape[0], pix_rad:pix_rad + shape[1]]
+
+    wgt_sum = sums[0]
+    mom0, mom1, mom2, mom3, mom4 = sums[1:6]
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # The mean is normalized by all finite weights, including those
+        # where the data are NaN. So shifting the data does not simply
+        # shift the mean.
+        mean = mom1 / wgt_sum + (offset / scale) * (mom0 / wgt_sum - 1)
+
+        variance = (mom2 - 2 * mean * mom1 + mean**2 * mom0) / wgt_sum
+        variance = np.clip(variance, 0., None)
+
+        std = np.sqrt(variance)
+
+        skewness = (mom3 - 3 * mean * mom2 + 3 * mean**2 * mom1 -
+                    mean**3 * mom0) / (wgt_sum * std**3)
+
+        kurtosis = (mom4 - 4 * mean * mom3 + 6 * mean**2 * mom2 -
+                    4 * mean**3 * mom1 + mean**4 * mom0) / \
+            (wgt_sum * std**4) - 3
+
+    # Regions with no finite weights
+    no_wgts = np.round(sums[6]) == 0
+
+    # Fraction of finite values in the square around each pixel, as in the
+    # pixel-by-pixel computation.
+    box_size = float(circle_mask.size)
+    img_frac = _box_sum(finite_img, pix_rad) / box_size
+    wgt_frac = _box_sum(finite_wgt, pix_rad) / box_size
+    bad_frac = (img_frac < min_frac) | (wgt_frac < min_frac)
+
+    mean = mean * scale + offset
+    variance = variance * scale**2
+
+    moments = []
+    for arr in [mean, variance, skewness, kurtosis]:
+        arr[no_wgts | bad_frac] = np.nan
+        moments.append(arr)
+
+    return tuple(moments)
+
+
+def _box_sum(arr, radius):
+    '''
+    Sum within a square of half-width `radius` around each pixel that is at
+    least `radius` pixels from the edges of `arr`.
+    '''
+
+    cumul = np.zeros((arr.shape[0] + 1, arr.shape[1] + 1), dtype=int)
+    cumul[1:, 1:] = np.cumsum(np.cumsum(arr, axis=0), axis=1)
+
+    width = 2 * radius + 1
+
+    return cumul[width:, width:] - cumul[:-width, width:] - \
+        cumul[width:, :-width] + cumul[:-width, :-width]
+
+
 def _auto_nbins(size1, size2):
     '''
     Set bins to the sqrt of the smaller size.
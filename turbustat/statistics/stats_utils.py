@@ -6,6 +6,8 @@ import math
 from scipy.optimize import leastsq
 import astropy.wcs as wcs
 
+from ..fft import get_backend
+
 
 def hellinger(data1, data2, bin_width=1.0):
     '''
@@ -558,7 +560,7 @@ def fourier_shift(x, shift, axis=0):
     nonan[mask] = 0.0
 
     nonan_shift = _shifter(nonan, shift, axis)
-    mask_shift = _shifter(mask, shift, axis) > 0.5
+    mask_shift = _shifter(mask.astype(float), shift, axis) > 0.5
 
     nonan_shift[mask_shift] = np.nan
 
@@ -566,13 +568,14 @@ def fourier_shift(x, shift, axis=0):
 
 
 def _shifter(x, shift, axis):
-    ftx = np.fft.fft(x, axis=axis)
+    backend = get_backend()
+    ftx = backend.fft(x, axis=axis)
     m = np.fft.fftfreq(x.shape[axis])
     m_shape = [1] * len(x.shape)
     m_shape[axis] = m.shape[0]
     m = m.reshape(m_shape)
     phase = np.exp(-2 * np.pi * m * 1j * shift)
-    x2 = np.real(np.fft.ifft(ftx * phase, axis=axis))
+    x2 = np.real(backend.ifft(ftx * phase, axis=axis))
     return x2
 
 
@@ -9,7 +9,8 @@ import numpy as np
 from astropy.utils.console import ProgressBar
 
 
-def intensity_data(cube, p=0.2, noise_lim=-np.inf, norm=True):
+def intensity_data(cube, p=0.2, noise_lim=-np.inf, norm=True,
+                   chunk_size=None):
     '''
     Clips off channels below the given noise limit and keep the
     upper percentile specified.
@@ -17,11 +18,14 @@ def intensity_data(cube, p=0.2, noise_lim=-np.inf, norm=True):
     Parameters
     ----------
     cube : numpy.ndarray
-        Data cube.
+        Data cube. May be a memory-mapped array.
     p : float, optional
         Sets the fraction of data to keep in each channel.
     noise_lim : float, optional
         The noise limit used to reject channels in the cube.
+    chunk_size : int, optional
+        Number of channels to read into memory at once. By default, all
+        channels are used.
 
     Returns
     -------
@@ -29,69 +33,71 @@ def intensity_data(cube, p=0.2, noise_lim=-np.inf, norm=True):
     intensity_vecs : numpy.ndarray
         2D dataset of size (# channels, p * cube.shape[1] * cube.shape[2]).
     '''
-    vec_length = int(round(p * cube.shape[1] * cube.shape[2]))
+    n_pix = cube.shape[1] * cube.shape[2]
+    vec_length = int(round(p * n_pix))
+
     intensity_vecs = np.empty((cube.shape[0], vec_length))
 
-    delete_channels = []
+    maxval = -np.inf
 
-    if norm:
-        maxval = np.nanmax(cube)
-    else:
+    for start, chunk in _iter_channel_chunks(cube, chunk_size):
+        if norm:
+            maxval = np.nanmax([maxval, np.nanmax(chunk)])
+
+        # Remove nans and apply the noise limit. These values are sorted
+        # to the end and become the zero-padding.
+        chunk[~(chunk > noise_lim)] = -np.inf
+
+        # Keep the brightest vec_length values in each channel
+        if vec_length < n_pix:
+            chunk = np.partition(chunk, n_pix - vec_length,
+                                 axis=1)[:, n_pix - vec_length:]
+        top_vals = np.sort(chunk, axis=1)[:, ::-1]
+        top_vals[np.isneginf(top_vals)] = 0.0
+
+        intensity_vecs[start:start + chunk.shape[0]] = top_vals
+
+    if not norm:
         maxval = 1.0
 
-    for dv in range(cube.shape[0]):
-        vec_vec = cube[dv, :, :]
-        # Remove nans from the slice
-        vel_vec = vec_vec[np.isfinite(vec_vec)]
-        # Apply noise limit
-        vel_vec = vel_vec[vel_vec > noise_lim]
-        vel_vec = np.sort(vel_vec)[::-1]
-        if len(vel_vec) < vec_length:
-            diff = vec_length - len(vel_vec)
-            vel_vec = np.append(vel_vec, [0.0] * diff)
-        else:
-            vel_vec = vel_vec[:vec_length]
-
-        # Return the normalized, shortened vector
-        if maxval != 0.0:
-            intensity_vecs[dv, :] = vel_vec / maxval
-        else:
-            delete_channels.append(dv)
-    # Remove channels
-    intensity_vecs = np.delete(intensity_vecs, delete_channels, axis=0)
+    # Return the normalized, shortened vectors. Channels are removed when
+    # the maximum is zero.
+    if maxval != 0.0:
+        intensity_vecs /= maxval
+    else:
+        intensity_vecs = intensity_vecs[:0]
 
     return intensity_vecs
 
 
 def _format_data(cube, data_format='intensity', num_spec=1000,
-                 noise_lim=-np.inf, p=0.2, normalize=True):
+                 noise_lim=-np.inf, p=0.2, normalize=True, chunk_size=None):
     '''
-    Rearrange data into a 2D object using the given format.
+    Rearrange data into a 2D object using the given format. `chunk_size`
+    sets the number of channels read into memory at once, so memory-mapped
+    cubes can be used.
     '''
 
-    if data_format is "spectra":
+    if data_format == "spectra":
         if num_spec is None:
             raise ValueError('Must specify num_spec for data format',
                              'spectra.')
 
         # Find the brightest spectra in the cube
-        mom0 = np.nansum(cube, axis=0)
+        mom0 = np.zeros(cube.shape[1:])
+        for _, chunk in _iter_channel_chunks(cube, chunk_size):
+            mom0 += np.nansum(chunk, axis=0).reshape(cube.shape[1:])
 
         bright_spectra = \
             np.argpartition(mom0.ravel(), -num_spec)[-num_spec:]
 
-        x = np.empty((num_spec,), dtype=int)
-        y = np.empty((num_spec,), dtype=int)
-
-        for i in range(num_spec):
-            x[i] = int(bright_spectra[i] / cube.shape[1])
-            y[i] = int(bright_spectra[i] % cube.shape[2])
+        x, y = np.unravel_index(bright_spectra, cube.shape[1:])
 
-        data_matrix = cube[:, x, y]
+        data_matrix = np.asarray(cube[:, x, y])
 
-    elif data_format is "intensity":
+    elif data_format == "intensity":
         data_matrix = intensity_data(cube, noise_lim=noise_lim,
-                                     p=p)
+                                     p=p, chunk_size=chunk_size)
 
     else:
         raise NameError(
@@ -105,11 +111,15 @@ def _format_data(cube, data_format='intensity', num_spec=1000,
     return data_matrix
 
 
-def var_cov_cube(cube, mean_sub=False, progress_bar=True):
+def var_cov_cube(cube, mean_sub=False, progress_bar=True, chunk_size=None):
     '''
     Compute the variance-covariance matrix of a data cube, with proper
     handling of NaNs.
 
+    The cube is flattened to (n_chan, n_pix) and the covariances are
+    computed from matrix products, optionally over chunks of pixels to limit
+    the memory use.
+
     Parameters
     ----------
     cube : numpy.ndarray
@@ -119,6 +129,10 @@ def var_cov_cube(cube, mean_sub=False, progress_bar=True):
     progress_bar : bool, optional
         Show a progress bar, since this operation could be slow for large
         cubes.
+    chunk_size : int, optional
+        Number of spatial pixels to use in each matrix product. By default,
+        all pixels are used at once. Setting this limits the temporary
+        arrays to (n_chan, chunk_size) in size.
 
     Returns
     -------
@@ -127,54 +141,123 @@ def var_cov_cube(cube, mean_sub=False, progress_bar=True):
     '''
 
     n_velchan = cube.shape[0]
+    n_pix = int(np.prod(cube.shape[1:]))
+
+    if chunk_size is None:
+        chunk_size = n_pix
+
+    # NaNs in the first channel of each pair are set to tiny values, while
+    # the second channel ignores NaNs. Only the lower triangle of the
+    # pairs is used.
+    eps = np.finfo(cube.dtype).eps
+
+    if mean_sub:
+        # Means with and without the NaNs filled.
+        filled_sum = np.zeros(n_velchan)
+        nan_sum = np.zeros(n_velchan)
+        num_finite = np.zeros(n_velchan)
+
+        for chunk in _iter_pixel_chunks(cube, chunk_size):
+            finite = np.isfinite(chunk)
+            nan_sum += np.where(finite, chunk, 0.).sum(1)
+            filled_sum += np.where(finite, chunk, eps).sum(1)
+            num_finite += finite.sum(1)
+
+        filled_mean = filled_sum / n_pix
+        with np.errstate(divide='ignore', invalid='ignore'):
+            nan_mean = nan_sum / num_finite
+    else:
+        filled_mean = np.zeros(n_velchan)
+        nan_mean = np.zeros(n_velchan)
 
-    cov_matrix = np.zeros((n_velchan, n_velchan))
+    cross_sum = np.zeros((n_velchan, n_velchan))
+    var_sum = np.zeros(n_velchan)
+    divisor = np.zeros(n_velchan)
 
     if progress_bar:
-        bar = ProgressBar(n_velchan)
+        bar = ProgressBar(n_pix)
 
-    for i, chan in enumerate(_iter_2D(cube)):
-        # Set the nans to tiny values
-        chan[np.isnan(chan)] = np.finfo(chan.dtype).eps
+    posn = 0
+    for chunk in _iter_pixel_chunks(cube, chunk_size):
+        finite = np.isfinite(chunk)
 
-        norm_chan = chan
-        if mean_sub:
-            norm_chan -= np.nanmean(chan)
-        for j, chan2 in enumerate(_iter_2D(cube[:i + 1, :, :])):
-            norm_chan2 = chan2
-            if mean_sub:
-                norm_chan2 -= np.nanmean(chan2)
+        filled = np.where(finite, chunk, eps) - filled_mean[:, np.newaxis]
+        nan_zeroed = np.where(finite, chunk - nan_mean[:, np.newaxis], 0.)
 
-            divisor = np.sum(np.isfinite(norm_chan * norm_chan2))
+        cross_sum += np.dot(filled, nan_zeroed.T)
+        var_sum += np.einsum('ij,ij->i', filled, filled)
+        divisor += finite.sum(1)
 
-            # Apply Bessel's correction when mean subtracting
-            if mean_sub:
-                divisor -= 1.0
-
-            cov_matrix[i, j] = \
-                np.nansum(norm_chan * norm_chan2) / divisor
+        posn += chunk.shape[1]
+        if progress_bar:
+            bar.update(posn)
 
-        # Variances
-        # Divided in half to account for doubling in line below
-        var_divis = np.sum(np.isfinite(norm_chan))
-        if mean_sub:
-            var_divis -= 1.0
+    var_divis = float(n_pix)
 
-        cov_matrix[i, i] = 0.5 * \
-            np.nansum(norm_chan * norm_chan) / var_divis
+    # Apply Bessel's correction when mean subtracting
+    if mean_sub:
+        divisor -= 1.0
+        var_divis -= 1.0
 
-        if progress_bar:
-            bar.update(i + 1)
+    # The divisor only depends on the number of finite values in the second
+    # channel.
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cov_matrix = np.tril(cross_sum / divisor[np.newaxis, :], k=-1)
 
     cov_matrix = cov_matrix + cov_matrix.T
 
+    cov_matrix[np.diag_indices(n_velchan)] = var_sum / var_divis
+
     return np.nan_to_num(cov_matrix)
 
 
-def _iter_2D(arr):
+def _iter_pixel_chunks(cube, chunk_size):
     '''
-    Flatten a 3D cube into 2D by its channels.
+    Flatten a 3D cube to (n_chan, n_pix) and iterate over chunks of pixels.
     '''
 
-    for chan in arr.reshape((arr.shape[0], -1)):
-        yield chan.copy()
+    flat_cube = cube.reshape((cube.shape[0], -1))
+
+    for start in range(0, flat_cube.shape[1], chunk_size):
+        yield np.asarray(flat_cube[:, start:start + chunk_size],
+                         dtype=np.float64)
+
+
+def _iter_channel_chunks(cube, chunk_size):
+    '''
+    Iterate over chunks of channels of a 3D cube, flattened spatially to
+    (n_chan, n_pix). Each chunk is a floating point copy of the data.
+    '''
+
+    if chunk_size is None:
+        chunk_size = cube.shape[0]
+
+    if np.issubdtype(cube.dtype, np.floating):
+        dtype = cube.dtype
+    else:
+        dtype = np.float64
+
+    for start in range(0, cube.shape[0], chunk_size):
+        chunk = np.array(cube[start:start + chunk_size], dtype=dtype)
+        yield start, chunk.reshape((chunk.shape[0], -1))
+
+
+def _channel_nanmeans(cube, chunk_size=None):
+    '''
+    Mean of the finite values in each channel, computed over chunks of
+    pixels.
+    '''
+
+    if chunk_size is None:
+        chunk_size = int(np.prod(cube.shape[1:]))
+
+    nan_sum = np.zeros(cube.shape[0])
+    num_finite = np.zeros(cube.shape[0])
+
+    for chunk in _iter_pixel_chunks(cube, chunk_size):
+        finite = np.isfinite(chunk)
+        nan_sum += np.where(finite, chunk, 0.).sum(1)
+        num_finite += finite.sum(1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return nan_sum / num_finite
@@ -2,12 +2,13 @@
 from __future__ import print_function, absolute_import, division
 
 import numpy as np
+import os
+from concurrent.futures import ProcessPoolExecutor
 from scipy.stats import chisquare
 from scipy.optimize import curve_fit
 import astropy.units as u
 from astropy.table import Table
 
-from ..stats_utils import standardize, padwithzeros
 from ..base_statistic import BaseStatisticMixIn
 from ...io import common_types, twod_types
 
@@ -82,7 +83,9 @@ class Tsallis(BaseStatisticMixIn):
 
         self._lags = values
 
-    def make_tsallis(self, periodic=True, num_bins=None):
+    def make_tsallis(self, periodic=True, num_bins=None,
+                     keep_lag_arrays=True, lag_arrays_file=None,
+                     lag_arrays_dtype=np.float64):
         '''
         Calculate the Tsallis distribution at each lag.
         We standardize each distribution such that it has a mean of zero and
@@ -91,6 +94,10 @@ class Tsallis(BaseStatisticMixIn):
         If the lag values are fractions of a pixel when converted to pixel
         units, the lag is rounded down to the next smallest integer value.
 
+        The increments at each lag are computed from slices of the image
+        into a single buffer, so the peak memory use is about twice the
+        image size when the lag arrays are not kept.
+
         Parameters
         ----------
         periodic : bool, optional
@@ -98,6 +105,15 @@ class Tsallis(BaseStatisticMixIn):
         num_bins : int, optional
             Number of bins to use in the histograms. Defaults to the
             square-root of the number of finite points in the image.
+        keep_lag_arrays : bool, optional
+            Keep the standardized increments at each lag in
+            `~Tsallis.lag_arrays`. Disable to only keep the histograms.
+        lag_arrays_file : str, optional
+            Store `~Tsallis.lag_arrays` in a memory-mapped `.npy` file with
+            this name instead of in memory.
+        lag_arrays_dtype : numpy.dtype, optional
+            Data type of `~Tsallis.lag_arrays`. Using `np.float32` halves the
+            size of the stored lag arrays.
 
         '''
 
@@ -105,49 +121,58 @@ class Tsallis(BaseStatisticMixIn):
             num_bins = \
                 np.ceil(np.sqrt(np.isfinite(self.data).sum())).astype(int)
 
-        self._lag_arrays = np.empty((len(self.lags),
-                                     self.data.shape[0],
-                                     self.data.shape[1]))
+        lag_shape = (len(self.lags),) + self.data.shape
+
+        if not keep_lag_arrays:
+            self._lag_arrays = None
+        elif lag_arrays_file is not None:
+            self._lag_arrays = \
+                np.lib.format.open_memmap(lag_arrays_file, mode='w+',
+                                          dtype=lag_arrays_dtype,
+                                          shape=lag_shape)
+        else:
+            self._lag_arrays = np.empty(lag_shape, dtype=lag_arrays_dtype)
+
         self._lag_distribs = np.empty((len(self.lags), 2, num_bins))
 
         # Convert the lags into pixels
         pix_lags = np.floor(self._to_pixel(self.lags).value).astype(int)
 
+        img = np.asarray(self.data, dtype=np.float64)
+
+        data = np.empty(img.shape)
+
         for i, lag in enumerate(pix_lags):
-            if periodic:
-                pad_img = self.data
-            else:
-                pad_img = np.pad(self.data, lag, padwithzeros)
-            rolls = np.roll(pad_img, lag, axis=0) +\
-                np.roll(pad_img, -lag, axis=0) +\
-                np.roll(pad_img, lag, axis=1) +\
-                np.roll(pad_img, -lag, axis=1)
+            _lag_increments(img, lag, periodic, out=data)
 
-            #  Remove the padding
-            if periodic:
-                clip_resulting = (rolls / 4.) - pad_img
-            else:
-                clip_resulting = (rolls[lag:-lag, lag:-lag] / 4.) -\
-                    pad_img[lag:-lag, lag:-lag]
             # Normalize the data
-            data = standardize(clip_resulting)
+            data -= np.nanmean(data)
+            data /= np.nanstd(data)
 
-            # Ignore nans for the histogram
-            hist, bin_edges = np.histogram(data[~np.isnan(data)],
-                                           bins=num_bins)
+            # NaNs fall outside of the range and are not counted
+            hist, bin_edges = np.histogram(data, bins=num_bins,
+                                           range=(np.nanmin(data),
+                                                  np.nanmax(data)))
             bin_centres = (bin_edges[:-1] + bin_edges[1:]) / 2
             normlog_hist = np.log10(hist / np.sum(hist, dtype="float"))
 
             # Keep results
-            self._lag_arrays[i, :] = data
+            if keep_lag_arrays:
+                self._lag_arrays[i] = data
             self._lag_distribs[i, 0, :] = bin_centres
             self._lag_distribs[i, 1, :] = normlog_hist
 
+        if lag_arrays_file is not None and keep_lag_arrays:
+            self._lag_arrays.flush()
+
     @property
     def lag_arrays(self):
         '''
         Arrays of the image computed at different lags.
         '''
+        if self._lag_arrays is None:
+            raise ValueError("Set `keep_lag_arrays=True` in "
+                             "Tsallis.make_tsallis to keep the lag arrays.")
         return self._lag_arrays
 
     @property
@@ -158,7 +183,7 @@ class Tsallis(BaseStatisticMixIn):
         '''
         return self._lag_distribs
 
-    def fit_tsallis(self, sigma_clip=5):
+    def fit_tsallis(self, sigma_clip=5, initial_guess='default', n_jobs=1):
         '''
         Fit the Tsallis distributions.
 
@@ -167,35 +192,66 @@ class Tsallis(BaseStatisticMixIn):
         sigma_clip : float
             Sets the sigma value to clip data at. If `None`,
             no clipping is performed on the data. Defaults to 5.
+        initial_guess : {'default', 'previous'}, optional
+            'default' starts each fit from (-max(log hist), 1, 2).
+            'previous' starts from the fit parameters of the previous lag,
+            which are usually close when the lags are finely sampled. The
+            lags are then fit in order.
+        n_jobs : int, optional
+            Number of processes used to fit the lags in parallel. Use -1 for
+            the number of CPUs. Requires `initial_guess='default'`.
         '''
 
         if not hasattr(self, 'lag_distribs'):
             raise Exception("Calculate the distributions first with "
                             "Tsallis.make_tsallis.")
 
+        if initial_guess not in ['default', 'previous']:
+            raise ValueError("initial_guess must be 'default' or 'previous'."
+                             " Given {}".format(initial_guess))
+
+        if n_jobs == -1:
+            n_jobs = os.cpu_count()
+
+        if n_jobs < 1:
+            raise ValueError("n_jobs must be a positive integer or -1.")
+
+        if n_jobs > 1 and initial_guess == 'previous':
+            raise ValueError("initial_guess='previous' fits the lags in "
+                             "order and cannot be used with n_jobs > 1.")
+
         self._sigma_clip = sigma_clip
 
-        self._tsallis_params = np.empty((len(self.lags), 3))
-        self._tsallis_stderrs = np.empty((len(self.lags), 3))
-        self._tsallis_chisq = np.empty((len(self.lags), 1))
+        bin_centres = self.lag_distribs[:, 0]
+        log_hists = self.lag_distribs[:, 1]
 
-        for i, dist in enumerate(self.lag_distribs):
-            if sigma_clip is None:
-                # Keep all finite data
-                finite_mask = np.logical_and(np.isfinite(dist[0]),
-                                             np.isfinite(dist[1]))
-                clipped = dist[0][finite_mask], dist[1][finite_mask]
-            else:
-                clipped = clip_to_sigma(dist[0], dist[1], sigma=sigma_clip)
+        # Keep all finite data within the clipping limits for all lags
+        fit_masks = np.logical_and(np.isfinite(bin_centres),
+                                   np.isfinite(log_hists))
+        if sigma_clip is not None:
+            fit_masks &= np.abs(log_hists) < sigma_clip
+
+        maxfev = 100 * self.lag_distribs.shape[-1]
+
+        fit_inputs = [(x[mask], y[mask], maxfev) for x, y, mask in
+                      zip(bin_centres, log_hists, fit_masks)]
+
+        if n_jobs > 1:
+            with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+                fits = list(executor.map(_fit_tsallis_lag, fit_inputs))
+        else:
+            fits = []
+            p0 = None
+            for inputs in fit_inputs:
+                fits.append(_fit_tsallis_lag(inputs, p0=p0))
 
-            params, pcov = curve_fit(tsallis_function, clipped[0], clipped[1],
-                                     p0=(-np.max(clipped[1]), 1., 2.),
-                                     maxfev=100 * len(dist[0]))
+                if initial_guess == 'previous' and \
+                        np.isfinite(fits[-1][0]).all():
+                    p0 = fits[-1][0]
 
-            fitted_vals = tsallis_function(clipped[0], *params)
-            self._tsallis_params[i] = params
-            self._tsallis_stderrs[i] = np.sqrt(np.diag(pcov))
-            self._tsallis_chisq[i] = np.sum((np.exp(fitted_vals) - np.exp(clipped[1]))**2. / np.exp(clipped[1]))
+        self._tsallis_params = np.array([fit[0] for fit in fits])
+        self._tsallis_stderrs = np.array([fit[1] for fit in fits])
+        self._tsallis_chisq = np.array([[fit[2]] for fit in fits])
 
     @property
     def tsallis_params(self):
@@ -292,11 +348,10 @@ class Tsallis(BaseStatisticMixIn):
 
         fig, axes = plt.subplots(len(self.lags), 1, sharex=True)
 
-        for vals in zip(self.lags, self.lag_distribs,
-                        self.lag_arrays, self.tsallis_params,
+        for vals in zip(self.lags, self.lag_distribs, self.tsallis_params,
                         axes):
 
-            lag, dist, arr, params, ax = vals
+            lag, dist, params, ax = vals
 
             ax.plot(dist[0], dist[1], 'D', color=color,
                     label="Lag {}".format(lag), alpha=0.5)
@@ -320,7 +375,7 @@ class Tsallis(BaseStatisticMixIn):
             plt.show()
 
     def run(self, verbose=False, num_bins=None, periodic=True, sigma_clip=5,
-            save_name=None):
+            save_name=None, keep_lag_arrays=True, n_jobs=1):
         '''
         Run all steps.
 
@@ -339,10 +394,17 @@ class Tsallis(BaseStatisticMixIn):
             Passed to :func:`fit_tsallis`.
         save_name : str,optional
             Save the figure when a file name is given.
+        keep_lag_arrays : bool, optional
+            Keep the increments at each lag. Passed to
+            `~Tsallis.make_tsallis`.
+        n_jobs : int, optional
+            Number of processes used to fit the lags. Passed to
+            `~Tsallis.fit_tsallis`.
         '''
 
-        self.make_tsallis(num_bins=num_bins, periodic=periodic)
-        self.fit_tsallis(sigma_clip=sigma_clip)
+        self.make_tsallis(num_bins=num_bins, periodic=periodic,
+                          keep_lag_arrays=keep_lag_arrays)
+        self.fit_tsallis(sigma_clip=sigma_clip, n_jobs=n_jobs)
 
         if verbose:
             # print the table of parameters
@@ -442,6 +504,121 @@ class Tsallis(BaseStatisticMixIn):
 #         return self
 
 
+def _lag_increments(img, lag, periodic=True, out=None):
+    '''
+    Difference between the mean of the four neighbours at a distance of
+    `lag` and each pixel. Without periodic boundaries, neighbours beyond the
+    edges are zero.
+
+    Parameters
+    ----------
+    img : numpy.ndarray
+        2D image.
+    lag : int
+        Lag in pixels. Lags larger than the image are only allowed with
+        periodic boundaries.
+    periodic : bool, optional
+        Wrap the neighbours around the edges.
+    out : numpy.ndarray, optional
+        Array to store the result in.
+
+    Returns
+    -------
+    out : numpy.ndarray
+        The increments at the given lag.
+    '''
+
+    if lag < 1:
+        raise ValueError("lag must be a positive integer, not {}."
+                         .format(lag))
+
+    if not periodic and lag > min(img.shape):
+        raise ValueError("Without periodic boundaries, lag must not exceed "
+                         "the smallest image dimension ({0}), not {1}."
+                         .format(min(img.shape), lag))
+
+    if out is None:
+        out = np.empty(img.shape)
+
+    # The neighbours are added in the same order as summing np.roll by
+    # +lag and -lag along each axis.
+    out[...] = 0.
+
+    for axis in [0, 1]:
+        for shift in [lag, -lag]:
+            if periodic:
+                # The equivalent shift within the image, as in np.roll.
+                shift = shift % img.shape[axis]
+
+                if shift == 0:
+                    out += img
+                    continue
+
+            # Slices for out[i] += img[i - shift] within the image, and for
+            # the pixels that wrap around the edge.
+            inner_out = [slice(None)] * 2
+            inner_img = [slice(None)] * 2
+            wrap_out = [slice(None)] * 2
+            wrap_img = [slice(None)] * 2
+
+            if shift > 0:
+                inner_out[axis] = slice(shift, None)
+                inner_img[axis] = slice(None, -shift)
+                wrap_out[axis] = slice(None, shift)
+                wrap_img[axis] = slice(-shift, None)
+            else:
+                inner_out[axis] = slice(None, shift)
+                inner_img[axis] = slice(-shift, None)
+                wrap_out[axis] = slice(shift, None)
+                wrap_img[axis] = slice(None, -shift)
+
+            out[tuple(inner_out)] += img[tuple(inner_img)]
+
+            if periodic:
+                out[tuple(wrap_out)] += img[tuple(wrap_img)]
+
+    out /= 4.
+    out -= img
+
+    return out
+
+
+def _fit_tsallis_lag(inputs, p0=None):
+    '''
+    Fit the Tsallis function to one distribution. Use with
+    `concurrent.futures.ProcessPoolExecutor.map`.
+
+    Parameters
+    ----------
+    inputs : tuple
+        The bin centres, log histogram values and maximum number of
+        function evaluations.
+    p0 : tuple, optional
+        Initial parameters. Defaults to (-max(log hist), 1, 2).
+
+    Returns
+    -------
+    params : numpy.ndarray
+        Fit parameters.
+    stderrs : numpy.ndarray
+        Standard errors of the parameters.
+    chisq : float
+        Chi-squared value of the fit.
+    '''
+
+    x, y, maxfev = inputs
+
+    if p0 is None:
+        p0 = (-np.max(y), 1., 2.)
+
+    params, pcov = curve_fit(tsallis_function, x, y, p0=p0, maxfev=maxfev)
+
+    fitted_vals = tsallis_function(x, *params)
+    chisq = np.sum((np.exp(fitted_vals) - np.exp(y))**2. / np.exp(y))
+
+    return params, np.sqrt(np.diag(pcov)), chisq
+
+
 def tsallis_function(x, *p):
     '''
     Tsallis distribution function as given in Tofflemire
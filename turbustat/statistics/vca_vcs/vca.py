@@ -3,7 +3,6 @@ from __future__ import print_function, absolute_import, division
 
 import numpy as np
 import warnings
-from numpy.fft import fftshift
 import astropy.units as u
 
 from ..rfft_to_fft import rfft_to_fft
@@ -111,17 +110,19 @@ class VCA(BaseStatisticMixIn, StatisticBase_PSpec2D):
         if pyfftw_kwargs.get('threads') is not None:
             pyfftw_kwargs.pop('threads')
 
-        fft = fftshift(rfft_to_fft(data, use_pyfftw=use_pyfftw,
-                                   threads=threads,
-                                   **pyfftw_kwargs))
+        # Only the rfft half-plane is kept. Summing over the spectral
+        # frequencies keeps the spatial power spectrum symmetric.
+        fft = rfft_to_fft(data, keep_rfft=True, use_pyfftw=use_pyfftw,
+                          threads=threads, **pyfftw_kwargs)
 
-        self._ps2D = np.power(fft, 2.).sum(axis=0)
+        self._ps2D_rfft = np.power(fft, 2.).sum(axis=0)
+        self._ps2D_shape = data.shape[1:]
 
         if beam_correct:
             self.compute_beam_pspec()
 
         if beam_correct:
-            self._ps2D /= self._beam_pow
+            self._ps2D_rfft /= self._beam_pow
 
     def run(self, verbose=False, beam_correct=False,
             apodize_kernel=None, alpha=0.2, beta=0.0,
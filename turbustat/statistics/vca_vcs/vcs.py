@@ -75,11 +75,25 @@ class VCS(BaseStatisticMixIn):
             pyfftw_kwargs.pop('threads')
 
         fft = rfft_to_fft(self.data, use_pyfftw=use_pyfftw,
-                          keep_rfft=False,
+                          keep_rfft=True,
                           threads=threads,
                           **pyfftw_kwargs)
         ps3D = np.power(fft, 2.)
-        self._ps1D = np.nansum(ps3D, axis=(1, 2)) / good_pixel_count
+
+        # The negative spatial frequencies missing from the rfft are the
+        # interior columns mirrored to the negated spectral frequencies.
+        # The interior sum is found from slices to avoid copying the cube.
+        nchan = self.data.shape[0]
+
+        ps1D = np.nansum(ps3D, axis=(1, 2))
+
+        ps1D_mirror = ps1D - np.nansum(ps3D[:, :, 0], axis=1)
+        if self.data.shape[2] % 2 == 0:
+            ps1D_mirror -= np.nansum(ps3D[:, :, -1], axis=1)
+
+        ps1D += ps1D_mirror[-np.arange(nchan) % nchan]
+
+        self._ps1D = ps1D / good_pixel_count
 
     @property
     def ps1D(self):
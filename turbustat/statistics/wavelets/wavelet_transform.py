@@ -7,6 +7,7 @@ import astropy.units as u
 import statsmodels.api as sm
 from warnings import warn
 from astropy.utils.console import ProgressBar
+from scipy.fft import next_fast_len
 
 from astropy.convolution import convolve_fft
 # Use updated kernel name.
@@ -17,13 +18,8 @@ except ImportError:
 
     RickerWavelet2DKernel = MexicanHat2DKernel
 
-try:
-    from pyfftw.interfaces.numpy_fft import fftn, ifftn
-    PYFFTW_FLAG = True
-except ImportError:
-    PYFFTW_FLAG = False
-
 from ..base_statistic import BaseStatisticMixIn
+from ...fft import _legacy_backend
 from ...io import common_types, twod_types
 from ..fitting_utils import check_fit_limits, residual_bootstrap
 from ..lm_seg import Lm_Seg
@@ -111,10 +107,18 @@ class Wavelet(BaseStatisticMixIn):
 
     def compute_transform(self, show_progress=True, scale_normalization=True,
                           keep_convolved_arrays=False, convolve_kwargs={},
-                          use_pyfftw=False, threads=1, pyfftw_kwargs={}):
+                          use_pyfftw=False, threads=1, pyfftw_kwargs={},
+                          method='convolve', batch_size=None):
         '''
         Compute the wavelet transform at each scale.
 
+        With `method='fourier'`, the image is transformed once and multiplied
+        by the analytic Fourier transform of the Ricker (Mexican hat)
+        wavelet at each scale. This avoids creating a kernel array at each
+        scale. The results differ slightly from `method='convolve'` because
+        the astropy kernel is sampled and truncated at 4 times the scale
+        width.
+
         Parameters
         ----------
         show_progress : bool, optional
@@ -134,19 +138,28 @@ class Wavelet(BaseStatisticMixIn):
         pyfftw_kwargs : Passed to
             See `here <http://hgomersall.github.io/pyFFTW/pyfftw/builders/builders.html>`_
             for a list of accepted kwargs.
+        method : {'convolve', 'fourier'}, optional
+            Convolve the image with the wavelet kernel at each scale using
+            `~astropy.convolution.convolve_fft` ('convolve'), or multiply
+            the FFT of the image by the analytic transform of the wavelet
+            ('fourier'). With 'fourier', only the `boundary` keyword in
+            `convolve_kwargs` is used: the default 'fill' zero-pads the
+            image, while 'wrap' assumes periodic boundaries. With 'wrap',
+            scales whose kernel is larger than the image are still
+            computed with `~astropy.convolution.convolve_fft`, which pads
+            the image to the kernel size in that case.
+        batch_size : int, optional
+            Number of scales transformed together with `method='fourier'`.
+            By default, the batches are limited to ~2^24 Fourier
+            components.
         '''
 
-        if use_pyfftw:
-            if PYFFTW_FLAG:
-                use_fftn = fftn
-                use_ifftn = ifftn
-            else:
-                warn("pyfftw not installed. Using numpy.fft functions.")
-                use_fftn = np.fft.fftn
-                use_ifftn = np.fft.ifftn
-        else:
-            use_fftn = np.fft.fftn
-            use_ifftn = np.fft.ifftn
+        if method not in ['convolve', 'fourier']:
+            raise ValueError("method must be 'convolve' or 'fourier'. Given"
+                             " {}".format(method))
+
+        backend = _legacy_backend(use_pyfftw=use_pyfftw, threads=threads,
+                                  **pyfftw_kwargs)
 
         n0, m0 = self.data.shape
         A = len(self.scales)
@@ -171,16 +184,40 @@ class Wavelet(BaseStatisticMixIn):
         if show_progress:
             bar = ProgressBar(len(pix_scales))
 
-        for i, an in enumerate(pix_scales):
-            psi = RickerWavelet2DKernel(an)
+        def convolve_scale(an):
+            return convolve_fft(self.data, RickerWavelet2DKernel(an),
+                                normalize_kernel=False,
+                                fftn=backend.fftn, ifftn=backend.ifftn,
+                                nan_treatment='fill',
+                                preserve_nan=True,
+                                **convolve_kwargs).real
+
+        if method == 'fourier':
+            boundary = convolve_kwargs.get('boundary', 'fill')
+
+            # convolve_fft pads the image to the kernel shape when the
+            # kernel is larger, so those scales are not periodic on the
+            # image grid. The kernel size follows RickerWavelet2DKernel.
+            if boundary == 'wrap':
+                kern_sizes = 2 * (np.ceil(8 * pix_scales) // 2) + 1
+                use_fourier = kern_sizes <= min(self.data.shape)
+            else:
+                use_fourier = np.ones(len(pix_scales), dtype=bool)
+
+            fourier_arrs = \
+                _ricker_fourier_convolve(self.data, pix_scales[use_fourier],
+                                         boundary=boundary,
+                                         batch_size=batch_size,
+                                         use_rfftn=backend.rfftn,
+                                         use_irfftn=backend.irfftn)
+            conv_arrs = (next(fourier_arrs) if use else convolve_scale(an)
+                         for an, use in zip(pix_scales, use_fourier))
+        else:
+            conv_arrs = (convolve_scale(an) for an in pix_scales)
+
+        for i, (an, conv_arr) in enumerate(zip(pix_scales, conv_arrs)):
 
-            conv_arr = \
-                convolve_fft(self.data, psi, normalize_kernel=False,
-                             fftn=use_fftn, ifftn=use_ifftn,
-                             nan_treatment='fill',
-                             preserve_nan=True,
-                             **convolve_kwargs).real * \
-                an**factor
+            conv_arr = conv_arr * an**factor
 
             if keep_convolved_arrays:
                 self._Wf[i] = conv_arr
@@ -547,6 +584,7 @@ class Wavelet(BaseStatisticMixIn):
             convolve_kwargs={},
             use_pyfftw=False, threads=1,
             pyfftw_kwargs={}, scale_normalization=True,
+            method='convolve', batch_size=None,
             xlow=None, xhigh=None, brk=None, fit_kwargs={},
             save_name=None, **plot_kwargs):
         '''
@@ -575,6 +613,10 @@ class Wavelet(BaseStatisticMixIn):
         scale_normalization: bool, optional
             Multiply the wavelet transform by the correct normalization
             factor.
+        method : {'convolve', 'fourier'}, optional
+            See `~Wavelet.compute_transform`.
+        batch_size : int, optional
+            See `~Wavelet.compute_transform`.
         xlow : `~astropy.units.Quantity`, optional
             Lower scale value to consider in the fit.
         xhigh : `~astropy.units.Quantity`, optional
@@ -592,7 +634,8 @@ class Wavelet(BaseStatisticMixIn):
                                convolve_kwargs=convolve_kwargs,
                                use_pyfftw=use_pyfftw, threads=threads,
                                pyfftw_kwargs=pyfftw_kwargs,
-                               show_progress=show_progress)
+                               show_progress=show_progress,
+                               method=method, batch_size=batch_size)
         self.fit_transform(xlow=xlow, xhigh=xhigh, brk=brk, **fit_kwargs)
 
         if verbose:
@@ -745,3 +788,93 @@ class Wavelet_Distance(object):
                 plt.show()
 
         return self
+
+
+def _ricker_fourier_convolve(data, scales, boundary='fill', batch_size=None,
+                             use_rfftn=np.fft.rfftn,
+                             use_irfftn=np.fft.irfftn):
+    '''
+    Convolve an image with Ricker wavelets using the analytic Fourier
+    transform of the wavelet. The scales are inverted in batches, and the
+    image is only transformed again when a batch requires a larger grid.
+
+    The wavelet has the normalization of
+    `~astropy.convolution.RickerWavelet2DKernel` with width a,
+    (1 - r^2 / 2a^2) exp(-r^2 / 2a^2) / (pi a^4), which has the Fourier
+    transform 4 pi^2 k^2 exp(-2 pi^2 a^2 k^2) for k in cycles per pixel.
+
+    Parameters
+    ----------
+    data : `~numpy.ndarray`
+        2D image.
+    scales : `~numpy.ndarray`
+        Wavelet widths in pixels.
+    boundary : {'fill', 'wrap'}, optional
+        Zero-pad the image ('fill') or assume periodic boundaries ('wrap').
+    batch_size : int, optional
+        Number of scales transformed together.
+    use_rfftn : function, optional
+        Real FFT function.
+    use_irfftn : function, optional
+        Inverse real FFT function.
+
+    Yields
+    ------
+    conv_arr : `~numpy.ndarray`
+        The convolved image at each scale.
+    '''
+
+    if boundary not in ['fill', 'wrap']:
+        raise ValueError("boundary must be 'fill' or 'wrap'. Given "
+                         "{}".format(boundary))
+
+    nan_mask = np.isnan(data)
+    data = np.where(nan_mask, 0., data)
+
+    out_slice = (Ellipsis, slice(0, data.shape[0]), slice(0, data.shape[1]))
+
+    if batch_size is None:
+        # Limit the batches using the largest grid.
+        if boundary == 'wrap':
+            max_size = np.prod(data.shape)
+        else:
+            max_size = np.prod([next_fast_len(size +
+                                              int(np.ceil(6 * np.max(scales))))
+                                for size in data.shape])
+        batch_size = max(1, 2**24 // int(max_size))
+
+    grid_shape = None
+
+    for start in range(0, len(scales), batch_size):
+        batch_scales = np.asarray(scales[start:start + batch_size])
+
+        if boundary == 'wrap':
+            batch_grid = data.shape
+        else:
+            # Zero-pad by 6 times the largest width in the batch. The
+            # periodic copies of the wavelet are then negligible.
+            pad = int(np.ceil(6 * batch_scales.max()))
+            batch_grid = tuple(next_fast_len(size + pad)
+                               for size in data.shape)
+
+        # Only transform the data again when the grid changes.
+        if batch_grid != grid_shape:
+            grid_shape = batch_grid
+
+            data_fft = use_rfftn(data, s=grid_shape, axes=(-2, -1))
+
+            ky = np.fft.fftfreq(grid_shape[0])[:, np.newaxis]
+            kx = np.fft.rfftfreq(grid_shape[1])[np.newaxis, :]
+            ksq = ky**2 + kx**2
+
+        batch_scales = batch_scales[:, np.newaxis, np.newaxis]
+
+        psi_fft = 4 * np.pi**2 * ksq * \
+            np.exp(-2 * np.pi**2 * batch_scales**2 * ksq)
+
+        conv_arrs = use_irfftn(data_fft * psi_fft, s=grid_shape,
+                               axes=(-2, -1))[out_slice]
+
+        for conv_arr in conv_arrs:
+            conv_arr[nan_mask] = np.nan
+            yield conv_arr
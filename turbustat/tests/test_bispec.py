@@ -50,6 +50,54 @@ def test_Bispec_method_meansub():
                        computed_data['bispec_val_meansub'])
 
 
+def test_Bispec_method_chunks():
+    tester = Bispectrum(dataset1["moment0"])
+    tester.run(chunk_size=1)
+
+    tester2 = Bispectrum(dataset1["moment0"])
+    tester2.run(chunk_size=1000)
+
+    npt.assert_array_equal(tester.bispectrum, tester2.bispectrum)
+    npt.assert_array_equal(tester.tracker, tester2.tracker)
+    assert np.allclose(tester2.bicoherence,
+                       computed_data['bispec_val'])
+
+
+def test_Bispec_exact():
+    '''
+    Compare the shell estimator to a direct sum over all pairs of vectors.
+    '''
+
+    img = make_extended(16, powerlaw=3., randomseed=4) + 1.
+
+    tester = Bispectrum(img)
+    tester.run(method='exact', chunk_size=3)
+
+    fftarr = np.fft.fft2(img)
+    kk = np.fft.fftfreq(16) * 16
+    shells = np.floor(np.sqrt(kk[:, np.newaxis]**2 + kk**2) + 0.5)
+
+    bispec = np.zeros((8, 8), dtype=complex)
+    biconorm = np.zeros((8, 8))
+    for k1 in range(8):
+        for k2 in range(8):
+            posn1 = np.argwhere(shells == k1)
+            posn2 = np.argwhere(shells == k2)
+            k1x, k2x = np.meshgrid(posn1[:, 0], posn2[:, 0])
+            k1y, k2y = np.meshgrid(posn1[:, 1], posn2[:, 1])
+            samps = fftarr[k1x, k1y] * fftarr[k2x, k2y] * \
+                np.conj(fftarr[(k1x + k2x) % 16, (k1y + k2y) % 16])
+            bispec[k1, k2] = samps.mean()
+            biconorm[k1, k2] = np.abs(samps).mean()
+
+    npt.assert_allclose(tester.bispectrum, bispec, atol=1e-8)
+    npt.assert_allclose(tester.bicoherence, np.abs(bispec) / biconorm)
+
+    # Slices still work with the exact surfaces
+    tester.azimuthal_slice(4, 2)
+    tester.radial_slice(45 * u.deg, 20 * u.deg)
+
+
 @pytest.mark.openfiles_ignore
 def test_Bispec_distance():
     tester_dist = \
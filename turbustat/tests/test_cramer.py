@@ -6,10 +6,15 @@ from __future__ import print_function, absolute_import, division
 Test functions for Cramer
 '''
 
+import pytest
+import numpy as np
 import numpy.testing as npt
 import os
+from astropy.io import fits
+from sklearn.metrics.pairwise import pairwise_distances
 
 from ..statistics import Cramer_Distance
+from ..statistics.threeD_to_twoD import _format_data
 from ._testing_data import \
     dataset1, dataset2, computed_data, computed_distances
 
@@ -40,3 +45,130 @@ def test_cramer_spatial_diff():
     tester3.distance_metric(normalize=False)
 
     npt.assert_almost_equal(tester2.distance, tester3.distance)
+
+
+@pytest.mark.parametrize('n_jobs', [1, 2, -1])
+def test_cramer_chunked(n_jobs):
+    '''
+    Computing the distances in chunks should match the full distance
+    matrices.
+    '''
+
+    tester = Cramer_Distance(dataset1["cube"], dataset2["cube"],
+                             noise_value1=0.1, noise_value2=0.1)
+    tester.format_data(normalize=False)
+    tester.cramer_statistic()
+
+    # Sum the full matrices with the original loops
+    dist11 = np.sqrt(pairwise_distances(tester.data_matrix1))
+    dist22 = np.sqrt(pairwise_distances(tester.data_matrix2))
+    dist12 = np.sqrt(pairwise_distances(tester.data_matrix1,
+                                        tester.data_matrix2))
+
+    terms = [0.0, 0.0, 0.0]
+    for i, dists in enumerate([dist12, dist11, dist22]):
+        for val in dists.ravel():
+            terms[i] += val
+
+    m = float(dist11.shape[0])
+    n = float(dist22.shape[0])
+
+    exp_distance = (m * n / (m + n)) * (terms[0] / (m * n) -
+                                        terms[1] / (2 * m**2) -
+                                        terms[2] / (2 * n**2))
+
+    npt.assert_allclose(tester.distance, exp_distance, rtol=1e-10)
+
+    dense_distance = tester.distance
+
+    tester.cramer_statistic(chunk_size=33, n_jobs=n_jobs)
+
+    npt.assert_allclose(tester.distance, dense_distance, rtol=1e-10)
+
+    tester.distance_metric(normalize=False, chunk_size=33, n_jobs=n_jobs)
+
+    npt.assert_allclose(tester.distance, dense_distance, rtol=1e-10)
+
+
+def test_cramer_permutation():
+    '''
+    Check the permutation null distribution against recomputing the
+    distance for the permuted data matrices.
+    '''
+
+    tester = Cramer_Distance(dataset1["cube"], dataset2["cube"],
+                             noise_value1=0.1, noise_value2=0.1)
+    tester.format_data(normalize=False)
+
+    p_value, null_dist = tester.permutation_test(n_perm=20, seed=4)
+
+    assert null_dist.shape == (20,)
+    assert 0 < p_value <= 1
+
+    pooled = np.vstack([tester.data_matrix1, tester.data_matrix2])
+    num1 = tester.data_matrix1.shape[0]
+
+    rng = np.random.RandomState(4)
+
+    for null_val in null_dist[:3]:
+        in_first = np.zeros(pooled.shape[0], dtype=bool)
+        in_first[rng.permutation(pooled.shape[0])[:num1]] = True
+
+        perm_tester = Cramer_Distance(dataset1["cube"], dataset2["cube"])
+        perm_tester._data_matrix1 = pooled[in_first]
+        perm_tester._data_matrix2 = pooled[~in_first]
+        perm_tester.cramer_statistic()
+
+        npt.assert_allclose(null_val, perm_tester.distance, rtol=1e-8)
+
+    # Chunked distances give the same permutations
+    p_value_chunk, null_dist_chunk = \
+        tester.permutation_test(n_perm=20, seed=4, chunk_size=64, n_jobs=2)
+
+    assert p_value_chunk == p_value
+    npt.assert_allclose(null_dist_chunk, null_dist, rtol=1e-8)
+
+
+def test_cramer_memmap_chunks(tmp_path):
+    '''
+    Reading a memory-mapped cube in chunks of channels should match the
+    in-memory data matrices.
+    '''
+
+    filename = str(tmp_path / "cramer_cube.fits")
+    fits.PrimaryHDU(dataset1["cube"][0].astype(float),
+                    dataset1["cube"][1]).writeto(filename)
+
+    tester = Cramer_Distance(dataset1["cube"][0].astype(float),
+                             dataset2["cube"], noise_value1=0.1,
+                             noise_value2=0.1)
+    tester.format_data(normalize=False)
+
+    with fits.open(filename, memmap=True) as hdulist:
+        tester_mm = Cramer_Distance(hdulist[0], dataset2["cube"],
+                                    noise_value1=0.1, noise_value2=0.1)
+        tester_mm.format_data(normalize=False, chunk_size=7)
+
+        npt.assert_allclose(tester_mm.data_matrix1, tester.data_matrix1)
+
+        del tester_mm
+
+
+def test_format_data_spectra_nonsquare():
+    '''
+    The brightest spectra should be selected correctly from cubes that are
+    not spatially square.
+    '''
+
+    cube = dataset1["cube"][0][:, :20, :].astype(float)
+
+    data_matrix = _format_data(cube, data_format='spectra', num_spec=10,
+                               normalize=False, chunk_size=9)
+
+    mom0 = np.nansum(cube, axis=0)
+    exp_posns = np.argsort(mom0.ravel())[-10:]
+
+    exp_spectra = cube.reshape((cube.shape[0], -1))[:, exp_posns]
+
+    npt.assert_allclose(np.sort(data_matrix.sum(0)),
+                        np.sort(exp_spectra.sum(0)))
@@ -3,10 +3,12 @@ from __future__ import print_function, absolute_import, division
 
 import pytest
 
+import numpy as np
 import numpy.testing as npt
 import astropy.units as u
 import os
 from astropy.io import fits
+from astropy.convolution import convolve_fft
 
 try:
     import pyfftw
@@ -15,6 +17,7 @@ except ImportError:
     PYFFTW_INSTALLED = False
 
 from ..statistics import DeltaVariance, DeltaVariance_Distance
+from ..statistics.delta_variance.kernels import core_kernel, annulus_kernel
 from ..simulator import make_extended
 from ._testing_data import \
     dataset1, dataset2, computed_data, computed_distances
@@ -200,3 +203,50 @@ def test_delvar_plaw_img(plaw, ellip):
     # Highly elliptical structure (0.2) leads to ~3% deviations
 
     npt.assert_allclose(plaw, test.slope + 2., rtol=0.04)
+
+
+@pytest.mark.parametrize(('boundary', 'nan_treatment'),
+                         [(boundary, nan_treatment) for boundary in
+                          ['wrap', 'fill']
+                          for nan_treatment in ['fill', 'interpolate']])
+def test_DelVar_shared_fft(boundary, nan_treatment):
+    '''
+    The convolutions sharing the image FFTs should match convolving with
+    astropy at each lag.
+    '''
+
+    img = dataset1["moment0"][0].copy()
+    img[10:15, 10:20] = np.nan
+
+    tester = DeltaVariance(fits.PrimaryHDU(img, dataset1["moment0"][1]),
+                           lags=[2., 4., 12., 16.] * u.pix)
+    tester.compute_deltavar(boundary=boundary, nan_treatment=nan_treatment,
+                            show_progress=False, keep_convolve_arrays=True)
+
+    fill_value = 0. if nan_treatment == 'fill' else np.nan
+
+    for lag, conv_arr in zip(tester.lags.value, tester._convolved_arrays):
+        core = core_kernel(lag, img.shape[0], img.shape[1])
+        annulus = annulus_kernel(lag, tester.diam_ratio, img.shape[0],
+                                 img.shape[1])
+
+        if boundary == 'wrap':
+            pad_weights = tester.weights
+            pad_img = img * tester.weights
+        else:
+            pad_weights = np.pad(tester.weights, int(lag), 'constant')
+            pad_img = np.pad(img, int(lag), 'constant') * pad_weights
+
+        convs = [convolve_fft(arr, kern, boundary=boundary,
+                              fill_value=fill_value,
+                              nan_treatment=nan_treatment)
+                 for arr in [pad_img, pad_weights]
+                 for kern in [core, annulus]]
+
+        cutoff_val = 0.01 * tester.weights.max()
+        for conv in convs[2:]:
+            conv[conv <= cutoff_val] = np.nan
+
+        exp_conv_arr = convs[0] / convs[2] - convs[1] / convs[3]
+
+        npt.assert_allclose(conv_arr, exp_conv_arr, rtol=1e-10, atol=1e-10)
@@ -0,0 +1,157 @@
+# Licensed under an MIT open source license - see LICENSE
+from __future__ import print_function, absolute_import, division
+
+import pytest
+import numpy.testing as npt
+
+from .. import fft as fft_backends
+from ..fft import (get_backend, set_backend, fft_backend, register_backend,
+                   unregister_backend, NumpyFFTBackend)
+from ..statistics import PowerSpectrum, DeltaVariance
+from ..statistics.stats_utils import fourier_shift
+from ._testing_data import dataset1
+
+PYFFTW_INSTALLED = fft_backends.PYFFTW_FLAG
+
+
+@pytest.mark.parametrize('name',
+                         [name for name in ['scipy', 'pyfftw']
+                          if name in fft_backends.available_backends()])
+def test_backends_match_numpy(name):
+
+    img = dataset1['moment0'][0]
+
+    backend = get_backend(name, threads=2)
+    np_backend = get_backend('numpy')
+
+    npt.assert_allclose(backend.rfftn(img), np_backend.rfftn(img),
+                        atol=1e-10)
+    npt.assert_allclose(backend.fft2(img), np_backend.fft2(img),
+                        atol=1e-10)
+
+    grid_shape = (img.shape[0] + 5, img.shape[1] + 3)
+    img_fft = backend.rfftn(img, s=grid_shape)
+    npt.assert_allclose(backend.irfftn(img_fft, s=grid_shape),
+                        np_backend.irfftn(img_fft, s=grid_shape),
+                        atol=1e-10)
+
+
+def test_backend_context():
+
+    default = get_backend()
+
+    with fft_backend('numpy') as backend:
+        assert get_backend() is backend
+
+    assert get_backend() is default
+
+    # Backends with the same settings are shared
+    assert get_backend('numpy', threads=1) is get_backend('numpy')
+
+    with pytest.raises(ValueError):
+        get_backend('not_a_backend')
+
+
+def test_register_backend():
+
+    class CountingBackend(NumpyFFTBackend):
+        calls = 0
+
+        def _transform(self, kind, arr, s=None, axes=None):
+            CountingBackend.calls += 1
+            return super(CountingBackend, self)._transform(kind, arr, s=s,
+                                                           axes=axes)
+
+    register_backend('counting', CountingBackend)
+
+    try:
+        with fft_backend('counting'):
+            pspec = PowerSpectrum(dataset1["moment0"])
+            pspec.compute_pspec()
+    finally:
+        unregister_backend('counting')
+
+    assert CountingBackend.calls > 0
+    assert 'counting' not in fft_backends.available_backends()
+
+    pspec_np = PowerSpectrum(dataset1["moment0"])
+    pspec_np.compute_pspec()
+
+    npt.assert_allclose(pspec.ps2D, pspec_np.ps2D)
+
+
+def test_get_backend_unhashable_kwargs():
+
+    class OptionsBackend(NumpyFFTBackend):
+        def __init__(self, threads=1, options=None):
+            super(OptionsBackend, self).__init__(threads=threads)
+            self.options = options
+
+    register_backend('options', OptionsBackend)
+
+    try:
+        backend = get_backend('options', options=['a', 'b'])
+        assert backend.options == ['a', 'b']
+
+        # Unhashable settings are not shared between calls
+        assert get_backend('options', options=['a', 'b']) is not backend
+        assert get_backend('options', options=('a', 'b')) is \
+            get_backend('options', options=('a', 'b'))
+    finally:
+        unregister_backend('options')
+
+
+@pytest.mark.skipif("'scipy' not in fft_backends.available_backends()")
+def test_fourier_shift_backend():
+
+    spec = dataset1['cube'][0][:, 10, 10]
+
+    shifted = fourier_shift(spec, 2.3)
+
+    with fft_backend('scipy'):
+        shifted_sp = fourier_shift(spec, 2.3)
+
+    npt.assert_allclose(shifted_sp, shifted, atol=1e-10)
+
+
+def test_module_docstring():
+    assert fft_backends.__doc__ is not None
+
+
+@pytest.mark.skipif("'scipy' not in fft_backends.available_backends()")
+def test_set_backend_delvar():
+
+    tester = DeltaVariance(dataset1["moment0"])
+    tester.compute_deltavar()
+
+    previous = set_backend('scipy', threads=2)
+    try:
+        tester_sp = DeltaVariance(dataset1["moment0"])
+        tester_sp.compute_deltavar()
+    finally:
+        set_backend(previous)
+
+    npt.assert_allclose(tester.delta_var, tester_sp.delta_var)
+
+
+@pytest.mark.skipif("not PYFFTW_INSTALLED")
+def test_pyfftw_plan_cache():
+
+    backend = fft_backends.PyFFTWBackend(threads=1, cache_size=2)
+
+    img = dataset1['moment0'][0]
+
+    out1 = backend.rfftn(img)
+    out2 = backend.rfftn(img * 2)
+
+    # The plan is reused, and the outputs are not overwritten.
+    assert len(backend._plans) == 1
+    npt.assert_allclose(out2, 2 * out1)
+
+    backend.rfftn(img[:10])
+    backend.rfftn(img[:12])
+
+    assert len(backend._plans) == 2
+
+    backend.clear_cache()
+    assert len(backend._plans) == 0
@@ -5,15 +5,22 @@ from __future__ import print_function, absolute_import, division
 Test functions for Genus
 '''
 
+import pytest
 import numpy as np
 import numpy.testing as npt
 import astropy.units as u
+from astropy.io import fits
+from astropy.convolution import Gaussian2DKernel, convolve_fft
 from copy import copy
 import os
+import scipy.ndimage as nd
 
 from ..statistics import Genus_Distance, Genus
+from ..statistics.genus.genus import remove_small_objects
 from ._testing_data import \
     dataset1, dataset2, computed_data, computed_distances
+from ..simulator import make_extended
+from .. import fft as fft_backends
 
 
 def test_Genus_method():
@@ -115,3 +122,187 @@ def test_Genus_distance():
 
     npt.assert_almost_equal(tester_dist.distance,
                             computed_distances['genus_distance'])
+
+
+@pytest.mark.parametrize(('connectivity', 'enable_small_removal'),
+                         [(connectivity, small_removal) for connectivity
+                          in [1, 2] for small_removal in [True, False]])
+def test_Genus_sweep(connectivity, enable_small_removal):
+    '''
+    The union-find sweep should give the same genus values as labeling the
+    regions at each threshold.
+    '''
+
+    img = dataset1["moment0"][0].copy()
+    img[5:10, 10:12] = np.nan
+
+    smooth_scales = np.array([1.0, 2.0])
+
+    tester = Genus(fits.PrimaryHDU(img), smoothing_radii=smooth_scales,
+                   numpts=30)
+    tester.make_genus_curve(method='label', min_size=3,
+                            connectivity=connectivity,
+                            enable_small_removal=enable_small_removal,
+                            preserve_nan=True)
+
+    tester_sweep = Genus(fits.PrimaryHDU(img), smoothing_radii=smooth_scales,
+                         numpts=30)
+    tester_sweep.make_genus_curve(method='sweep', min_size=3,
+                                  connectivity=connectivity,
+                                  enable_small_removal=enable_small_removal,
+                                  preserve_nan=True)
+
+    npt.assert_equal(tester_sweep.genus_stats, tester.genus_stats)
+
+
+@pytest.mark.parametrize('method', ['sweep', 'label'])
+def test_Genus_n_jobs(method):
+    '''
+    Computing the genus in parallel should not change the values.
+    '''
+
+    img = dataset1["moment0"][0].copy()
+    img[5:10, 10:12] = np.nan
+
+    smooth_scales = np.array([1.0, 2.0])
+
+    tester = Genus(fits.PrimaryHDU(img), smoothing_radii=smooth_scales,
+                   numpts=30)
+    tester.make_genus_curve(method=method, preserve_nan=True)
+
+    tester_par = Genus(fits.PrimaryHDU(img), smoothing_radii=smooth_scales,
+                       numpts=30)
+    tester_par.make_genus_curve(method=method, preserve_nan=True, n_jobs=3,
+                                keep_smoothed_images=True)
+
+    npt.assert_equal(tester_par.genus_stats, tester.genus_stats)
+    npt.assert_equal(tester_par.smoothed_means, tester.smoothed_means)
+    assert tester_par.smoothed_images.shape == (2,) + img.shape
+
+
+def test_Genus_fourier_smoothing():
+    '''
+    Smoothing with the analytic Gaussian transform should match convolving
+    with a large kernel.
+    '''
+
+    img = dataset1["moment0"][0].copy()
+    img[5:10, 10:12] = np.nan
+
+    smooth_scales = np.array([2.0, 4.0])
+
+    tester = Genus(fits.PrimaryHDU(img), smoothing_radii=smooth_scales,
+                   numpts=30)
+    tester.make_genus_curve(smoothing_method='fourier',
+                            keep_smoothed_images=True,
+                            smoothed_dtype=np.float32,
+                            preserve_nan=True)
+
+    assert tester.smoothed_images.shape == (2,) + img.shape
+    assert tester.smoothed_images.dtype == np.float32
+
+    for width, smooth_img in zip(smooth_scales, tester.smoothed_images):
+        kernel = Gaussian2DKernel(width, x_size=int(10 * width) * 2 + 1,
+                                  y_size=int(10 * width) * 2 + 1)
+        exp_img = convolve_fft(img, kernel, preserve_nan=True)
+
+        npt.assert_allclose(smooth_img, exp_img,
+                            atol=1e-5 * np.nanmax(exp_img))
+
+    # Periodic boundaries. The kernels must fit within the image, otherwise
+    # convolve_fft is used.
+    img = dataset1["moment0"][0]
+
+    smooth_scales = np.array([2.0, 3.0])
+
+    tester = Genus(fits.PrimaryHDU(img), smoothing_radii=smooth_scales,
+                   numpts=30)
+    tester.make_genus_curve(smoothing_method='fourier',
+                            keep_smoothed_images=True, boundary='wrap')
+
+    for width, smooth_img in zip(smooth_scales, tester.smoothed_images):
+        exp_img = nd.gaussian_filter(img, width, mode='wrap', truncate=10)
+
+        npt.assert_allclose(smooth_img, exp_img,
+                            atol=1e-8 * np.nanmax(exp_img))
+
+
+def test_Genus_fourier_wrap_large_kernel():
+    '''
+    With periodic boundaries, radii with kernels larger than the image
+    should still match convolve_fft, which pads the image to the kernel.
+    '''
+
+    img = make_extended(32, powerlaw=3., return_fft=False, randomseed=32)
+
+    smooth_scales = np.array([2.0, 6.0])
+
+    tester = Genus(fits.PrimaryHDU(img), smoothing_radii=smooth_scales,
+                   numpts=30)
+    tester.make_genus_curve(keep_smoothed_images=True, boundary='wrap')
+
+    tester_fourier = Genus(fits.PrimaryHDU(img), smoothing_radii=smooth_scales,
+                           numpts=30)
+    tester_fourier.make_genus_curve(smoothing_method='fourier',
+                                    keep_smoothed_images=True,
+                                    boundary='wrap')
+
+    npt.assert_allclose(tester_fourier.smoothed_images,
+                        tester.smoothed_images,
+                        atol=1e-3 * np.abs(tester.smoothed_images).max())
+
+
+@pytest.mark.skipif("not fft_backends.PYFFTW_FLAG")
+def test_GenusDist_fourier_shared_plans():
+    '''
+    The two images have the same shape, so the second reuses the FFT plans
+    made for the first.
+    '''
+
+    genus_kwargs = dict(smoothing_method='fourier')
+
+    with fft_backends.fft_backend('pyfftw') as backend:
+        backend.clear_cache()
+
+        tester_dist = Genus_Distance(dataset1["moment0"], dataset2["moment0"],
+                                     smoothing_radii=np.array([2.0, 3.0]),
+                                     genus_kwargs=genus_kwargs)
+
+        # One forward and one inverse transform.
+        assert len(backend._plans) == 2
+
+    exp_dist = Genus_Distance(dataset1["moment0"], dataset2["moment0"],
+                              smoothing_radii=np.array([2.0, 3.0]),
+                              genus_kwargs=genus_kwargs)
+
+    npt.assert_equal(tester_dist.genus1.genus_stats,
+                     exp_dist.genus1.genus_stats)
+    npt.assert_equal(tester_dist.genus2.genus_stats,
+                     exp_dist.genus2.genus_stats)
+
+
+@pytest.mark.parametrize('connectivity', [1, 2])
+def test_remove_small_objects(connectivity):
+    '''
+    Compare to removing each small region individually.
+    '''
+
+    rng = np.random.RandomState(2349)
+
+    arr = rng.rand(50, 60) > 0.6
+
+    struct = nd.generate_binary_structure(2, connectivity)
+    labels, num = nd.label(arr, struct)
+
+    exp_arr = arr.copy()
+    for i in range(1, num + 1):
+        if (labels == i).sum() < 4:
+            exp_arr[labels == i] = False
+
+    npt.assert_equal(remove_small_objects(arr.copy(), 4,
+                                          connectivity=connectivity),
+                     exp_arr)
+
+    # Precomputed labels should give the same result.
+    npt.assert_equal(remove_small_objects(arr.copy(), 4, labels=labels),
+                     exp_arr)
@@ -7,6 +7,7 @@ import numpy as np
 import numpy.testing as npt
 import astropy.units as u
 import astropy.constants as const
+from astropy.io import fits
 import os
 
 try:
@@ -17,6 +18,7 @@ except ImportError:
 
 from ..statistics import PCA, PCA_Distance
 from ..statistics.pca.width_estimate import WidthEstimate1D, WidthEstimate2D
+from ..statistics.threeD_to_twoD import var_cov_cube
 from ._testing_data import (dataset1, dataset2, computed_data,
                             computed_distances)
 from .generate_test_images import generate_2D_array, generate_1D_array
@@ -209,6 +211,114 @@ def test_PCA_distance():
                             computed_distances['pca_distance'])
 
 
+def test_var_cov_cube():
+
+    cube = dataset1["cube"][0].copy()
+
+    # Without NaNs and mean subtraction, this is the usual covariance.
+    cov = var_cov_cube(cube, mean_sub=True, progress_bar=False)
+    npt.assert_allclose(cov, np.cov(cube.reshape((cube.shape[0], -1))))
+
+    # Chunking over the pixels should not change the result.
+    cube[:, 10:15, 10:20] = np.nan
+    cube[3] = np.nan
+
+    for mean_sub in [False, True]:
+        cov = var_cov_cube(cube, mean_sub=mean_sub, progress_bar=False)
+        cov_chunk = var_cov_cube(cube, mean_sub=mean_sub,
+                                 progress_bar=False, chunk_size=77)
+        npt.assert_allclose(cov, cov_chunk)
+        assert np.isfinite(cov).all()
+
+
+def test_PCA_memmap_chunks(tmp_path):
+    '''
+    A memory-mapped FITS cube processed in chunks should match the
+    in-memory result.
+    '''
+
+    filename = str(tmp_path / "pca_cube.fits")
+    fits.PrimaryHDU(dataset1["cube"][0].astype(float),
+                    dataset1["cube"][1]).writeto(filename)
+
+    tester = PCA(dataset1["cube"])
+    tester.compute_pca(mean_sub=True, n_eigs=5, show_progress=False)
+
+    with fits.open(filename, memmap=True) as hdulist:
+        tester_mm = PCA(hdulist[0])
+        tester_mm.compute_pca(mean_sub=True, n_eigs=5, show_progress=False,
+                              chunk_size=100)
+
+        npt.assert_allclose(tester.eigvals[:5], tester_mm.eigvals[:5])
+        npt.assert_allclose(tester.eigimages(), tester_mm.eigimages(),
+                            atol=1e-12)
+
+        del tester_mm
+
+
+@pytest.mark.parametrize(('solver', 'mean_sub'),
+                         [(solver, mean_sub) for solver in
+                          ['truncated', 'randomized']
+                          for mean_sub in [False, True]])
+def test_PCA_solvers(solver, mean_sub):
+    '''
+    The partial eigensolvers should recover the leading eigenvalues and
+    the variance from the full decomposition.
+    '''
+
+    tester = PCA(dataset1["cube"])
+    tester.compute_pca(mean_sub=mean_sub, n_eigs=5, show_progress=False)
+
+    tester_part = PCA(dataset1["cube"])
+    tester_part.compute_pca(mean_sub=mean_sub, n_eigs=5, show_progress=False,
+                            solver=solver, seed=0)
+
+    assert tester_part.eigvals.size == 5
+
+    npt.assert_allclose(tester_part.eigvals, tester.eigvals[:5], rtol=1e-6)
+    npt.assert_allclose(tester_part.total_variance, tester.total_variance)
+    npt.assert_allclose(tester_part.var_proportion, tester.var_proportion,
+                        rtol=1e-6)
+    npt.assert_allclose(np.abs(tester_part.eigvecs),
+                        np.abs(tester.eigvecs[:, :5]), atol=1e-3)
+
+    # The noise components are not computed by the partial solvers
+    with pytest.raises(ValueError):
+        tester_part.noise_ACF()
+
+    with pytest.raises(ValueError):
+        PCA(dataset1["cube"]).run(n_eigs=5, solver=solver)
+
+    PCA(dataset1["cube"]).run(n_eigs=5, solver=solver, decomp_only=True)
+
+
+def test_PCA_autocorr_batched():
+    '''
+    The batched autocorrelation images and spectra should match the
+    per-component transforms.
+    '''
+
+    tester = PCA(dataset1["cube"])
+    tester.compute_pca(mean_sub=True, n_eigs=5, show_progress=False)
+
+    eigimgs = tester.eigimages(5).swapaxes(1, 2)
+
+    acors = np.empty_like(eigimgs)
+    tester.autocorr_images(5, out=acors, batch_size=2)
+
+    for img, acor in zip(eigimgs, acors):
+        fftx = np.fft.fft2(img)
+        exp_acor = np.fft.fftshift(np.fft.ifft2(np.abs(fftx - fftx.mean())**2))
+        npt.assert_allclose(acor, exp_acor.real, atol=1e-10)
+
+    acor_spec = tester.autocorr_spec(5)
+
+    for i in range(5):
+        fftx = np.fft.fft(tester.eigvecs[:, i])
+        exp_acor = np.fft.ifft(np.abs(fftx - fftx.mean())**2)
+        npt.assert_allclose(acor_spec[:, i], exp_acor.real, atol=1e-10)
+
+
 @pytest.mark.parametrize(('method'), ('fit', 'contour', 'interpolate',
                                       'xinterpolate'))
 def test_spatial_width_methods(method):
@@ -22,6 +22,9 @@ except ImportError:
     RADIO_BEAM_INSTALLED = False
 
 from ..statistics import PowerSpectrum, PSpec_Distance
+from ..statistics.psds import (pspec, pspec_stack, get_radial_binner,
+                               clear_radial_binner_cache,
+                               make_radial_freq_arrays)
 from ._testing_data import (dataset1, dataset2, computed_data,
                             computed_distances)
 from ..simulator import make_extended
@@ -124,6 +127,175 @@ def test_pspec_nonequal_shape():
     npt.assert_almost_equal(test.slope2D, test_T.slope2D, decimal=3)
 
 
+@pytest.mark.parametrize(('shape', 'theta_0'),
+                         [(shape, theta_0) for shape in
+                          [(32, 32), (31, 32), (32, 31), (31, 31)]
+                          for theta_0 in [None, 30 * u.deg]])
+def test_pspec_rfft_halfplane(shape, theta_0):
+    '''
+    The 1D spectrum from the rfft half-plane should match the spectrum
+    from the full 2D spectrum.
+    '''
+
+    rng = np.random.RandomState(3)
+    img = rng.randn(*shape)
+
+    ps2D_half = np.abs(np.fft.rfft2(img))**2
+    ps2D_full = np.fft.fftshift(np.abs(np.fft.fft2(img))**2)[::-1]
+
+    kwargs = dict(return_stddev=True, logspacing=False)
+    if theta_0 is not None:
+        kwargs['theta_0'] = theta_0
+        kwargs['delta_theta'] = 40 * u.deg
+
+    for return_freqs in [True, False]:
+        out_full = pspec(ps2D_full, return_freqs=return_freqs, **kwargs)
+        out_half = pspec(ps2D_half, return_freqs=return_freqs,
+                         rfft_shape=shape, **kwargs)
+
+        # Bins with only a pixel and its Hermitian partner have a std of
+        # exactly 0 from the half-plane, but not in the full FFT.
+        for val_full, val_half in zip(out_full, out_half):
+            npt.assert_allclose(val_half, val_full, rtol=1e-10,
+                                atol=1e-10 * ps2D_full.max())
+
+    test = PowerSpectrum(fits.PrimaryHDU(img))
+    test.compute_pspec()
+
+    npt.assert_allclose(test.ps2D, ps2D_full, rtol=1e-10)
+
+
+def test_radial_binner():
+    '''
+    Check the cached bin indices against binning each bin directly.
+    '''
+
+    clear_radial_binner_cache()
+
+    rng = np.random.RandomState(5)
+    psd2 = rng.rand(31, 28)
+    psd2[3, 4] = np.nan
+
+    bins = np.linspace(0.02, 0.5, 12)
+
+    binner = get_radial_binner(psd2.shape, bins)
+
+    assert get_radial_binner(psd2.shape, bins) is binner
+    assert get_radial_binner(psd2.shape, bins[:-1]) is not binner
+
+    means, stddevs, bin_cts = binner.stats(psd2)
+    medians = binner.apply(psd2, np.median)
+
+    yy_freq, xx_freq = make_radial_freq_arrays(psd2.shape)
+    dists = np.sqrt(yy_freq**2 + xx_freq**2)
+
+    for i in range(len(bins) - 1):
+        if i == len(bins) - 2:
+            in_bin = (dists >= bins[i]) & (dists <= bins[i + 1])
+        else:
+            in_bin = (dists >= bins[i]) & (dists < bins[i + 1])
+
+        bin_vals = psd2[in_bin & np.isfinite(psd2)]
+
+        assert bin_cts[i] == bin_vals.size
+        npt.assert_allclose(means[i], bin_vals.mean())
+        npt.assert_allclose(stddevs[i], bin_vals.std(ddof=1))
+        npt.assert_allclose(medians[i], np.median(bin_vals))
+
+    with pytest.raises(ValueError):
+        binner.stats(psd2[:, :10])
+
+
+def test_radial_binner_bootstrap():
+    '''
+    Compare the vectorized bootstrap to astropy's bootstrap in each bin.
+    '''
+
+    from astropy.stats import bootstrap
+
+    rng = np.random.RandomState(5)
+    psd2 = rng.rand(64, 64)
+
+    bins = np.linspace(0.05, 0.5, 8)
+
+    binner = get_radial_binner(psd2.shape, bins)
+
+    boot_stds = binner.bootstrap_stddev(psd2, 200, seed=3)
+
+    # Reproducible with the seed
+    npt.assert_equal(boot_stds, binner.bootstrap_stddev(psd2, 200, seed=3))
+
+    exp_stds = binner.apply(psd2,
+                            lambda data: np.mean(bootstrap(data, 200,
+                                                           bootfunc=np.std)))
+
+    npt.assert_allclose(boot_stds, exp_stds, rtol=0.02)
+
+    # Each spectrum in a stack is resampled within its own bins
+    stack_stds = binner.bootstrap_stddev(np.array([psd2, 2 * psd2]), 200,
+                                         seed=3)
+
+    assert stack_stds.shape == (2, len(bins) - 1)
+    npt.assert_allclose(stack_stds[1], 2 * stack_stds[0], rtol=0.05)
+
+    out = pspec(psd2, return_stddev=True, boot_iter=200, seed=3,
+                logspacing=False)
+    out2 = pspec(psd2, return_stddev=True, boot_iter=200, seed=3,
+                 logspacing=False)
+
+    npt.assert_equal(out[2], out2[2])
+
+
+@pytest.mark.parametrize(('rfft', 'theta_0'),
+                         [(rfft, theta_0) for rfft in [False, True]
+                          for theta_0 in [None, 45 * u.deg]])
+def test_pspec_stack(rfft, theta_0):
+    '''
+    Per-channel spectra from the stack should match running pspec on each
+    channel.
+    '''
+
+    cube = dataset1["cube"][0][:6].astype(float)
+
+    if rfft:
+        ps2D = np.abs(np.fft.rfft2(cube))**2
+        kwargs = dict(rfft_shape=cube.shape[1:])
+    else:
+        ps2D = np.fft.fftshift(np.abs(np.fft.fft2(cube))**2,
+                               axes=(1, 2))[:, ::-1]
+        kwargs = dict()
+
+    if theta_0 is not None:
+        kwargs['theta_0'] = theta_0
+        kwargs['delta_theta'] = 30 * u.deg
+
+    out = pspec_stack(ps2D, **kwargs)
+
+    assert out[1].shape == (cube.shape[0], out[0].size)
+
+    for i in range(cube.shape[0]):
+        out_chan = pspec(ps2D[i], return_stddev=True, **kwargs)
+
+        npt.assert_allclose(out[0], out_chan[0])
+        npt.assert_allclose(out[1][i], out_chan[1])
+        npt.assert_allclose(out[2][i], out_chan[2])
+
+        if theta_0 is not None:
+            npt.assert_equal(out[4], out_chan[3])
+
+    if theta_0 is not None:
+        # The masks are copies of the cached binner's mask, so changing
+        # them does not affect later calls.
+        exp_mask = out[4].copy()
+
+        out[4][:] = False
+        out_chan[3][:] = False
+
+        npt.assert_equal(pspec_stack(ps2D, **kwargs)[4], exp_mask)
+        npt.assert_equal(pspec(ps2D[0], return_stddev=True, **kwargs)[3],
+                         exp_mask)
+
+
 @pytest.mark.parametrize(('plaw', 'ellip'),
                          [(plaw, ellip) for plaw in [3, 4]
                           for ellip in [0.2, 0.5, 0.75, 0.9, 1.0]])
@@ -3,7 +3,7 @@ from __future__ import print_function, absolute_import, division
 
 import pytest
 
-from ..statistics.rfft_to_fft import rfft_to_fft
+from ..statistics.rfft_to_fft import rfft_to_fft, expand_rfft
 from ._testing_data import dataset1
 
 
@@ -36,6 +36,19 @@ def test_fft_to_rfft():
     npt.assert_allclose(test_fft, comp_rfft)
 
 
+@pytest.mark.parametrize('shape', [(16, 16), (15, 16), (16, 15),
+                                   (15, 15), (6, 7, 8), (7, 6, 5)])
+def test_expand_rfft(shape):
+
+    rng = np.random.RandomState(3)
+    arr = rng.randn(*shape)
+
+    half = np.abs(np.fft.rfftn(arr))
+
+    npt.assert_allclose(expand_rfft(half, shape[-1]),
+                        np.abs(np.fft.fftn(arr)))
+
+
 @pytest.mark.skipif("not PYFFTW_INSTALLED")
 def test_fftw():
     comp_rfft = rfft_to_fft(dataset1['moment0'][0])
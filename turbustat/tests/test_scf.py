@@ -100,6 +100,42 @@ def test_SCF_method_noncont_boundary():
                        computed_data['scf_val_noncon_bound'])
 
 
+@pytest.mark.parametrize(('boundary', 'add_nans'),
+                         [(boundary, add_nans) for boundary in
+                          ['continuous', 'cut'] for add_nans in
+                          [False, True]])
+def test_SCF_precompute_method(boundary, add_nans):
+
+    cube = dataset1["cube"][0].copy()
+
+    if add_nans:
+        cube[:, 3, 3] = np.nan
+        cube[2, 10:15, 5:8] = np.nan
+
+    tester = SCF([cube, dataset1["cube"][1]], size=11)
+    tester.compute_surface(boundary=boundary, show_progress=False)
+
+    tester_pre = SCF([cube, dataset1["cube"][1]], size=11)
+    tester_pre.compute_surface(boundary=boundary, show_progress=False,
+                               method='precompute')
+
+    npt.assert_allclose(tester.scf_surface, tester_pre.scf_surface)
+
+
+@pytest.mark.parametrize('method', ['shift', 'precompute'])
+def test_SCF_parallel(method):
+
+    tester = SCF(dataset1["cube"], size=11)
+    tester.compute_surface(boundary='cut', show_progress=False,
+                           method=method)
+
+    tester_par = SCF(dataset1["cube"], size=11)
+    tester_par.compute_surface(boundary='cut', show_progress=False,
+                               method=method, n_jobs=2)
+
+    npt.assert_array_equal(tester.scf_surface, tester_par.scf_surface)
+
+
 def test_SCF_noninteger_shift():
     # Not testing against anything, just make sure it runs w/o issue.
     rolls = np.array([-4.5, -3.0, -1.5, 0, 1.5, 3.0, 4.5]) * u.pix
@@ -84,6 +84,29 @@ def test_moments_nonperiodic():
                        computed_data['skewness_nonper_val'])
 
 
+@pytest.mark.parametrize(('periodic', 'add_nans'),
+                         [(periodic, add_nans) for periodic in
+                          [True, False] for add_nans in [False, True]])
+def test_moments_convolve(periodic, add_nans):
+
+    img = dataset1["moment0"][0].copy()
+    if add_nans:
+        img[10:15, 10:20] = np.nan
+        img[30, 30] = np.nan
+
+    tester = StatMoments([img, dataset1["moment0"][1]])
+    tester.compute_spatial_distrib(periodic=periodic, show_progress=False)
+
+    tester2 = StatMoments([img, dataset1["moment0"][1]])
+    tester2.compute_spatial_distrib(periodic=periodic, show_progress=False,
+                                    method='convolve')
+
+    for name in ['mean_array', 'variance_array', 'skewness_array',
+                 'kurtosis_array']:
+        npt.assert_allclose(getattr(tester, name), getattr(tester2, name),
+                            rtol=1e-6, atol=1e-10)
+
+
 def test_moment_distance():
     tester_dist = \
         StatMoments_Distance(dataset1["moment0"],
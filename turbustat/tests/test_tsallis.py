@@ -9,6 +9,7 @@ import astropy.units as u
 import os
 
 from ..statistics import Tsallis  # , Tsallis_Distance
+from ..statistics.tsallis.tsallis import _lag_increments
 from ._testing_data import (dataset1, dataset2, computed_data,
                             computed_distances)
 
@@ -90,6 +91,113 @@ def test_Tsallis_lagunits():
                         computed_data['tsallis_val'], atol=0.01)
 
 
+@pytest.mark.parametrize('periodic', [True, False])
+def test_Tsallis_lag_storage(periodic, tmp_path):
+    '''
+    The histograms should not depend on how the lag arrays are stored.
+    '''
+
+    tester = Tsallis(dataset1["moment0"],
+                     lags=[1, 2, 4, 8, 16] * u.pix)
+    tester.make_tsallis(num_bins=100, periodic=periodic)
+
+    # Compare to shifting the padded image
+    img = dataset1["moment0"][0]
+    pad = 0 if periodic else 2
+    pad_img = np.pad(img, pad, mode='constant')
+    rolls = np.roll(pad_img, 2, axis=0) + np.roll(pad_img, -2, axis=0) + \
+        np.roll(pad_img, 2, axis=1) + np.roll(pad_img, -2, axis=1)
+    diff = rolls / 4. - pad_img
+    diff = diff[pad:pad_img.shape[0] - pad, pad:pad_img.shape[1] - pad]
+    diff = (diff - np.nanmean(diff)) / np.nanstd(diff)
+
+    npt.assert_allclose(tester.lag_arrays[1], diff)
+
+    tester_hist = Tsallis(dataset1["moment0"],
+                          lags=[1, 2, 4, 8, 16] * u.pix)
+    tester_hist.make_tsallis(num_bins=100, periodic=periodic,
+                             keep_lag_arrays=False)
+
+    npt.assert_equal(tester_hist.lag_distribs, tester.lag_distribs)
+
+    with pytest.raises(ValueError):
+        tester_hist.lag_arrays
+
+    tester_run = Tsallis(dataset1["moment0"],
+                         lags=[1, 2, 4, 8, 16] * u.pix)
+    tester_run.run(num_bins=100, periodic=periodic, keep_lag_arrays=False)
+
+    npt.assert_equal(tester_run.lag_distribs, tester.lag_distribs)
+
+    with pytest.raises(ValueError):
+        tester_run.lag_arrays
+
+    filename = str(tmp_path / "lag_arrays.npy")
+
+    tester_mmap = Tsallis(dataset1["moment0"],
+                          lags=[1, 2, 4, 8, 16] * u.pix)
+    tester_mmap.make_tsallis(num_bins=100, periodic=periodic,
+                             lag_arrays_file=filename,
+                             lag_arrays_dtype=np.float32)
+
+    npt.assert_equal(tester_mmap.lag_distribs, tester.lag_distribs)
+
+    lag_arrays = np.load(filename, mmap_mode='r')
+    assert lag_arrays.dtype == np.float32
+    npt.assert_allclose(lag_arrays, tester.lag_arrays, rtol=1e-6)
+
+    img = dataset1["moment0"][0]
+
+    with pytest.raises(ValueError):
+        _lag_increments(img, 0)
+
+    with pytest.raises(ValueError):
+        _lag_increments(img, min(img.shape) + 1, periodic=False)
+
+    # Periodic lags wrap around the image, as np.roll does.
+    for lag in [img.shape[0], img.shape[0] + 3]:
+        rolls = np.roll(img, lag, axis=0) + np.roll(img, -lag, axis=0) + \
+            np.roll(img, lag, axis=1) + np.roll(img, -lag, axis=1)
+
+        npt.assert_allclose(_lag_increments(img, lag), rolls / 4. - img)
+
+
+def test_Tsallis_fit_options():
+    '''
+    Fitting in parallel or from the previous lag's parameters should give
+    the same fits.
+    '''
+
+    tester = Tsallis(dataset1["moment0"],
+                     lags=[1, 2, 4, 8, 16] * u.pix)
+    tester.make_tsallis(num_bins=100, periodic=True)
+    tester.fit_tsallis(sigma_clip=5)
+
+    params = tester.tsallis_params.copy()
+    stderrs = tester.tsallis_stderrs.copy()
+    chisq = tester.tsallis_chisq.copy()
+
+    tester.fit_tsallis(sigma_clip=5, n_jobs=2)
+
+    npt.assert_equal(tester.tsallis_params, params)
+    npt.assert_equal(tester.tsallis_stderrs, stderrs)
+    npt.assert_equal(tester.tsallis_chisq, chisq)
+
+    tester.fit_tsallis(sigma_clip=5, initial_guess='previous')
+
+    npt.assert_allclose(tester.tsallis_params, params, rtol=1e-3)
+    assert tester.tsallis_chisq.shape == chisq.shape
+
+    with pytest.raises(ValueError):
+        tester.fit_tsallis(initial_guess='previous', n_jobs=2)
+
+    tester_run = Tsallis(dataset1["moment0"],
+                         lags=[1, 2, 4, 8, 16] * u.pix)
+    tester_run.run(num_bins=100, periodic=True, n_jobs=2)
+
+    npt.assert_equal(tester_run.tsallis_params, params)
+
+
 # def test_Tsallis_distance():
 #     kwarg_dict = dict(num_bins=100, periodic=True)
 #     tester_dist = \
@@ -8,6 +8,7 @@ import numpy.testing as npt
 import astropy.units as u
 import os
 from astropy.io import fits
+from astropy.convolution import convolve_fft
 
 try:
     import pyfftw
@@ -16,6 +17,8 @@ except ImportError:
     PYFFTW_INSTALLED = False
 
 from ..statistics import Wavelet, Wavelet_Distance
+from ..statistics.wavelets.wavelet_transform import (_ricker_fourier_convolve,
+                                                     RickerWavelet2DKernel)
 from ._testing_data import \
     dataset1, dataset2, computed_data, computed_distances
 from ..simulator import make_extended
@@ -160,6 +163,75 @@ def test_Wavelet_method_fftw():
     npt.assert_almost_equal(tester.slope, computed_data['wavelet_slope'])
 
 
+def test_Wavelet_method_fourier():
+    '''
+    The analytic Fourier transform of the wavelet should match convolving
+    with the kernel, up to the truncation of the astropy kernel.
+    '''
+
+    tester = Wavelet(dataset1["moment0"])
+    tester.compute_transform(show_progress=False)
+
+    tester_fourier = Wavelet(dataset1["moment0"])
+    tester_fourier.compute_transform(show_progress=False, method='fourier',
+                                     keep_convolved_arrays=True)
+
+    npt.assert_allclose(tester_fourier.values, tester.values, rtol=0.01)
+
+    # The batching of the scales only changes the padding of the grid.
+    tester_batch = Wavelet(dataset1["moment0"])
+    tester_batch.compute_transform(show_progress=False, method='fourier',
+                                   keep_convolved_arrays=True, batch_size=7)
+
+    npt.assert_allclose(tester_batch.Wf, tester_fourier.Wf,
+                        atol=1e-5 * np.abs(tester_fourier.Wf).max())
+
+
+def test_Wavelet_fourier_wrap_large_kernel():
+    '''
+    With periodic boundaries, scales with kernels larger than the image
+    should still match convolve_fft, which pads the image to the kernel.
+    '''
+
+    img = make_extended(32, powerlaw=3., return_fft=False, randomseed=32)
+
+    scales = np.array([1.5, 3., 4., 6.]) * u.pix
+
+    tester = Wavelet(fits.PrimaryHDU(img), scales=scales)
+    tester.compute_transform(show_progress=False, keep_convolved_arrays=True,
+                             convolve_kwargs={'boundary': 'wrap'})
+
+    tester_fourier = Wavelet(fits.PrimaryHDU(img), scales=scales)
+    tester_fourier.compute_transform(show_progress=False, method='fourier',
+                                     keep_convolved_arrays=True,
+                                     convolve_kwargs={'boundary': 'wrap'})
+
+    npt.assert_allclose(tester_fourier.Wf, tester.Wf,
+                        atol=5e-3 * np.abs(tester.Wf).max())
+
+
+def test_Wavelet_fourier_preserve_nan():
+    '''
+    NaNs in the image should remain NaNs in each convolved image.
+    '''
+
+    img = dataset1["moment0"][0].copy()
+    img[10:15, 10:20] = np.nan
+
+    scales = [2., 3., 4.]
+
+    conv_arrs = _ricker_fourier_convolve(img, scales)
+
+    for scale, conv_arr in zip(scales, conv_arrs):
+        exp_conv_arr = convolve_fft(img, RickerWavelet2DKernel(scale),
+                                    normalize_kernel=False,
+                                    nan_treatment='fill', preserve_nan=True)
+
+        npt.assert_equal(np.isnan(conv_arr), np.isnan(exp_conv_arr))
+        npt.assert_allclose(conv_arr, exp_conv_arr,
+                            atol=5e-3 * np.nanmax(np.abs(exp_conv_arr)))
+
+
 @pytest.mark.parametrize(('plaw', 'ellip', 'weight'),
                          [(plaw, ellip, weight) for plaw in [2, 3, 4]
                           for ellip in [0.2, 1.0]